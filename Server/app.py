@@ -13,6 +13,10 @@ from flask_cors import CORS
 from Server.blueprints import register_blueprints
 from Server.websocket_manager import init_socketio, register_socketio_events
 from Server.models.database import DatabaseConnection
+from Server.models.migracoes import Migracoes
+from Server.models.ouvinte_cache import OuvinteCache
+from Server.services import tags_temporarias_service
+from Server.utils.agendador import Agendador
 
 
 class NoOptionsLogFilter(logging.Filter):
@@ -44,25 +48,28 @@ def create_app():
 
     register_blueprints(app)
 
-    # Garantir usuários padrão (admin, operador, master) mesmo se init_database não rodou
-    try:
-        DatabaseConnection.ensure_default_usuarios()
-    except Exception:
-        pass
+    # Abrir as conexões mínimas do pool antes de atender a primeira requisição
+    DatabaseConnection.get_pool().preaquecer()
 
-    # Corrigir FK constraint problemática da tabela operacoes_canceladas
-    # (remove a FK que deletava cancelamentos quando o registro era removido)
+    # Carregar o catálogo do schema uma única vez (table_exists/column_exists consultam a memória)
     try:
-        DatabaseConnection.fix_cancelamentos_fk()
-    except Exception:
-        pass
+        DatabaseConnection.refresh_schema()
+    except Exception as e:
+        print(f"[AVISO] Não foi possível carregar o catálogo do schema: {e}")
 
-    # Garantir que a coluna dispositivo_nome exista na tabela registros_producao
-    # (armazena o nome do dispositivo Raspberry diretamente no registro)
+    # Aplicar migrações pendentes de database/migrations (uma consulta quando não há nada a fazer);
+    # backfills grandes continuam em segundo plano
     try:
-        DatabaseConnection.ensure_dispositivo_nome_column()
-    except Exception:
-        pass
+        Migracoes.aplicar_pendentes()
+    except Exception as e:
+        print(f"[AVISO] Erro ao aplicar migrações: {e}")
+
+    # Invalidação do cache de referência entre processos (LISTEN cache_referencia)
+    OuvinteCache.iniciar()
+
+    # Tarefas de manutenção periódicas (fora do caminho das requisições)
+    tags_temporarias_service.agendar_limpeza_tags_expiradas()
+    Agendador.iniciar()
 
     return app, socketio
 
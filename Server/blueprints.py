@@ -23,7 +23,8 @@ def register_blueprints(app: Flask):
         usuarios_controller,
         cancelamento_controller,
         tags_temporarias_controller,
-        dispositivo_raspberry_controller
+        dispositivo_raspberry_controller,
+        metricas_controller
     )
     
     app.register_blueprint(producao_controller.producao_bp)
@@ -44,6 +45,7 @@ def register_blueprints(app: Flask):
     app.register_blueprint(cancelamento_controller.cancelamento_bp)
     app.register_blueprint(tags_temporarias_controller.tags_temporarias_bp)
     app.register_blueprint(dispositivo_raspberry_controller.dispositivo_raspberry_bp)
+    app.register_blueprint(metricas_controller.metricas_bp)
     
     logger.info(f"Registrados {len(app.blueprints)} blueprints")
 
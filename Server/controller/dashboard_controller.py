@@ -1,4 +1,4 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, jsonify, request
 from Server.services import dashboard_service
 
 dashboard_bp = Blueprint('dashboard', __name__, url_prefix='/api/dashboard')
@@ -8,10 +8,15 @@ dashboard_bp = Blueprint('dashboard', __name__, url_prefix='/api/dashboard')
 def obter_dados_dashboard():
     """
     Retorna os dados do dashboard com informações dos postos em uso
+    (opcionalmente apenas de uma sublinha ou linha: ?sublinha_id= / ?linha_id=)
     """
     try:
         resultado = dashboard_service.buscar_postos_em_uso()
-        return jsonify(resultado), 200
+        sublinhas = dashboard_service.sublinhas_do_filtro(
+            sublinha_id=request.args.get('sublinha_id', type=int),
+            linha_id=request.args.get('linha_id', type=int)
+        )
+        return jsonify(dashboard_service.filtrar_snapshot(resultado, sublinhas)), 200
     except Exception as e:
         print(f'Erro ao obter dados do dashboard: {e}')
         return jsonify({'erro': 'Erro ao obter dados do dashboard'}), 500
@@ -20,13 +20,10 @@ def validar_rfid() -> Union[Response, Tuple[Response, int]]:
         
         codigo = data.get('codigo', '').strip()
         
-        # Primeiro verificar se é uma tag temporária
-        from Server.services import tags_temporarias_service
-        funcionario = tags_temporarias_service.buscar_funcionario_por_tag_temporaria(codigo)
-        
-        # Se não for tag temporária, buscar tag permanente
-        if not funcionario:
-            funcionario = funcionarios_service.buscar_funcionario_por_tag(codigo)
+        # Tag temporária válida ou permanente (mapa em memória, sem consulta ao banco)
+        from Server.models.resolvedor_tags import ResolvedorTags
+        resolvido = ResolvedorTags.resolver(codigo)
+        funcionario = resolvido.to_dict() if resolvido else None
         
         if not funcionario:
             return jsonify({
@@ -45,7 +42,7 @@ def validar_rfid() -> Union[Response, Tuple[Response, int]]:
             "funcionario": {
                 "nome": funcionario.get('nome'),
                 "matricula": funcionario.get('matricula'),
-                "tag_id": funcionario.get('tag_id') or funcionario.get('tag')
+                "tag_id": funcionario.get('tag_id')
             }
         })
         
@@ -264,10 +261,11 @@ def registrar_producao_ihm() -> Union[Response, Tuple[Response, int]]:
             modelo_codigo=produto_codigo
         )
         
-        # Notificar mudança via WebSocket
-        print(f"[IHM] Notificando WebSocket após registrar produção...")
-        enviar_atualizacao_dashboard()
-        enviar_atualizacao_registros()
+        # Notificar mudança via WebSocket (entrada repetida não altera nada)
+        if not resultado.get('ja_aberto'):
+            print(f"[IHM] Notificando WebSocket após registrar produção...")
+            enviar_atualizacao_dashboard()
+            enviar_atualizacao_registros(criados=[resultado.get('registro_id')])
         
         return jsonify({
             "status": "success",
@@ -0,0 +1,16 @@
+from flask import Blueprint, jsonify
+from Server.services import metricas_service
+
+metricas_bp = Blueprint('metricas', __name__, url_prefix='/api/metricas')
+
+
+@metricas_bp.route('', methods=['GET'])
+def obter_metricas():
+    """
+    Retorna métricas internas do backend (pool de conexões, caches, filas)
+    """
+    try:
+        return jsonify(metricas_service.obter_metricas()), 200
+    except Exception as e:
+        print(f'Erro ao obter métricas: {e}')
+        return jsonify({'erro': 'Erro ao obter métricas'}), 500
@@ -28,10 +28,18 @@ def registrar_entrada() -> Union[Response, Tuple[Response, int]]:
             quantidade=data.get('quantidade')
         )
         
+        if resultado.get('ja_aberto'):
+            # Entrada repetida: nada mudou, devolve o registro que já estava aberto
+            return jsonify({
+                "status": "success",
+                "message": f"Entrada já registrada para {resultado.get('funcionario_matricula', 'operador')}",
+                **resultado
+            })
+        
         # Notificar mudança via WebSocket
         print(f"[Producao] Notificando WebSocket após registrar entrada...")
         enviar_atualizacao_dashboard()
-        enviar_atualizacao_registros()
+        enviar_atualizacao_registros(criados=[resultado.get('registro_id')])
         
         return jsonify({
             "status": "success", 
@@ -69,7 +77,8 @@ def registrar_saida() -> Union[Response, Tuple[Response, int]]:
         # Notificar mudança via WebSocket
         print(f"[Producao] Notificando WebSocket após registrar saída...")
         enviar_atualizacao_dashboard()
-        enviar_atualizacao_registros()
+        # O registro encerrado passa a aparecer na listagem
+        enviar_atualizacao_registros(criados=[resultado['registro_id']])
         
         return jsonify({
             "status": "success", 
@@ -11,13 +11,28 @@ def listar_registros() -> Union[Response, Tuple[Response, int]]:
     try:
         limit = request.args.get('limit', 100, type=int)
         offset = request.args.get('offset', 0, type=int)
+        # Paginação por cursor: registro_id do último item da página anterior
+        antes_de = request.args.get('antes_de', type=int)
         data_filtro = request.args.get('data')
+        data_inicio_filtro = request.args.get('data_inicio')
+        data_fim_filtro = request.args.get('data_fim')
         posto_filtro = request.args.get('posto')
         operacao_filtro = request.args.get('operacao')
         turno_filtro = request.args.get('turno')
         hora_inicio_filtro = request.args.get('hora_inicio')
         hora_fim_filtro = request.args.get('hora_fim')
         
+        # Data/hora em formato inválido é erro do cliente, não da listagem
+        erro_filtro = registro_service.validar_filtros_data_hora(
+            data=data_filtro,
+            data_inicio=data_inicio_filtro,
+            data_fim=data_fim_filtro,
+            hora_inicio=hora_inicio_filtro,
+            hora_fim=hora_fim_filtro
+        )
+        if erro_filtro:
+            return jsonify({"error": erro_filtro}), 400
+        
         turnos_list = None
         if turno_filtro:
             if isinstance(turno_filtro, str):
@@ -33,7 +48,10 @@ def listar_registros() -> Union[Response, Tuple[Response, int]]:
             operacao=operacao_filtro,
             turno=turnos_list,
             hora_inicio=hora_inicio_filtro,
-            hora_fim=hora_fim_filtro
+            hora_fim=hora_fim_filtro,
+            antes_de=antes_de,
+            data_inicio=data_inicio_filtro,
+            data_fim=data_fim_filtro
         )
         
         return jsonify(resultado)
@@ -56,7 +74,7 @@ def atualizar_comentario_registro(registro_id: int) -> Union[Response, Tuple[Res
         # Notificar mudança via WebSocket
         print(f"[Registros] Notificando WebSocket após atualizar comentário...")
         enviar_atualizacao_dashboard()
-        enviar_atualizacao_registros()
+        enviar_atualizacao_registros(atualizados=[registro_id])
         
         return jsonify(resultado), 200
         
@@ -84,7 +102,7 @@ def deletar_registros_multiplos() -> Union[Response, Tuple[Response, int]]:
         # Notificar mudança via WebSocket
         print(f"[Registros] Notificando WebSocket após deletar múltiplos...")
         enviar_atualizacao_dashboard()
-        enviar_atualizacao_registros()
+        enviar_atualizacao_registros(removidos=registro_ids)
         
         return jsonify(resultado), 200
         
@@ -106,7 +124,7 @@ def deletar_registro(registro_id: int) -> Union[Response, Tuple[Response, int]]:
         # Notificar mudança via WebSocket
         print(f"[Registros] Notificando WebSocket após deletar registro...")
         enviar_atualizacao_dashboard()
-        enviar_atualizacao_registros()
+        enviar_atualizacao_registros(removidos=[registro_id])
         
         return jsonify(resultado), 200
         
@@ -1,5 +1,7 @@
+import os
 from flask import Blueprint, jsonify, request
 from Server.services import rfid_service
+from Server.websocket_manager import enviar_atualizacao_dashboard, enviar_atualizacao_registros
 
 tags_bp = Blueprint('tags', __name__, url_prefix='/api/tags')
 
@@ -15,9 +17,60 @@ def processar_rfid():
         tag_id = str(data['tag_id']).strip()
         posto = data.get('posto')
         
-        resultado = rfid_service.processar_leitura_rfid(tag_id=tag_id, posto=posto)
+        resultado = rfid_service.processar_leitura_rfid(
+            tag_id=tag_id,
+            posto=posto,
+            chave_idempotencia=_chave_idempotencia(data)
+        )
+        # Leituras repetidas não alteram nada; o broadcast é apenas agendado (não bloqueia)
+        if not resultado.get('duplicada'):
+            enviar_atualizacao_dashboard()
+            enviar_atualizacao_registros(criados=[resultado.get('registro_id')])
         return jsonify({"status": "success", **resultado})
     except Exception as e:
         erros_cliente = ["não encontrada", "não está", "obrigatório", "não foi possível"]
         status = 400 if any(erro in str(e).lower() for erro in erros_cliente) else 500
         return jsonify({"status": "error", "message": str(e)}), status
+
+
+# Processa um lote ordenado de leituras RFID armazenadas pelo totem (ex.: sem rede)
+@tags_bp.route('/processar-lote', methods=['POST'])
+def processar_lote_rfid():
+    try:
+        data = request.json
+        eventos = data.get('eventos') if isinstance(data, dict) else data
+        if not isinstance(eventos, list) or not eventos:
+            return jsonify({"status": "error", "message": "Lista de leituras (eventos) é obrigatória"}), 400
+        
+        limite = int(os.getenv('RFID_LOTE_MAX', '500'))
+        if len(eventos) > limite:
+            return jsonify({
+                "status": "error",
+                "message": f"Lote com {len(eventos)} leituras excede o limite de {limite}"
+            }), 400
+        
+        resultados = rfid_service.processar_lote_rfid(
+            eventos,
+            chave_idempotencia=_chave_idempotencia(data if isinstance(data, dict) else {})
+        )
+        erros = sum(1 for resultado in resultados if resultado.get('tipo') == 'erro')
+        if len(resultados) > erros:
+            enviar_atualizacao_dashboard()
+            enviar_atualizacao_registros(criados=[
+                resultado.get('registro_id') for resultado in resultados if resultado.get('tipo') != 'erro'
+            ])
+        return jsonify({
+            "status": "success",
+            "total": len(resultados),
+            "processados": len(resultados) - erros,
+            "erros": erros,
+            "resultados": resultados
+        })
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
+# Chave de idempotência enviada pelo cliente (header Idempotency-Key ou campo do body)
+def _chave_idempotencia(data: dict):
+    chave = request.headers.get('Idempotency-Key') or data.get('chave_idempotencia')
+    return str(chave).strip() or None if chave else None
@@ -63,8 +63,8 @@ def excluir_tag_temporaria(tag_id):
 @tags_temporarias_bp.route('/limpar-expiradas', methods=['POST'])
 def limpar_tags_expiradas():
     try:
-        tags_temporarias_service.limpar_tags_expiradas()
-        return jsonify({"mensagem": "Tags expiradas removidas com sucesso"})
+        total = tags_temporarias_service.limpar_tags_expiradas()
+        return jsonify({"mensagem": "Tags expiradas removidas com sucesso", "total": total})
     except Exception as e:
         return jsonify({"erro": str(e)}), 500
 
@@ -0,0 +1,202 @@
+"""
+Cache em memória dos dados de referência (linhas, sublinhas, postos, modelos,
+peças, produtos, operações e funcionários)
+
+Cada tabela é carregada inteira em uma única consulta e indexada por hash
+(id, nome, matrícula, tag, código...). Os métodos save()/delete() dos models
+invalidam o catálogo correspondente; alterações feitas por outros processos
+chegam pelo canal LISTEN/NOTIFY (ver ouvinte_cache). O TTL
+(CACHE_REFERENCIA_TTL, em segundos) é apenas uma rede de segurança.
+"""
+import copy
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Iterable, List, NamedTuple, Optional, Set
+
+from Server.models.database import DatabaseConnection
+
+# Tabelas cujas linhas são removidas em cascata (ON DELETE CASCADE) quando a chave muda
+_DEPENDENTES: Dict[str, Iterable[str]] = {
+    'linhas': ('sublinhas',),
+    'sublinhas': ('postos', 'operacoes'),
+    'postos': ('operacoes',),
+    'modelos': ('operacoes',),
+    'produtos': ('operacoes',),
+    'pecas': ('operacoes',),
+    'funcionarios': ('tags_temporarias',),
+}
+
+_catalogos: Dict[str, 'CatalogoReferencia'] = {}
+# Caches derivados (fora de CatalogoReferencia) que também precisam ser descartados
+_ouvintes: Dict[str, List[Callable[[], None]]] = {}
+
+
+def _ttl_padrao() -> float:
+    return float(os.getenv('CACHE_REFERENCIA_TTL', '300'))
+
+
+class _Snapshot(NamedTuple):
+    itens: List[Any]
+    indices: Dict[str, Dict[Hashable, List[Any]]]
+    carregado_em: float
+
+
+class CatalogoReferencia:
+    """
+    Cópia em memória de uma tabela de referência com índices hash.
+
+    Os objetos retornados são cópias rasas: o chamador pode alterá-los (e
+    chamar save()) sem afetar o cache.
+    """
+
+    def __init__(
+        self,
+        tabela: str,
+        carregar: Callable[[], List[Any]],
+        indices: Dict[str, Callable[[Any], Optional[Hashable]]],
+        ttl: Optional[float] = None
+    ) -> None:
+        self.tabela = tabela
+        self._carregar = carregar
+        self._extratores = indices
+        self._ttl = ttl
+        self._snapshot: Optional[_Snapshot] = None
+        self._geracao = 0
+        self._carga_lock = threading.Lock()
+        self._estado_lock = threading.Lock()
+        self._stats = {'acertos': 0, 'cargas': 0, 'invalidacoes': 0}
+        _catalogos[tabela] = self
+
+    @property
+    def ttl(self) -> float:
+        return self._ttl if self._ttl is not None else _ttl_padrao()
+
+    def listar(self) -> List[Any]:
+        """Todos os itens, na ordem da consulta de carga"""
+        return [copy.copy(item) for item in self._obter().itens]
+
+    def buscar(self, indice: str, chave: Optional[Hashable]) -> Optional[Any]:
+        """Primeiro item cujo índice corresponde à chave (O(1))"""
+        if chave is None:
+            return None
+        encontrados = self._obter().indices[indice].get(chave)
+        return copy.copy(encontrados[0]) if encontrados else None
+
+    def filtrar(self, indice: str, chave: Optional[Hashable]) -> List[Any]:
+        """Todos os itens cujo índice corresponde à chave"""
+        if chave is None:
+            return []
+        return [copy.copy(item) for item in self._obter().indices[indice].get(chave, ())]
+
+    def invalidar(self) -> None:
+        """Descarta o snapshot atual; a próxima leitura recarrega a tabela"""
+        with self._estado_lock:
+            self._geracao += 1
+            self._snapshot = None
+            self._stats['invalidacoes'] += 1
+
+    def estatisticas(self) -> Dict[str, Any]:
+        snapshot = self._snapshot
+        with self._estado_lock:
+            stats: Dict[str, Any] = dict(self._stats)
+        stats['itens'] = len(snapshot.itens) if snapshot else 0
+        stats['idade_s'] = round(time.monotonic() - snapshot.carregado_em, 1) if snapshot else None
+        return stats
+
+    def _valido(self, snapshot: Optional[_Snapshot]) -> bool:
+        return snapshot is not None and time.monotonic() - snapshot.carregado_em < self.ttl
+
+    def _obter(self) -> _Snapshot:
+        snapshot = self._snapshot
+        if self._valido(snapshot):
+            with self._estado_lock:
+                self._stats['acertos'] += 1
+            return snapshot
+
+        # Apenas uma thread recarrega; as demais aguardam e reaproveitam o resultado
+        with self._carga_lock:
+            snapshot = self._snapshot
+            if self._valido(snapshot):
+                return snapshot
+
+            with self._estado_lock:
+                geracao = self._geracao
+            # A carga nunca usa a conexão de uma transação em andamento: o cache
+            # só pode conter dados já confirmados
+            with DatabaseConnection.outside_transaction():
+                itens = list(self._carregar())
+
+            indices: Dict[str, Dict[Hashable, List[Any]]] = {nome: {} for nome in self._extratores}
+            for item in itens:
+                for nome, extrair in self._extratores.items():
+                    chave = extrair(item)
+                    if chave is not None:
+                        indices[nome].setdefault(chave, []).append(item)
+            snapshot = _Snapshot(itens, indices, time.monotonic())
+
+            with self._estado_lock:
+                self._stats['cargas'] += 1
+                # Se houve invalidação durante a carga, o resultado serve só para esta leitura
+                if self._geracao == geracao:
+                    self._snapshot = snapshot
+            return snapshot
+
+
+def _expandir(tabelas: Iterable[str]) -> Set[str]:
+    alvos: Set[str] = set()
+    pendentes = list(tabelas)
+    while pendentes:
+        tabela = pendentes.pop()
+        if tabela in alvos:
+            continue
+        alvos.add(tabela)
+        pendentes.extend(_DEPENDENTES.get(tabela, ()))
+    return alvos
+
+
+def ao_invalidar(tabela: str, callback: Callable[[], None]) -> None:
+    """Registra uma função chamada sempre que a tabela for invalidada"""
+    _ouvintes.setdefault(tabela, []).append(callback)
+
+
+def _invalidar_agora(alvos: Iterable[str]) -> None:
+    for tabela in alvos:
+        catalogo = _catalogos.get(tabela)
+        if catalogo is not None:
+            catalogo.invalidar()
+        for callback in _ouvintes.get(tabela, ()):
+            try:
+                callback()
+            except Exception as e:
+                print(f"[AVISO] Erro ao invalidar cache derivado de {tabela}: {e}")
+
+
+def invalidar(*tabelas: str) -> None:
+    """
+    Invalida os catálogos das tabelas informadas (e das que dependem delas).
+
+    Dentro de DatabaseConnection.transaction() a invalidação é repetida após o
+    commit, pois outra thread pode ter recarregado os dados antigos enquanto a
+    transação ainda estava aberta.
+    """
+    alvos = _expandir(tabelas)
+    _invalidar_agora(alvos)
+    transacao = DatabaseConnection.current_transaction()
+    if transacao is not None:
+        transacao.ao_confirmar(lambda: _invalidar_agora(alvos))
+
+
+def invalidar_local(*tabelas: str) -> None:
+    """Invalida apenas neste processo, sem considerar a transação da thread (usado pelo ouvinte)"""
+    _invalidar_agora(_expandir(tabelas))
+
+
+def invalidar_todos() -> None:
+    """Invalida todos os catálogos e caches derivados registrados"""
+    invalidar_local(*(set(_catalogos) | set(_ouvintes)))
+
+
+def estatisticas() -> Dict[str, Dict[str, Any]]:
+    """Estatísticas de cada catálogo (acertos, cargas, invalidações, itens)"""
+    return {tabela: catalogo.estatisticas() for tabela, catalogo in sorted(_catalogos.items())}
@@ -0,0 +1,279 @@
+"""
+Pool de conexões thread-safe usado pelo DatabaseConnection
+"""
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional, Tuple, TYPE_CHECKING
+
+from psycopg2 import extensions
+
+if TYPE_CHECKING:
+    from psycopg2.extensions import connection as Connection
+else:
+    Connection = Any
+
+
+class PooledConnection:
+    """
+    Conexão emprestada do pool.
+
+    Repassa todos os atributos para a conexão psycopg2 real, mas close()
+    devolve a conexão ao pool em vez de encerrar o socket. Assim os models
+    continuam usando o padrão get_connection() / conn.close() sem alterações.
+    """
+
+    def __init__(self, pool: 'ConnectionPool', conn: Connection) -> None:
+        self._pool = pool
+        self._conn: Optional[Connection] = conn
+
+    @property
+    def closed(self) -> int:
+        """Segue a semântica do psycopg2: diferente de zero quando não pode mais ser usada"""
+        if self._conn is None:
+            return 1
+        return self._conn.closed
+
+    @property
+    def raw(self) -> Connection:
+        """Conexão psycopg2 subjacente"""
+        if self._conn is None:
+            raise Exception("Conexão já foi devolvida ao pool")
+        return self._conn
+
+    def close(self) -> None:
+        """Devolve a conexão ao pool (idempotente)"""
+        if self._conn is None:
+            return
+        conn = self._conn
+        self._conn = None
+        self._pool.devolver(conn)
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.raw, name)
+
+    def __del__(self) -> None:
+        # Proteção contra vazamento: se o chamador esquecer o close(), devolve ao pool
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class ConnectionPool:
+    """
+    Pool de conexões PostgreSQL com tamanho mínimo/máximo.
+
+    - As conexões são criadas pela função `criar_conexao`, que já aplica a
+      configuração de sessão (encoding e timezone) uma única vez por conexão.
+    - No empréstimo, conexões paradas há mais de `healthcheck_idle` segundos
+      passam por um `SELECT 1`; conexões quebradas são descartadas e recriadas.
+    - Na devolução, transações pendentes são desfeitas (rollback) para que a
+      próxima requisição receba a conexão limpa.
+    """
+
+    def __init__(
+        self,
+        criar_conexao: Callable[[], Connection],
+        minconn: int = 2,
+        maxconn: int = 20,
+        timeout: float = 10.0,
+        healthcheck_idle: float = 30.0,
+        max_idle: float = 300.0
+    ) -> None:
+        if maxconn < 1:
+            raise ValueError("maxconn deve ser maior que zero")
+        self._criar_conexao = criar_conexao
+        self.minconn = max(0, min(minconn, maxconn))
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.healthcheck_idle = healthcheck_idle
+        self.max_idle = max_idle
+
+        self._cond = threading.Condition(threading.Lock())
+        # (conexão, instante em que foi devolvida) - LIFO para reaproveitar as mais "quentes"
+        self._livres: Deque[Tuple[Connection, float]] = deque()
+        self._total = 0
+        self._pid = os.getpid()
+        self._fechado = False
+
+        self._stats: Dict[str, float] = {
+            'emprestimos': 0,
+            'esperas': 0,
+            'tempo_espera_total_ms': 0.0,
+            'timeouts': 0,
+            'conexoes_criadas': 0,
+            'conexoes_descartadas': 0,
+            'falhas_health_check': 0,
+        }
+
+    # ------------------------------------------------------------------
+    # Empréstimo / devolução
+    # ------------------------------------------------------------------
+    def obter(self) -> PooledConnection:
+        """Empresta uma conexão do pool, aguardando até `timeout` segundos se estiver esgotado"""
+        self._verificar_fork()
+        inicio_espera = time.monotonic()
+        limite = inicio_espera + self.timeout
+        esperou = False
+
+        while True:
+            conn: Optional[Connection] = None
+            devolvida_em = 0.0
+            criar_nova = False
+
+            with self._cond:
+                if self._fechado:
+                    raise Exception("Pool de conexões encerrado")
+                while not self._livres and self._total >= self.maxconn:
+                    restante = limite - time.monotonic()
+                    if restante <= 0:
+                        self._stats['timeouts'] += 1
+                        raise Exception(
+                            f"Pool de conexões esgotado: {self.maxconn} conexões em uso "
+                            f"após aguardar {self.timeout:.1f}s"
+                        )
+                    esperou = True
+                    self._cond.wait(restante)
+
+                if self._livres:
+                    conn, devolvida_em = self._livres.pop()
+                else:
+                    self._total += 1
+                    criar_nova = True
+
+            if criar_nova:
+                try:
+                    conn = self._criar_conexao()
+                except Exception:
+                    with self._cond:
+                        self._total -= 1
+                        self._cond.notify()
+                    raise
+                with self._cond:
+                    self._stats['conexoes_criadas'] += 1
+            elif not self._conexao_saudavel(conn, devolvida_em):
+                self._descartar(conn)
+                continue
+
+            with self._cond:
+                self._stats['emprestimos'] += 1
+                if esperou:
+                    self._stats['esperas'] += 1
+                    self._stats['tempo_espera_total_ms'] += (time.monotonic() - inicio_espera) * 1000
+            return PooledConnection(self, conn)
+
+    def devolver(self, conn: Connection) -> None:
+        """Devolve uma conexão ao pool, descartando-a se estiver quebrada"""
+        if conn.closed or self._fechado or os.getpid() != self._pid:
+            self._descartar(conn)
+            return
+
+        try:
+            if conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                conn.rollback()
+        except Exception:
+            self._descartar(conn)
+            return
+
+        agora = time.monotonic()
+        excedentes = []
+        with self._cond:
+            self._livres.append((conn, agora))
+            # Encerrar conexões ociosas há muito tempo, preservando o mínimo
+            while len(self._livres) > self.minconn and agora - self._livres[0][1] > self.max_idle:
+                excedentes.append(self._livres.popleft()[0])
+            self._cond.notify()
+
+        for antiga in excedentes:
+            self._descartar(antiga)
+
+    def preaquecer(self) -> None:
+        """Abre as conexões mínimas antecipadamente (falhas são apenas registradas)"""
+        conexoes = []
+        try:
+            for _ in range(self.minconn):
+                conexoes.append(self.obter())
+        except Exception as e:
+            print(f"[AVISO] Não foi possível pré-aquecer o pool de conexões: {e}")
+        finally:
+            for conn in conexoes:
+                conn.close()
+
+    def fechar_todas(self) -> None:
+        """Encerra todas as conexões livres e impede novos empréstimos"""
+        with self._cond:
+            self._fechado = True
+            livres = [conn for conn, _ in self._livres]
+            self._livres.clear()
+            self._cond.notify_all()
+        for conn in livres:
+            self._descartar(conn)
+
+    # ------------------------------------------------------------------
+    # Estatísticas
+    # ------------------------------------------------------------------
+    def estatisticas(self) -> Dict[str, Any]:
+        """Retorna um retrato do estado atual do pool"""
+        with self._cond:
+            livres = len(self._livres)
+            stats: Dict[str, Any] = dict(self._stats)
+            stats.update({
+                'min': self.minconn,
+                'max': self.maxconn,
+                'total': self._total,
+                'livres': livres,
+                'em_uso': self._total - livres,
+            })
+        stats['tempo_espera_total_ms'] = round(stats['tempo_espera_total_ms'], 2)
+        return stats
+
+    # ------------------------------------------------------------------
+    # Internos
+    # ------------------------------------------------------------------
+    def _conexao_saudavel(self, conn: Connection, devolvida_em: float) -> bool:
+        """Valida a conexão antes de emprestá-la"""
+        if conn.closed:
+            return False
+        if time.monotonic() - devolvida_em < self.healthcheck_idle:
+            return True
+        try:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("SELECT 1")
+                cursor.fetchone()
+            finally:
+                cursor.close()
+            conn.rollback()
+            return True
+        except Exception:
+            with self._cond:
+                self._stats['falhas_health_check'] += 1
+            return False
+
+    def _descartar(self, conn: Connection) -> None:
+        """Fecha a conexão física e libera a vaga no pool"""
+        try:
+            if not conn.closed:
+                conn.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._total = max(0, self._total - 1)
+            self._stats['conexoes_descartadas'] += 1
+            self._cond.notify()
+
+    def _verificar_fork(self) -> None:
+        """Conexões herdadas de um processo pai não podem ser reutilizadas"""
+        if os.getpid() == self._pid:
+            return
+        with self._cond:
+            if os.getpid() == self._pid:
+                return
+            # Não fechar os sockets herdados: eles pertencem ao processo pai
+            self._livres.clear()
+            self._total = 0
+            self._pid = os.getpid()
@@ -4,8 +4,12 @@ Classe base para gerenciar conexões com o banco de dados PostgreSQL
 import psycopg2
 import os
 import json
-from typing import Optional, Union, Tuple, List, Any, Dict, TYPE_CHECKING
+import threading
+from contextlib import contextmanager
+from typing import Optional, Union, Tuple, List, Any, Dict, Iterator, Set, TYPE_CHECKING
 from dotenv import load_dotenv
+from Server.models.connection_pool import ConnectionPool
+from Server.models.transacao import ConexaoTransacao, Transacao
 
 if TYPE_CHECKING:
     from psycopg2.extensions import connection as Connection
@@ -20,6 +24,13 @@ class DatabaseConnection:
     """Classe para gerenciar conexões com o banco de dados PostgreSQL"""
     
     _db_config: Optional[Dict[str, Any]] = None
+    _pool: Optional[ConnectionPool] = None
+    _pool_lock = threading.Lock()
+    # Transação ativa por thread (cada requisição Flask roda em sua própria thread)
+    _local = threading.local()
+    # Catálogo do schema public: tabela -> colunas (carregado uma vez, ver refresh_schema)
+    _schema: Optional[Dict[str, Set[str]]] = None
+    _schema_lock = threading.Lock()
     
     @classmethod
     def get_db_config(cls) -> Dict[str, Any]:
@@ -112,9 +123,109 @@ class DatabaseConnection:
         
         return cls._db_config
     
+    @classmethod
+    def get_pool(cls) -> ConnectionPool:
+        """
+        Retorna o pool de conexões do processo, criando-o na primeira chamada.
+
+        Tamanho e comportamento configuráveis por variáveis de ambiente:
+        DB_POOL_MIN, DB_POOL_MAX, DB_POOL_TIMEOUT (segundos aguardando uma conexão livre),
+        DB_POOL_HEALTHCHECK_IDLE (segundos ociosa antes de validar com SELECT 1) e
+        DB_POOL_MAX_IDLE (segundos ociosa antes de ser encerrada, acima do mínimo).
+        """
+        if cls._pool is None:
+            with cls._pool_lock:
+                if cls._pool is None:
+                    cls._pool = ConnectionPool(
+                        criar_conexao=cls._criar_conexao,
+                        minconn=int(os.getenv('DB_POOL_MIN', '2')),
+                        maxconn=int(os.getenv('DB_POOL_MAX', '20')),
+                        timeout=float(os.getenv('DB_POOL_TIMEOUT', '10')),
+                        healthcheck_idle=float(os.getenv('DB_POOL_HEALTHCHECK_IDLE', '30')),
+                        max_idle=float(os.getenv('DB_POOL_MAX_IDLE', '300'))
+                    )
+        return cls._pool
+
+    @classmethod
+    def get_pool_stats(cls) -> Dict[str, Any]:
+        """Retorna as estatísticas do pool de conexões"""
+        return cls.get_pool().estatisticas()
+
     @classmethod
     def get_connection(cls) -> Connection:
-        """Cria e retorna uma conexão com o banco de dados PostgreSQL"""
+        """
+        Empresta uma conexão do pool.
+
+        A conexão retornada se comporta como uma conexão psycopg2 comum; close()
+        a devolve ao pool em vez de encerrá-la. Dentro de um bloco
+        `transaction()`, retorna a conexão da transação ativa.
+        """
+        transacao = cls.current_transaction()
+        if transacao is not None:
+            return ConexaoTransacao(transacao)
+        return cls.get_pool().obter()
+
+    @classmethod
+    def current_transaction(cls) -> Optional[Transacao]:
+        """Retorna a transação ativa na thread atual, se houver"""
+        return getattr(cls._local, 'transacao', None)
+
+    @classmethod
+    @contextmanager
+    def transaction(cls) -> Iterator[Transacao]:
+        """
+        Unidade de trabalho: todas as chamadas de models dentro do bloco usam a
+        mesma conexão e são confirmadas com um único commit ao final.
+
+        Uso:
+            with DatabaseConnection.transaction() as tx:
+                tx.bloquear(f"registro:{posto}:{matricula}")
+                registro = ProducaoRegistro.buscar_registro_aberto(...)
+                ...
+
+        Blocos aninhados participam da transação externa. Qualquer exceção (ou
+        rollback solicitado por um model) desfaz a transação inteira.
+        """
+        atual = cls.current_transaction()
+        if atual is not None:
+            yield atual
+            return
+
+        conexao = cls.get_pool().obter()
+        transacao = Transacao(conexao)
+        cls._local.transacao = transacao
+        try:
+            try:
+                yield transacao
+            except BaseException as e:
+                cls._local.transacao = None
+                transacao.finalizar(e)
+                raise
+            cls._local.transacao = None
+            transacao.finalizar(None)
+        finally:
+            cls._local.transacao = None
+            conexao.close()
+
+    @classmethod
+    @contextmanager
+    def outside_transaction(cls) -> Iterator[None]:
+        """
+        Executa o bloco com conexões próprias, ignorando a transação ativa da thread.
+
+        Usado por leituras que não podem enxergar dados ainda não confirmados
+        (por exemplo, a carga dos caches compartilhados entre threads).
+        """
+        atual = cls.current_transaction()
+        cls._local.transacao = None
+        try:
+            yield
+        finally:
+            cls._local.transacao = atual
+
+    @classmethod
+    def _criar_conexao(cls) -> Connection:
+        """Cria uma nova conexão física com o banco de dados PostgreSQL (usada pelo pool)"""
         config = cls.get_db_config()
         
         try:
@@ -219,6 +330,8 @@ class DatabaseConnection:
                     cursor = conn.cursor()
                     cursor.execute("SET TIME ZONE 'America/Manaus'")
                     cursor.close()
+                    # Confirmar o SET: um rollback posterior (ex.: devolução ao pool) o desfaria
+                    conn.commit()
                 except:
                     pass  # Se falhar, continuar mesmo assim
                 return conn
@@ -244,6 +357,7 @@ class DatabaseConnection:
                             cursor = conn.cursor()
                             cursor.execute("SET TIME ZONE 'America/Manaus'")
                             cursor.close()
+                            conn.commit()
                         except:
                             pass
                         return conn
@@ -341,6 +455,7 @@ class DatabaseConnection:
         # Converter placeholders de ? para %s (PostgreSQL usa %s)
         query = query.replace('?', '%s')
         
+        # Dentro de transaction(), o commit/close são adiados para o fim do bloco
         conn = cls.get_connection()
         cursor = conn.cursor()
         
@@ -387,161 +502,45 @@ class DatabaseConnection:
             conn.close()
     
     @classmethod
-    def table_exists(cls, table_name: str) -> bool:
-        """Verifica se uma tabela existe no banco de dados"""
-        query = """
-            SELECT EXISTS (
-                SELECT FROM information_schema.tables 
-                WHERE table_schema = 'public' 
-                AND table_name = %s
-            )
+    def refresh_schema(cls) -> Dict[str, Set[str]]:
+        """
+        Recarrega o catálogo de tabelas/colunas do schema public.
+
+        Feito uma vez na inicialização; deve ser chamado novamente sempre que
+        o schema for alterado (migrações, ALTER TABLE em tempo de execução).
         """
-        result = cls.execute_query(query, (table_name,), fetch_one=True)
-        if result and isinstance(result, tuple) and len(result) > 0:
-            return bool(result[0])
-        return False
-    
-    @classmethod
-    def column_exists(cls, table_name: str, column_name: str) -> bool:
-        """Verifica se uma coluna existe em uma tabela"""
         query = """
-            SELECT EXISTS (
-                SELECT FROM information_schema.columns 
-                WHERE table_schema = 'public' 
-                AND table_name = %s 
-                AND column_name = %s
-            )
+            SELECT c.relname, a.attname
+            FROM pg_catalog.pg_class c
+            JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+            LEFT JOIN pg_catalog.pg_attribute a
+                ON a.attrelid = c.oid AND a.attnum > 0 AND NOT a.attisdropped
+            WHERE n.nspname = 'public'
+            AND c.relkind IN ('r', 'p', 'v', 'm')
         """
-        result = cls.execute_query(query, (table_name, column_name), fetch_one=True)
-        if result and isinstance(result, tuple) and len(result) > 0:
-            return bool(result[0])
-        return False
-
-    # Usuários padrão (senhas SHA-256): admin123, operador123, master123
-    _DEFAULT_USUARIOS = (
-        ('admin', '240be518fabd2724ddb6f04eeb1da5967448d7e831c08c8fa822809f74c720a9', 'Administrador', 'admin'),
-        ('operador', '1725165c9a0b3698a3d01016e0d8205155820b8d7f21835ca64c0f81c728d880', 'Operador RFID', 'operador'),
-        ('master', 'e7bc2f973afb8dfaf00fadfb19596741108be08ab4a107c6a799c429b684c64a', 'Master User', 'master'),
-    )
-
+        schema: Dict[str, Set[str]] = {}
+        for tabela, coluna in cls.execute_query(query, fetch_all=True):
+            colunas = schema.setdefault(tabela, set())
+            if coluna:
+                colunas.add(coluna)
+        with cls._schema_lock:
+            cls._schema = schema
+        return schema
+    
     @classmethod
-    def ensure_default_usuarios(cls) -> None:
-        """Garante que os usuários padrão (admin, operador, master) existam. Chamado na subida do Server."""
-        try:
-            if not cls.table_exists('usuarios'):
-                return
-            for username, senha_hash, nome, role in cls._DEFAULT_USUARIOS:
-                q = "SELECT 1 FROM usuarios WHERE username = %s"
-                r = cls.execute_query(q, (username,), fetch_one=True)
-                if not r or not r[0]:
-                    ins = """
-                        INSERT INTO usuarios (username, senha_hash, nome, role, ativo)
-                        VALUES (%s, %s, %s, %s, TRUE)
-                        ON CONFLICT (username) DO UPDATE SET
-                          senha_hash = EXCLUDED.senha_hash,
-                          nome = EXCLUDED.nome,
-                          role = EXCLUDED.role,
-                          ativo = EXCLUDED.ativo,
-                          data_atualizacao = CURRENT_TIMESTAMP
-                    """
-                    cls.execute_query(ins, (username, senha_hash, nome, role))
-        except Exception as e:
-            try:
-                msg = str(e).encode('utf-8', errors='replace').decode('utf-8')
-            except Exception:
-                msg = "Erro ao garantir usuários padrão"
-            print(f"[AVISO] ensure_default_usuarios: {msg}")
-
+    def get_schema(cls) -> Dict[str, Set[str]]:
+        """Retorna o catálogo do schema, carregando-o na primeira chamada"""
+        schema = cls._schema
+        if schema is None:
+            schema = cls.refresh_schema()
+        return schema
+    
     @classmethod
-    def fix_cancelamentos_fk(cls) -> None:
-        """
-        Remove a FK constraint problemática da tabela operacoes_canceladas.
-        
-        O problema: A FK com ON DELETE CASCADE deletava os cancelamentos
-        quando o registro original era removido de registros_producao.
-        
-        Solução: Remover a FK pois o registro_id é apenas uma referência
-        histórica e o registro original será deletado após o cancelamento.
-        """
-        try:
-            if not cls.table_exists('operacoes_canceladas'):
-                return
-            
-            conn = cls.get_connection()
-            cursor = conn.cursor()
-            
-            try:
-                # Verificar se existe FK para registros_producao
-                cursor.execute("""
-                    SELECT conname 
-                    FROM pg_constraint 
-                    WHERE conrelid = 'operacoes_canceladas'::regclass 
-                    AND confrelid = 'registros_producao'::regclass
-                """)
-                result = cursor.fetchone()
-                
-                if result:
-                    constraint_name = result[0]
-                    # Remover a constraint
-                    cursor.execute(f"ALTER TABLE operacoes_canceladas DROP CONSTRAINT {constraint_name}")
-                    conn.commit()
-                    print(f"[MIGRAÇÃO] FK constraint '{constraint_name}' removida da tabela operacoes_canceladas")
-                
-            except Exception as e:
-                conn.rollback()
-                print(f"[AVISO] Erro ao remover FK de operacoes_canceladas: {e}")
-            finally:
-                cursor.close()
-                conn.close()
-                
-        except Exception as e:
-            print(f"[AVISO] fix_cancelamentos_fk: {e}")
-
+    def table_exists(cls, table_name: str) -> bool:
+        """Verifica se uma tabela existe no banco de dados (consulta o catálogo em memória)"""
+        return table_name in cls.get_schema()
+    
     @classmethod
-    def ensure_dispositivo_nome_column(cls) -> None:
-        """
-        Garante que a coluna dispositivo_nome exista na tabela registros_producao.
-        Esta coluna armazena o nome do dispositivo Raspberry diretamente no registro.
-        """
-        try:
-            if not cls.table_exists('registros_producao'):
-                return
-            
-            if cls.column_exists('registros_producao', 'dispositivo_nome'):
-                return  # Coluna já existe
-            
-            conn = cls.get_connection()
-            cursor = conn.cursor()
-            
-            try:
-                # Adicionar a coluna
-                cursor.execute("ALTER TABLE registros_producao ADD COLUMN dispositivo_nome TEXT")
-                conn.commit()
-                print("[MIGRAÇÃO] Coluna dispositivo_nome adicionada à tabela registros_producao")
-                
-                # Atualizar registros existentes com o nome do dispositivo da operação
-                cursor.execute("""
-                    UPDATE registros_producao r
-                    SET dispositivo_nome = (
-                        SELECT STRING_AGG(DISTINCT ot.toten_nome, ', ')
-                        FROM operacao_totens ot
-                        WHERE ot.operacao_id = r.operacao_id
-                    )
-                    WHERE r.dispositivo_nome IS NULL 
-                    AND r.operacao_id IS NOT NULL
-                    AND EXISTS (
-                        SELECT 1 FROM operacao_totens ot WHERE ot.operacao_id = r.operacao_id
-                    )
-                """)
-                conn.commit()
-                print("[MIGRAÇÃO] Registros existentes atualizados com nome do dispositivo")
-                
-            except Exception as e:
-                conn.rollback()
-                print(f"[AVISO] Erro ao adicionar coluna dispositivo_nome: {e}")
-            finally:
-                cursor.close()
-                conn.close()
-                
-        except Exception as e:
-            print(f"[AVISO] ensure_dispositivo_nome_column: {e}")
+    def column_exists(cls, table_name: str, column_name: str) -> bool:
+        """Verifica se uma coluna existe em uma tabela (consulta o catálogo em memória)"""
+        return column_name in cls.get_schema().get(table_name, ())
@@ -4,6 +4,7 @@ Modelo para a entidade DispositivoRaspberry
 from typing import Dict, Any, Optional, List, Tuple
 from datetime import datetime
 from Server.models.database import DatabaseConnection
+from Server.models import cache
 
 
 class DispositivoRaspberry:
@@ -84,6 +85,7 @@ class DispositivoRaspberry:
             result = DatabaseConnection.execute_query(query, params)
             if isinstance(result, int):
                 self.dispositivo_id = result
+        cache.invalidar('dispositivos_raspberry')
         return self
     
     @staticmethod
@@ -132,6 +134,7 @@ class DispositivoRaspberry:
         query = "DELETE FROM dispositivos_raspberry WHERE id = %s"
         DatabaseConnection.execute_query(query, (self.dispositivo_id,))
         self.dispositivo_id = None
+        cache.invalidar('dispositivos_raspberry')
     
     @staticmethod
     def criar(serial: str, nome: Optional[str] = None) -> 'DispositivoRaspberry':
@@ -1,5 +1,6 @@
 from typing import Dict, Any, Optional, List, Tuple, Union
 from Server.models.database import DatabaseConnection
+from Server.models import cache
 
 
 class Funcionario:
@@ -96,59 +97,32 @@ class Funcionario:
             result = DatabaseConnection.execute_query(query, params)
             if isinstance(result, int):
                 self.funcionario_id = result
+        cache.invalidar('funcionarios')
         return self
     
     @staticmethod
     def buscar_por_id(funcionario_id: int) -> Optional['Funcionario']:
-        """Busca um funcionário pelo ID"""
-        query = """
-            SELECT funcionario_id, tag_id, matricula, nome, ativo, turno 
-            FROM funcionarios 
-            WHERE funcionario_id = ?
-        """
-        row = DatabaseConnection.execute_query(query, (funcionario_id,), fetch_one=True)
-        if not row:
-            return None
-        
-        if isinstance(row, tuple):
-            return Funcionario.from_row(row)
-        return None
+        """Busca um funcionário pelo ID (cache de referência)"""
+        return _cache_funcionarios.buscar('id', funcionario_id)
     
     @staticmethod
     def buscar_por_matricula(matricula: str) -> Optional['Funcionario']:
-        """Busca um funcionário pela matrícula"""
-        query = """
-            SELECT funcionario_id, tag_id, matricula, nome, ativo, turno 
-            FROM funcionarios 
-            WHERE matricula = ?
-        """
-        row = DatabaseConnection.execute_query(query, (matricula,), fetch_one=True)
-        if not row:
-            return None
-        
-        if isinstance(row, tuple):
-            return Funcionario.from_row(row)
-        return None
+        """Busca um funcionário pela matrícula (cache de referência)"""
+        return _cache_funcionarios.buscar('matricula', matricula)
     
     @staticmethod
     def buscar_por_tag(tag_id: str) -> Optional['Funcionario']:
-        """Busca um funcionário pela tag RFID"""
-        query = """
-            SELECT funcionario_id, tag_id, matricula, nome, ativo, turno 
-            FROM funcionarios 
-            WHERE tag_id = ?
-        """
-        row = DatabaseConnection.execute_query(query, (tag_id,), fetch_one=True)
-        if not row:
-            return None
-        
-        if isinstance(row, tuple):
-            return Funcionario.from_row(row)
-        return None
+        """Busca um funcionário pela tag RFID (cache de referência)"""
+        return _cache_funcionarios.buscar('tag_id', tag_id)
     
     @staticmethod
     def listar_todos() -> List['Funcionario']:
-        """Lista todos os funcionários"""
+        """Lista todos os funcionários (cache de referência)"""
+        return _cache_funcionarios.listar()
+    
+    @staticmethod
+    def _carregar_todos() -> List['Funcionario']:
+        """Carrega todos os funcionários do banco (usado pelo cache de referência)"""
         query = """
             SELECT funcionario_id, tag_id, matricula, nome, ativo, turno 
             FROM funcionarios 
@@ -184,6 +158,7 @@ class Funcionario:
         query = "DELETE FROM funcionarios WHERE funcionario_id = ?"
         DatabaseConnection.execute_query(query, (self.funcionario_id,))
         self.funcionario_id = None
+        cache.invalidar('funcionarios')
     
     @staticmethod
     def criar(matricula: str, nome: str, ativo: bool = True, tag_id: Optional[str] = None, turno: Optional[str] = None) -> 'Funcionario':
@@ -195,4 +170,15 @@ class Funcionario:
             tag_id=tag_id, 
             turno=turno
         )
-        return funcionario.save()
\ No newline at end of file
+        return funcionario.save()
+
+
+_cache_funcionarios = cache.CatalogoReferencia(
+    'funcionarios',
+    carregar=Funcionario._carregar_todos,
+    indices={
+        'id': lambda f: f.funcionario_id,
+        'matricula': lambda f: f.matricula,
+        'tag_id': lambda f: f.tag_id,
+    }
+)
@@ -1,4 +1,5 @@
 from Server.models.database import DatabaseConnection
+from Server.models import cache
 from typing import Dict, Any, Optional, List
 
 class Linha:
@@ -31,9 +32,14 @@ class Linha:
             query = "UPDATE linhas SET nome = %s WHERE linha_id = %s"
             params = (self.nome, self.linha_id)
             DatabaseConnection.execute_query(query, params)
+        cache.invalidar('linhas')
 
     @classmethod
     def listar_todas(cls) -> List['Linha']:
+        return _cache_linhas.listar()
+    
+    @classmethod
+    def _carregar_todas(cls) -> List['Linha']:
         query = "SELECT linha_id, nome FROM linhas ORDER BY nome"
         resultados = DatabaseConnection.execute_query(query, fetch_all=True)
 
@@ -48,12 +54,7 @@ class Linha:
     
     @classmethod
     def buscar_por_nome(cls, nome: str) -> Optional['Linha']:
-        query = "SELECT linha_id, nome FROM linhas WHERE nome = %s"
-        resultado = DatabaseConnection.execute_query(query, (nome,), fetch_one=True)
-
-        if resultado:
-            return cls(linha_id=resultado[0], nome=resultado[1])
-        return None
+        return _cache_linhas.buscar('nome', nome)
     
     @classmethod
     def buscar_por_nome_parcial(cls, nome: str) -> List['Linha']:
@@ -68,12 +69,7 @@ class Linha:
     
     @classmethod
     def buscar_por_id(cls, linha_id: int) -> Optional['Linha']:
-        query = "SELECT linha_id, nome FROM linhas WHERE linha_id = %s"
-        resultado = DatabaseConnection.execute_query(query, (linha_id,), fetch_one=True)
-
-        if resultado:
-            return cls(linha_id=resultado[0], nome=resultado[1])
-        return None
+        return _cache_linhas.buscar('id', linha_id)
     
     @classmethod
     def existe_nome(cls, nome: str, excluir_id: Optional[int] = None) -> bool:
@@ -103,6 +99,7 @@ class Linha:
         query = "DELETE FROM linhas WHERE linha_id = %s"
         DatabaseConnection.execute_query(query, (self.linha_id,))
         self.linha_id = None
+        cache.invalidar('linhas')
         return True
     
     @classmethod
@@ -115,6 +112,7 @@ class Linha:
         
         query = "DELETE FROM linhas WHERE linha_id = %s"
         DatabaseConnection.execute_query(query, (linha_id,))
+        cache.invalidar('linhas')
         return True
     
     def atualizar_nome(self, novo_nome: str) -> None:
@@ -125,4 +123,14 @@ class Linha:
     def contar_total(cls) -> int:
         query = "SELECT COUNT(*) FROM linhas"
         resultado = DatabaseConnection.execute_query(query, fetch_one=True)
-        return resultado[0] if resultado else 0
\ No newline at end of file
+        return resultado[0] if resultado else 0
+
+
+_cache_linhas = cache.CatalogoReferencia(
+    'linhas',
+    carregar=Linha._carregar_todas,
+    indices={
+        'id': lambda l: l.linha_id,
+        'nome': lambda l: l.nome,
+    }
+)
@@ -0,0 +1,391 @@
+"""
+Runner de migrações versionadas do banco de dados
+
+As migrações ficam em database/migrations/NNN_descricao.sql e são aplicadas uma
+única vez, em ordem numérica, ficando registradas na tabela schema_migrations.
+Migrações cujo arquivo começa com o cabeçalho `-- migracao: background-em-lotes`
+são backfills: o UPDATE do arquivo é repetido em segundo plano, um lote por
+transação, até não alterar mais nenhuma linha. Migrações com o cabeçalho
+`-- migracao: sem-transacao` (índices CONCURRENTLY em tabelas grandes) também
+rodam em segundo plano, fora da transação da inicialização: cada comando
+CONCURRENTLY é executado isolado e os demais comandos consecutivos formam uma
+transação curta.
+"""
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple, Set
+
+from Server.models.database import DatabaseConnection
+
+_PADRAO_ARQUIVO = re.compile(r'^(\d+)_([\w\-]+)\.sql$')
+_CABECALHO_BACKGROUND = '-- migracao: background-em-lotes'
+_CABECALHO_SEM_TRANSACAO = '-- migracao: sem-transacao'
+_PADRAO_CONCURRENTLY = re.compile(r'\bCONCURRENTLY\b', re.IGNORECASE)
+_PADRAO_CRIAR_INDICE = re.compile(
+    r'^\s*CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+(?:IF\s+NOT\s+EXISTS\s+)?(\w+)',
+    re.IGNORECASE
+)
+_CHAVE_LOCK = 'schema_migrations'
+
+
+class Migracao(NamedTuple):
+    versao: int
+    nome: str
+    caminho: Path
+    background: bool
+    sem_transacao: bool
+
+
+class Migracoes:
+    """Aplica as migrações pendentes e dispara as de segundo plano (backfills e índices)"""
+
+    _em_segundo_plano: Set[int] = set()
+    _lock = threading.Lock()
+
+    @staticmethod
+    def diretorio() -> Path:
+        """Diretório das migrações (configurável por MIGRATIONS_DIR)"""
+        configurado = os.getenv('MIGRATIONS_DIR')
+        if configurado:
+            return Path(configurado)
+        return Path(__file__).resolve().parent.parent.parent / 'database' / 'migrations'
+
+    @classmethod
+    def listar_arquivos(cls) -> List[Migracao]:
+        """Lista as migrações disponíveis em disco, ordenadas pela versão"""
+        diretorio = cls.diretorio()
+        if not diretorio.is_dir():
+            return []
+
+        migracoes: Dict[int, Migracao] = {}
+        for caminho in diretorio.iterdir():
+            match = _PADRAO_ARQUIVO.match(caminho.name)
+            if not match:
+                continue
+            versao = int(match.group(1))
+            if versao in migracoes:
+                raise Exception(f"Versão de migração duplicada: {versao} ({caminho.name})")
+            with open(caminho, encoding='utf-8') as arquivo:
+                cabecalho = arquivo.readline().strip().lower()
+            migracoes[versao] = Migracao(
+                versao, match.group(2), caminho,
+                cabecalho == _CABECALHO_BACKGROUND, cabecalho == _CABECALHO_SEM_TRANSACAO
+            )
+        return [migracoes[v] for v in sorted(migracoes)]
+
+    @staticmethod
+    def versoes_aplicadas() -> Set[int]:
+        """Versões já registradas em schema_migrations (vazio se a tabela ainda não existe)"""
+        if not DatabaseConnection.table_exists('schema_migrations'):
+            return set()
+        rows = DatabaseConnection.execute_query("SELECT versao FROM schema_migrations", fetch_all=True)
+        return {row[0] for row in rows}
+
+    @classmethod
+    def aplicar_pendentes(cls) -> List[int]:
+        """
+        Aplica as migrações pendentes e inicia as de segundo plano que ainda não terminaram.
+
+        Quando tudo já foi aplicado, o custo é uma única consulta à chave primária
+        de schema_migrations. Retorna as versões aplicadas nesta chamada.
+        """
+        migracoes = cls.listar_arquivos()
+        if not migracoes:
+            return []
+
+        aplicadas = cls.versoes_aplicadas()
+        pendentes = [m for m in migracoes if m.versao not in aplicadas]
+        if not pendentes:
+            return []
+
+        aplicadas_agora: List[int] = []
+        sem_transacao: List[Migracao] = []
+        for migracao in pendentes:
+            if migracao.background:
+                cls._iniciar_segundo_plano([migracao.versao], f"backfill-{migracao.versao:03d}", cls._executar_backfill, migracao)
+                continue
+            if migracao.sem_transacao:
+                sem_transacao.append(migracao)
+                continue
+            if cls._aplicar(migracao):
+                aplicadas_agora.append(migracao.versao)
+
+        # Uma única thread, em ordem: builds CONCURRENTLY na mesma tabela não rodam em paralelo
+        if sem_transacao:
+            cls._iniciar_segundo_plano(
+                [m.versao for m in sem_transacao], f"migracoes-{sem_transacao[0].versao:03d}",
+                cls._executar_sem_transacao, sem_transacao
+            )
+
+        if aplicadas_agora:
+            DatabaseConnection.refresh_schema()
+        return aplicadas_agora
+
+    @classmethod
+    def _aplicar(cls, migracao: Migracao) -> bool:
+        """Aplica uma migração SQL em uma única transação; retorna False se outro processo já aplicou"""
+        with open(migracao.caminho, encoding='utf-8') as arquivo:
+            sql = arquivo.read()
+
+        inicio = time.monotonic()
+        with DatabaseConnection.transaction() as tx:
+            # Vários workers podem subir ao mesmo tempo: apenas um aplica cada versão
+            tx.bloquear(_CHAVE_LOCK)
+            cls._garantir_tabela(tx)
+            if cls._ja_aplicada(tx, migracao.versao):
+                return False
+
+            cursor = tx.conexao.cursor()
+            try:
+                cursor.execute(sql)
+            finally:
+                cursor.close()
+            cls._registrar(tx, migracao)
+
+        duracao_ms = (time.monotonic() - inicio) * 1000
+        print(f"[MIGRAÇÃO] {migracao.versao:03d}_{migracao.nome} aplicada ({duracao_ms:.0f} ms)")
+        return True
+
+    @classmethod
+    def _iniciar_segundo_plano(cls, versoes: List[int], nome: str, alvo: Callable[[Any], None], argumento: Any) -> None:
+        """Executa `alvo(argumento)` em uma thread daemon, sem bloquear a inicialização"""
+        with cls._lock:
+            if cls._em_segundo_plano.intersection(versoes):
+                return
+            cls._em_segundo_plano.update(versoes)
+
+        def executar() -> None:
+            try:
+                alvo(argumento)
+            finally:
+                with cls._lock:
+                    cls._em_segundo_plano.difference_update(versoes)
+
+        threading.Thread(target=executar, name=nome, daemon=True).start()
+
+    @classmethod
+    def _executar_backfill(cls, migracao: Migracao) -> None:
+        """Repete o UPDATE do arquivo, um lote por transação, até não restar linhas"""
+        pausa = float(os.getenv('MIGRATIONS_BACKFILL_PAUSA', '0.1'))
+        total = 0
+        try:
+            with open(migracao.caminho, encoding='utf-8') as arquivo:
+                sql = arquivo.read()
+
+            print(f"[MIGRAÇÃO] {migracao.versao:03d}_{migracao.nome} iniciada em segundo plano")
+            while True:
+                with DatabaseConnection.transaction() as tx:
+                    cursor = tx.conexao.cursor()
+                    try:
+                        cursor.execute(sql)
+                        alteradas = max(cursor.rowcount, 0)
+                    finally:
+                        cursor.close()
+                total += alteradas
+                if alteradas == 0:
+                    break
+                # Intervalo entre lotes para não competir com o tráfego do chão de fábrica
+                time.sleep(pausa)
+
+            with DatabaseConnection.transaction() as tx:
+                tx.bloquear(_CHAVE_LOCK)
+                cls._garantir_tabela(tx)
+                if not cls._ja_aplicada(tx, migracao.versao):
+                    cls._registrar(tx, migracao)
+            print(f"[MIGRAÇÃO] {migracao.versao:03d}_{migracao.nome} concluída ({total} registros atualizados)")
+        except Exception as e:
+            print(f"[AVISO] Backfill {migracao.versao:03d}_{migracao.nome} interrompido: {e}")
+
+    @classmethod
+    def _executar_sem_transacao(cls, migracoes: List[Migracao]) -> None:
+        """
+        Aplica, em ordem, migrações que não podem rodar em uma transação (CREATE/DROP INDEX
+        CONCURRENTLY). Usa uma conexão própria em autocommit, fora do pool: o build não
+        bloqueia escritas na tabela e a inicialização dos workers não espera por ele.
+        Uma migração que falha para no comando que falhou e é refeita por completo na
+        próxima inicialização (os comandos devem ser idempotentes); as seguintes são
+        aplicadas mesmo assim, então não devem depender das anteriores deste tipo.
+        """
+        for migracao in migracoes:
+            try:
+                inicio = time.monotonic()
+                if not cls._aplicar_sem_transacao(migracao):
+                    continue
+                duracao_ms = (time.monotonic() - inicio) * 1000
+                print(f"[MIGRAÇÃO] {migracao.versao:03d}_{migracao.nome} aplicada em segundo plano ({duracao_ms:.0f} ms)")
+            except Exception as e:
+                print(f"[AVISO] Migração {migracao.versao:03d}_{migracao.nome} interrompida: {e}")
+
+    @classmethod
+    def _aplicar_sem_transacao(cls, migracao: Migracao) -> bool:
+        """Executa os comandos da migração; retorna False se outro processo aplicou ou está aplicando"""
+        with open(migracao.caminho, encoding='utf-8') as arquivo:
+            comandos = _dividir_comandos(arquivo.read())
+
+        conexao = DatabaseConnection._criar_conexao()
+        try:
+            conexao.autocommit = True
+            cursor = conexao.cursor()
+            try:
+                # Lock de sessão por versão: outro worker que suba durante o build apenas segue
+                cursor.execute("SELECT pg_try_advisory_lock(hashtext(%s))", (f"{_CHAVE_LOCK}:{migracao.versao}",))
+                if not cursor.fetchone()[0]:
+                    return False
+                cursor.execute("SELECT to_regclass('schema_migrations') IS NOT NULL")
+                if cursor.fetchone()[0]:
+                    cursor.execute("SELECT 1 FROM schema_migrations WHERE versao = %s", (migracao.versao,))
+                    if cursor.fetchone() is not None:
+                        return False
+
+                grupo: List[str] = []
+                for comando in comandos + [None]:
+                    if comando is not None and not _PADRAO_CONCURRENTLY.search(comando):
+                        grupo.append(comando)
+                        continue
+                    if grupo:
+                        # Comandos comuns consecutivos: uma transação curta
+                        conexao.autocommit = False
+                        try:
+                            cursor.execute(';\n'.join(grupo))
+                            conexao.commit()
+                        except Exception:
+                            conexao.rollback()
+                            raise
+                        finally:
+                            conexao.autocommit = True
+                        grupo = []
+                    if comando is not None:
+                        cls._descartar_indice_invalido(cursor, comando)
+                        cursor.execute(comando)
+            finally:
+                cursor.close()
+        finally:
+            conexao.close()
+
+        with DatabaseConnection.transaction() as tx:
+            tx.bloquear(_CHAVE_LOCK)
+            cls._garantir_tabela(tx)
+            if not cls._ja_aplicada(tx, migracao.versao):
+                cls._registrar(tx, migracao)
+        return True
+
+    @staticmethod
+    def _descartar_indice_invalido(cursor, comando: str) -> None:
+        """Um CREATE INDEX CONCURRENTLY interrompido deixa o índice inválido, que IF NOT EXISTS pularia"""
+        match = _PADRAO_CRIAR_INDICE.match(comando)
+        if not match:
+            return
+        cursor.execute(
+            "SELECT 1 FROM pg_index WHERE indexrelid = to_regclass(%s) AND NOT indisvalid",
+            (match.group(1),)
+        )
+        if cursor.fetchone() is not None:
+            print(f"[AVISO] Índice {match.group(1)} inválido de uma execução anterior; recriando")
+            cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {match.group(1)}")
+
+    @staticmethod
+    def _garantir_tabela(tx) -> None:
+        cursor = tx.conexao.cursor()
+        try:
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    versao INTEGER PRIMARY KEY,
+                    nome TEXT NOT NULL,
+                    aplicada_em TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def _ja_aplicada(tx, versao: int) -> bool:
+        cursor = tx.conexao.cursor()
+        try:
+            cursor.execute("SELECT 1 FROM schema_migrations WHERE versao = %s", (versao,))
+            return cursor.fetchone() is not None
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def _registrar(tx, migracao: Migracao) -> None:
+        cursor = tx.conexao.cursor()
+        try:
+            cursor.execute(
+                "INSERT INTO schema_migrations (versao, nome) VALUES (%s, %s)",
+                (migracao.versao, migracao.nome)
+            )
+        finally:
+            cursor.close()
+
+    @classmethod
+    def status(cls) -> List[Dict[str, Any]]:
+        """Situação de cada migração conhecida (aplicada, pendente ou em execução)"""
+        aplicadas = cls.versoes_aplicadas()
+        with cls._lock:
+            em_execucao = set(cls._em_segundo_plano)
+        resultado = []
+        for migracao in cls.listar_arquivos():
+            if migracao.versao in aplicadas:
+                situacao = 'aplicada'
+            elif migracao.versao in em_execucao:
+                situacao = 'em_execucao'
+            else:
+                situacao = 'pendente'
+            resultado.append({
+                'versao': migracao.versao,
+                'nome': migracao.nome,
+                'background': migracao.background,
+                'sem_transacao': migracao.sem_transacao,
+                'situacao': situacao
+            })
+        return resultado
+
+
+def _dividir_comandos(sql: str) -> List[str]:
+    """Separa o script em comandos por ';', respeitando comentários, strings e corpos $$"""
+    comandos: List[str] = []
+    atual: List[str] = []
+    i, n = 0, len(sql)
+    while i < n:
+        c = sql[i]
+        if sql.startswith('--', i):
+            fim = sql.find('\n', i)
+            i = n if fim < 0 else fim + 1
+            continue
+        if c == "'":
+            fim = i + 1
+            while fim < n:
+                if sql[fim] == "'" and sql.startswith("''", fim):
+                    fim += 2
+                    continue
+                if sql[fim] == "'":
+                    break
+                fim += 1
+            atual.append(sql[i:fim + 1])
+            i = fim + 1
+            continue
+        if c == '$':
+            match = re.match(r'\$\w*\$', sql[i:])
+            if match:
+                marcador = match.group(0)
+                fim = sql.find(marcador, i + len(marcador))
+                fim = n if fim < 0 else fim + len(marcador)
+                atual.append(sql[i:fim])
+                i = fim
+                continue
+        if c == ';':
+            comando = ''.join(atual).strip()
+            if comando:
+                comandos.append(comando)
+            atual = []
+            i += 1
+            continue
+        atual.append(c)
+        i += 1
+    comando = ''.join(atual).strip()
+    if comando:
+        comandos.append(comando)
+    return comandos
@@ -3,6 +3,7 @@ Modelo para a entidade Modelo (Produto)
 """
 from typing import Dict, Any, Optional, List, Tuple
 from Server.models.database import DatabaseConnection
+from Server.models import cache
 
 
 class Modelo:
@@ -61,29 +62,27 @@ class Modelo:
             result = DatabaseConnection.execute_query(query, params, fetch_one=True)
             if result and isinstance(result, tuple) and len(result) > 0:
                 self.id = result[0]
+        cache.invalidar('modelos')
         return self
     
     @staticmethod
     def buscar_por_id(id: int) -> Optional['Modelo']:
-        """Busca um modelo pelo ID"""
-        query = "SELECT modelo_id, nome FROM modelos WHERE modelo_id = %s"
-        row = DatabaseConnection.execute_query(query, (id,), fetch_one=True)
-        if not row:
-            return None
-        return Modelo.from_row(row)
+        """Busca um modelo pelo ID (cache de referência)"""
+        return _cache_modelos.buscar('id', id)
     
     @staticmethod
     def buscar_por_codigo(codigo: str) -> Optional['Modelo']:
-        """Busca um modelo pelo código (nome)"""
-        query = "SELECT modelo_id, nome FROM modelos WHERE nome = %s"
-        row = DatabaseConnection.execute_query(query, (codigo,), fetch_one=True)
-        if not row:
-            return None
-        return Modelo.from_row(row)
+        """Busca um modelo pelo código (nome) (cache de referência)"""
+        return _cache_modelos.buscar('codigo', codigo)
     
     @staticmethod
     def listar_todos() -> List['Modelo']:
-        """Lista todos os modelos"""
+        """Lista todos os modelos (cache de referência)"""
+        return _cache_modelos.listar()
+    
+    @staticmethod
+    def _carregar_todos() -> List['Modelo']:
+        """Carrega todos os modelos do banco (usado pelo cache de referência)"""
         query = "SELECT modelo_id, nome FROM modelos ORDER BY nome"
         rows = DatabaseConnection.execute_query(query, fetch_all=True)
         if not rows or not isinstance(rows, list):
@@ -97,6 +96,7 @@ class Modelo:
         query = "DELETE FROM modelos WHERE modelo_id = %s"
         DatabaseConnection.execute_query(query, (self.id,))
         self.id = None
+        cache.invalidar('modelos')
     
     @staticmethod
     def criar(codigo: str, descricao: Optional[str] = None) -> 'Modelo':
@@ -118,6 +118,25 @@ class Modelo:
             print(f"Aviso: Não foi possível buscar produto por modelo_id: {e}")
             return None
     
+    @staticmethod
+    def buscar_produtos_por_modelos(modelo_ids: List[int]) -> Dict[int, int]:
+        """Busca o produto_id de vários modelos (produto_modelo) em uma única consulta"""
+        if not modelo_ids:
+            return {}
+        try:
+            query = """
+                SELECT DISTINCT ON (modelo_id) modelo_id, produto_id
+                FROM produto_modelo
+                WHERE modelo_id = ANY(%s)
+                ORDER BY modelo_id, produto_id
+            """
+            resultados = DatabaseConnection.execute_query(query, (list(modelo_ids),), fetch_all=True)
+            return {modelo_id: produto_id for modelo_id, produto_id in resultados or []}
+        except Exception as e:
+            # Se a tabela não existir, nenhum modelo tem produto
+            print(f"Aviso: Não foi possível buscar produtos por modelo_id: {e}")
+            return {}
+    
     @staticmethod
     def associar_produto(modelo_id: int, produto_id: int) -> None:
         """Associa um produto a um modelo na tabela produto_modelo"""
@@ -152,3 +171,13 @@ class Modelo:
         except Exception as e:
             print(f"Aviso: Não foi possível remover associação produto-modelo: {e}")
 
+
+
+_cache_modelos = cache.CatalogoReferencia(
+    'modelos',
+    carregar=Modelo._carregar_todos,
+    indices={
+        'id': lambda m: m.id,
+        'codigo': lambda m: m.codigo,
+    }
+)
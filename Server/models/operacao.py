@@ -1,5 +1,6 @@
 from typing import Dict, Any, Optional, List, Tuple
 from Server.models.database import DatabaseConnection
+from Server.models import cache
 
 
 class Operacao:
@@ -85,160 +86,112 @@ class Operacao:
 
     def salvar(self) -> None:
         """Salva a operação no banco de dados"""
-        # Verificar se a coluna nome existe
-        conn = DatabaseConnection.get_connection()
-        cursor = conn.cursor()
-        try:
-            cursor.execute("""
-                SELECT column_name 
-                FROM information_schema.columns 
-                WHERE table_schema = 'public' 
-                AND table_name = 'operacoes'
-                AND column_name = 'nome'
-            """)
-            tem_coluna_nome = cursor.fetchone() is not None
-            
-            if self.operacao_id is None:
-                if tem_coluna_nome:
-                    query = """
-                        INSERT INTO operacoes (codigo_operacao, nome, produto_id, modelo_id, sublinha_id, posto_id, peca_id)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s) RETURNING operacao_id
-                    """
-                    params = (
-                        self.codigo_operacao,
-                        self.nome or self.codigo_operacao,
-                        self.produto_id,
-                        self.modelo_id,
-                        self.sublinha_id,
-                        self.posto_id,
-                        self.peca_id
-                    )
-                else:
-                    query = """
-                        INSERT INTO operacoes (codigo_operacao, produto_id, modelo_id, sublinha_id, posto_id, peca_id)
-                        VALUES (%s, %s, %s, %s, %s, %s) RETURNING operacao_id
-                    """
-                    params = (
-                        self.codigo_operacao,
-                        self.produto_id,
-                        self.modelo_id,
-                        self.sublinha_id,
-                        self.posto_id,
-                        self.peca_id
-                    )
-                resultado = DatabaseConnection.execute_query(query, params, fetch_one=True)
-                if resultado:
-                    self.operacao_id = resultado[0]
-            else:
-                if tem_coluna_nome:
-                    query = """
-                        UPDATE operacoes 
-                        SET codigo_operacao = %s, nome = %s, produto_id = %s, modelo_id = %s, 
-                            sublinha_id = %s, posto_id = %s, peca_id = %s
-                        WHERE operacao_id = %s
-                    """
-                    params = (
-                        self.codigo_operacao,
-                        self.nome or self.codigo_operacao,
-                        self.produto_id,
-                        self.modelo_id,
-                        self.sublinha_id,
-                        self.posto_id,
-                        self.peca_id,
-                        self.operacao_id
-                    )
-                else:
-                    query = """
-                        UPDATE operacoes 
-                        SET codigo_operacao = %s, produto_id = %s, modelo_id = %s, 
-                            sublinha_id = %s, posto_id = %s, peca_id = %s
-                        WHERE operacao_id = %s
-                    """
-                    params = (
-                        self.codigo_operacao,
-                        self.produto_id,
-                        self.modelo_id,
-                        self.sublinha_id,
-                        self.posto_id,
-                        self.peca_id,
-                        self.operacao_id
-                    )
-                DatabaseConnection.execute_query(query, params)
-        finally:
-            cursor.close()
-            conn.close()
-
-    @classmethod
-    def buscar_por_id(cls, operacao_id: int) -> Optional['Operacao']:
-        """Busca uma operação pelo ID"""
-        # Verificar se a coluna nome existe
-        conn = DatabaseConnection.get_connection()
-        cursor = conn.cursor()
-        try:
-            cursor.execute("""
-                SELECT column_name 
-                FROM information_schema.columns 
-                WHERE table_schema = 'public' 
-                AND table_name = 'operacoes'
-                AND column_name = 'nome'
-            """)
-            tem_coluna_nome = cursor.fetchone() is not None
-            
+        tem_coluna_nome = DatabaseConnection.column_exists('operacoes', 'nome')
+        
+        if self.operacao_id is None:
             if tem_coluna_nome:
                 query = """
-                    SELECT operacao_id, codigo_operacao, nome, produto_id, modelo_id, 
-                           sublinha_id, posto_id, peca_id
-                    FROM operacoes WHERE operacao_id = %s
+                    INSERT INTO operacoes (codigo_operacao, nome, produto_id, modelo_id, sublinha_id, posto_id, peca_id)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s) RETURNING operacao_id
                 """
+                params = (
+                    self.codigo_operacao,
+                    self.nome or self.codigo_operacao,
+                    self.produto_id,
+                    self.modelo_id,
+                    self.sublinha_id,
+                    self.posto_id,
+                    self.peca_id
+                )
             else:
                 query = """
-                    SELECT operacao_id, codigo_operacao, produto_id, modelo_id, 
-                           sublinha_id, posto_id, peca_id
-                    FROM operacoes WHERE operacao_id = %s
+                    INSERT INTO operacoes (codigo_operacao, produto_id, modelo_id, sublinha_id, posto_id, peca_id)
+                    VALUES (%s, %s, %s, %s, %s, %s) RETURNING operacao_id
                 """
-            resultado = DatabaseConnection.execute_query(query, (operacao_id,), fetch_one=True)
-            if not resultado:
-                return None
-            return cls.from_row(resultado, tem_coluna_nome)
-        finally:
-            cursor.close()
-            conn.close()
-
-    @classmethod
-    def listar_todas(cls) -> List['Operacao']:
-        """Lista todas as operações"""
-        # Verificar se a coluna nome existe
-        conn = DatabaseConnection.get_connection()
-        cursor = conn.cursor()
-        try:
-            cursor.execute("""
-                SELECT column_name 
-                FROM information_schema.columns 
-                WHERE table_schema = 'public' 
-                AND table_name = 'operacoes'
-                AND column_name = 'nome'
-            """)
-            tem_coluna_nome = cursor.fetchone() is not None
-            
+                params = (
+                    self.codigo_operacao,
+                    self.produto_id,
+                    self.modelo_id,
+                    self.sublinha_id,
+                    self.posto_id,
+                    self.peca_id
+                )
+            resultado = DatabaseConnection.execute_query(query, params, fetch_one=True)
+            if resultado:
+                self.operacao_id = resultado[0]
+        else:
             if tem_coluna_nome:
                 query = """
-                    SELECT operacao_id, codigo_operacao, nome, produto_id, modelo_id, 
-                           sublinha_id, posto_id, peca_id
-                    FROM operacoes ORDER BY nome, codigo_operacao
+                    UPDATE operacoes 
+                    SET codigo_operacao = %s, nome = %s, produto_id = %s, modelo_id = %s, 
+                        sublinha_id = %s, posto_id = %s, peca_id = %s
+                    WHERE operacao_id = %s
                 """
+                params = (
+                    self.codigo_operacao,
+                    self.nome or self.codigo_operacao,
+                    self.produto_id,
+                    self.modelo_id,
+                    self.sublinha_id,
+                    self.posto_id,
+                    self.peca_id,
+                    self.operacao_id
+                )
             else:
                 query = """
-                    SELECT operacao_id, codigo_operacao, produto_id, modelo_id, 
-                           sublinha_id, posto_id, peca_id
-                    FROM operacoes ORDER BY codigo_operacao
+                    UPDATE operacoes 
+                    SET codigo_operacao = %s, produto_id = %s, modelo_id = %s, 
+                        sublinha_id = %s, posto_id = %s, peca_id = %s
+                    WHERE operacao_id = %s
                 """
-            resultados = DatabaseConnection.execute_query(query, fetch_all=True)
-            if not resultados:
-                return []
-            return [cls.from_row(row, tem_coluna_nome) for row in resultados]
-        finally:
-            cursor.close()
-            conn.close()
+                params = (
+                    self.codigo_operacao,
+                    self.produto_id,
+                    self.modelo_id,
+                    self.sublinha_id,
+                    self.posto_id,
+                    self.peca_id,
+                    self.operacao_id
+                )
+            DatabaseConnection.execute_query(query, params)
+        cache.invalidar('operacoes')
+
+    @classmethod
+    def buscar_por_id(cls, operacao_id: int) -> Optional['Operacao']:
+        """Busca uma operação pelo ID (cache de referência)"""
+        return _cache_operacoes.buscar('id', operacao_id)
+
+    @classmethod
+    def buscar_por_codigo(cls, codigo_operacao: str) -> Optional['Operacao']:
+        """Busca uma operação pelo código (cache de referência)"""
+        return _cache_operacoes.buscar('codigo', codigo_operacao)
+
+    @classmethod
+    def listar_todas(cls) -> List['Operacao']:
+        """Lista todas as operações (cache de referência)"""
+        return _cache_operacoes.listar()
+
+    @classmethod
+    def _carregar_todas(cls) -> List['Operacao']:
+        """Carrega todas as operações do banco (usado pelo cache de referência)"""
+        tem_coluna_nome = DatabaseConnection.column_exists('operacoes', 'nome')
+        
+        if tem_coluna_nome:
+            query = """
+                SELECT operacao_id, codigo_operacao, nome, produto_id, modelo_id, 
+                       sublinha_id, posto_id, peca_id
+                FROM operacoes ORDER BY nome, codigo_operacao
+            """
+        else:
+            query = """
+                SELECT operacao_id, codigo_operacao, produto_id, modelo_id, 
+                       sublinha_id, posto_id, peca_id
+                FROM operacoes ORDER BY codigo_operacao
+            """
+        resultados = DatabaseConnection.execute_query(query, fetch_all=True)
+        if not resultados:
+            return []
+        return [cls.from_row(row, tem_coluna_nome) for row in resultados]
 
     def deletar(self) -> None:
         """Deleta a operação do banco de dados"""
@@ -247,6 +200,7 @@ class Operacao:
         query = "DELETE FROM operacoes WHERE operacao_id = %s"
         DatabaseConnection.execute_query(query, (self.operacao_id,))
         self.operacao_id = None
+        cache.invalidar('operacoes')
 
     @classmethod
     def criar(
@@ -272,3 +226,13 @@ class Operacao:
         operacao.salvar()
         return operacao
 
+
+_cache_operacoes = cache.CatalogoReferencia(
+    'operacoes',
+    carregar=Operacao._carregar_todas,
+    indices={
+        'id': lambda o: o.operacao_id,
+        'codigo': lambda o: o.codigo_operacao,
+        'posto_id': lambda o: o.posto_id,
+    }
+)
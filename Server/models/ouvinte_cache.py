@@ -0,0 +1,108 @@
+"""
+Thread que escuta o canal cache_referencia do PostgreSQL (LISTEN/NOTIFY)
+
+Os triggers da migração 005 publicam o nome da tabela alterada a cada comando
+confirmado em uma tabela de referência. Cada processo do backend mantém uma
+conexão dedicada (fora do pool) em LISTEN e invalida o cache local ao receber a
+notificação, de modo que vários workers enxergam a mesma versão dos dados.
+"""
+import os
+import select
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from Server.models import cache
+from Server.models.database import DatabaseConnection
+
+CANAL = 'cache_referencia'
+
+
+class OuvinteCache:
+    """Mantém um LISTEN por processo e repassa as notificações para o cache"""
+
+    _thread: Optional[threading.Thread] = None
+    _parar = threading.Event()
+    _lock = threading.Lock()
+    _stats: Dict[str, Any] = {
+        'conectado': False,
+        'notificacoes': 0,
+        'reconexoes': 0,
+        'ultima_notificacao': None,
+        'ultimo_erro': None,
+    }
+
+    @staticmethod
+    def habilitado() -> bool:
+        """Permite desligar o ouvinte por CACHE_NOTIFY=0 (ex.: scripts de linha de comando)"""
+        return os.getenv('CACHE_NOTIFY', '1').lower() not in ('0', 'false', 'nao', 'não')
+
+    @classmethod
+    def iniciar(cls) -> None:
+        """Inicia a thread do ouvinte (idempotente)"""
+        if not cls.habilitado():
+            return
+        with cls._lock:
+            if cls._thread is not None and cls._thread.is_alive():
+                return
+            cls._parar.clear()
+            cls._thread = threading.Thread(target=cls._executar, name='ouvinte-cache', daemon=True)
+            cls._thread.start()
+
+    @classmethod
+    def parar(cls) -> None:
+        """Sinaliza a thread para encerrar no próximo intervalo de espera"""
+        cls._parar.set()
+
+    @classmethod
+    def estatisticas(cls) -> Dict[str, Any]:
+        with cls._lock:
+            return dict(cls._stats)
+
+    @classmethod
+    def _executar(cls) -> None:
+        intervalo = float(os.getenv('CACHE_NOTIFY_INTERVALO', '5'))
+        espera_reconexao = 1.0
+        while not cls._parar.is_set():
+            conexao = None
+            try:
+                conexao = DatabaseConnection._criar_conexao()
+                conexao.autocommit = True
+                cursor = conexao.cursor()
+                cursor.execute(f"LISTEN {CANAL}")
+                cursor.close()
+
+                with cls._lock:
+                    cls._stats['conectado'] = True
+                # Notificações emitidas antes do LISTEN (ou durante uma queda) foram perdidas
+                cache.invalidar_todos()
+                espera_reconexao = 1.0
+
+                while not cls._parar.is_set():
+                    if select.select([conexao], [], [], intervalo) == ([], [], []):
+                        continue
+                    conexao.poll()
+                    tabelas = set()
+                    while conexao.notifies:
+                        tabelas.add(conexao.notifies.pop(0).payload)
+                    if tabelas:
+                        cache.invalidar_local(*tabelas)
+                        with cls._lock:
+                            cls._stats['notificacoes'] += len(tabelas)
+                            cls._stats['ultima_notificacao'] = time.time()
+            except Exception as e:
+                with cls._lock:
+                    cls._stats['conectado'] = False
+                    cls._stats['reconexoes'] += 1
+                    cls._stats['ultimo_erro'] = str(e)
+                print(f"[AVISO] Ouvinte do cache desconectado: {e}. Nova tentativa em {espera_reconexao:.0f}s")
+                cls._parar.wait(espera_reconexao)
+                espera_reconexao = min(espera_reconexao * 2, 60.0)
+            finally:
+                if conexao is not None:
+                    try:
+                        conexao.close()
+                    except Exception:
+                        pass
+        with cls._lock:
+            cls._stats['conectado'] = False
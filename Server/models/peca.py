@@ -1,5 +1,6 @@
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Iterable, Optional, List
 from Server.models.database import DatabaseConnection
+from Server.models import cache
 
 class Peca:
     """Modelo que representa uma peça de um modelo"""
@@ -45,6 +46,7 @@ class Peca:
             # Criar relação na tabela modelo_pecas se tiver modelo_id
             if self.modelo_id and self.id:
                 self._criar_relacao_modelo()
+            cache.invalidar('pecas')
         else:
             query = "UPDATE pecas SET codigo = %s, nome = %s WHERE peca_id = %s"
             params = (self.codigo, self.nome, self.id)
@@ -53,6 +55,7 @@ class Peca:
             # Atualizar relação se modelo_id mudou
             if self.modelo_id and self.id:
                 self._criar_relacao_modelo()
+            cache.invalidar('pecas')
     
     def _criar_relacao_modelo(self) -> None:
         """Cria ou atualiza a relação entre peça e modelo na tabela modelo_pecas"""
@@ -71,52 +74,63 @@ class Peca:
 
     @classmethod
     def buscar_por_id(cls, id: int) -> Optional['Peca']:
-        """Busca uma peça pelo Id"""
-        query = "SELECT peca_id, codigo, nome FROM pecas WHERE peca_id = %s"
-        resultado = DatabaseConnection.execute_query(query, (id,), fetch_one=True)
-
-        if not resultado:
-            return None
-        
-        return cls(
-            id=resultado[0],
-            modelo_id=0,  # modelo_id não existe no banco, mantido para compatibilidade
-            codigo=resultado[1],
-            nome=resultado[2]
-        )
+        """Busca uma peça pelo Id (cache de referência)"""
+        return _cache_pecas.buscar('id', id)
+    
+    @classmethod
+    def buscar_por_codigo_ou_nome(cls, identificador: str) -> Optional['Peca']:
+        """Busca uma peça pelo código ou, se não encontrar, pelo nome (sem diferenciar maiúsculas)"""
+        peca = _cache_pecas.buscar('codigo', identificador)
+        if not peca:
+            peca = _cache_pecas.buscar('nome', identificador) or _cache_pecas.buscar('nome_lower', identificador.lower())
+        return peca
     
     @classmethod
     def buscar_por_modelo_id(cls, modelo_id: int) -> List['Peca']:
         """Busca peças pelo modelo_id através da tabela modelo_pecas"""
+        return cls.buscar_por_modelos([modelo_id]).get(modelo_id, [])
+    
+    @classmethod
+    def buscar_por_modelos(cls, modelo_ids: Iterable[int]) -> Dict[int, List['Peca']]:
+        """
+        Busca as peças de vários modelos em uma única consulta (modelo_pecas).
+        Retorna modelo_id -> peças ordenadas por código; modelos sem peças ficam com lista vazia.
+        """
+        ids = sorted({modelo_id for modelo_id in modelo_ids if modelo_id is not None})
+        pecas_por_modelo: Dict[int, List['Peca']] = {modelo_id: [] for modelo_id in ids}
+        if not ids:
+            return pecas_por_modelo
         try:
-            # Buscar através da tabela de relacionamento modelo_pecas
             query = """
-                SELECT p.peca_id, p.codigo, p.nome 
+                SELECT mp.modelo_id, p.peca_id, p.codigo, p.nome 
                 FROM pecas p
                 INNER JOIN modelo_pecas mp ON p.peca_id = mp.peca_id
-                WHERE mp.modelo_id = %s
-                ORDER BY p.codigo
+                WHERE mp.modelo_id = ANY(%s)
+                ORDER BY mp.modelo_id, p.codigo
             """
-            resultados = DatabaseConnection.execute_query(query, (modelo_id,), fetch_all=True)
+            resultados = DatabaseConnection.execute_query(query, (ids,), fetch_all=True)
 
-            pecas = []
-            if resultados:
-                for resultado in resultados:
-                    pecas.append(cls(
-                        id=resultado[0],
-                        modelo_id=modelo_id,
-                        codigo=resultado[1],
-                        nome=resultado[2]
-                    ))
-            return pecas
+            for modelo_id, peca_id, codigo, nome in resultados or []:
+                pecas_por_modelo[modelo_id].append(cls(
+                    id=peca_id,
+                    modelo_id=modelo_id,
+                    codigo=codigo,
+                    nome=nome
+                ))
+            return pecas_por_modelo
         except Exception as e:
-            # Se a tabela modelo_pecas não existir, retornar lista vazia
+            # Se a tabela modelo_pecas não existir, retornar listas vazias
             print(f"Aviso: Não foi possível buscar peças por modelo_id: {e}")
-            return []
+            return {modelo_id: [] for modelo_id in ids}
     
     @classmethod
     def listar_todas(cls) -> List['Peca']:
-        """Lista todas as peças"""
+        """Lista todas as peças (cache de referência)"""
+        return _cache_pecas.listar()
+    
+    @classmethod
+    def _carregar_todas(cls) -> List['Peca']:
+        """Carrega todas as peças do banco (usado pelo cache de referência)"""
         query = "SELECT peca_id, codigo, nome FROM pecas ORDER BY codigo"
         resultados = DatabaseConnection.execute_query(query, fetch_all=True)
 
@@ -139,6 +153,7 @@ class Peca:
         query = "DELETE FROM pecas WHERE peca_id = %s"
         DatabaseConnection.execute_query(query, (self.id,))
         self.id = None
+        cache.invalidar('pecas')
 
     @classmethod
     def deletar_por_modelo_id(cls, modelo_id: int) -> None:
@@ -156,4 +171,16 @@ class Peca:
         """Criar uma nova peça"""
         peca = cls(modelo_id=modelo_id, codigo=codigo, nome=nome)
         peca.salvar()
-        return peca
\ No newline at end of file
+        return peca
+
+
+_cache_pecas = cache.CatalogoReferencia(
+    'pecas',
+    carregar=Peca._carregar_todas,
+    indices={
+        'id': lambda p: p.id,
+        'codigo': lambda p: p.codigo,
+        'nome': lambda p: p.nome,
+        'nome_lower': lambda p: p.nome.lower() if p.nome else None,
+    }
+)
@@ -3,6 +3,7 @@ Modelo para a entidade Posto
 """
 from typing import Dict, Any, Optional, List, Tuple
 from Server.models.database import DatabaseConnection
+from Server.models import cache
 
 
 class Posto:
@@ -57,20 +58,27 @@ class Posto:
             result = DatabaseConnection.execute_query(query, params)
             if isinstance(result, int):
                 self.posto_id = result
+        cache.invalidar('postos')
         return self
     
     @staticmethod
     def buscar_por_id(posto_id: int) -> Optional['Posto']:
-        """Busca um posto pelo ID"""
-        query = "SELECT posto_id, nome, sublinha_id, toten_id FROM postos WHERE posto_id = %s"
-        row = DatabaseConnection.execute_query(query, (posto_id,), fetch_one=True)
-        if not row:
-            return None
-        return Posto.from_row(row)
+        """Busca um posto pelo ID (cache de referência)"""
+        return _cache_postos.buscar('id', posto_id)
+    
+    @staticmethod
+    def buscar_por_nome(nome: str) -> Optional['Posto']:
+        """Busca um posto pelo nome (cache de referência)"""
+        return _cache_postos.buscar('nome', nome)
     
     @staticmethod
     def listar_todos() -> List['Posto']:
-        """Lista todos os postos"""
+        """Lista todos os postos (cache de referência)"""
+        return _cache_postos.listar()
+    
+    @staticmethod
+    def _carregar_todos() -> List['Posto']:
+        """Carrega todos os postos do banco (usado pelo cache de referência)"""
         query = "SELECT posto_id, nome, sublinha_id, toten_id FROM postos ORDER BY nome"
         rows = DatabaseConnection.execute_query(query, fetch_all=True)
         if not rows or not isinstance(rows, list):
@@ -79,12 +87,8 @@ class Posto:
     
     @staticmethod
     def buscar_por_sublinha(sublinha_id: int) -> List['Posto']:
-        """Lista postos por sublinha"""
-        query = "SELECT posto_id, nome, sublinha_id, toten_id FROM postos WHERE sublinha_id = %s ORDER BY nome"
-        rows = DatabaseConnection.execute_query(query, (sublinha_id,), fetch_all=True)
-        if not rows or not isinstance(rows, list):
-            return []
-        return [Posto.from_row(row) for row in rows]
+        """Lista postos por sublinha (cache de referência)"""
+        return _cache_postos.filtrar('sublinha_id', sublinha_id)
     
     @staticmethod
     def buscar_por_toten(toten_id: int) -> List['Posto']:
@@ -102,9 +106,21 @@ class Posto:
         query = "DELETE FROM postos WHERE posto_id = %s"
         DatabaseConnection.execute_query(query, (self.posto_id,))
         self.posto_id = None
+        cache.invalidar('postos')
     
     @staticmethod
     def criar(nome: str, sublinha_id: int, toten_id: int) -> 'Posto':
         """Método estático para criar um novo posto"""
         posto = Posto(nome=nome, sublinha_id=sublinha_id, toten_id=toten_id)
         return posto.save()
+
+
+_cache_postos = cache.CatalogoReferencia(
+    'postos',
+    carregar=Posto._carregar_todos,
+    indices={
+        'id': lambda p: p.posto_id,
+        'nome': lambda p: p.nome,
+        'sublinha_id': lambda p: p.sublinha_id,
+    }
+)
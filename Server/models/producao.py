@@ -2,6 +2,7 @@
 Modelo para a entidade ProducaoRegistro
 """
 from typing import Optional, List, Tuple, Any
+from Server.models import cache
 from Server.models.database import DatabaseConnection
 from datetime import datetime, time, date
 try:
@@ -302,8 +303,7 @@ class ProducaoRegistro:
                 cursor.execute(query, (registro_id,))
                 row = cursor.fetchone()
             elif posto and funcionario_matricula:
-                postos = Posto.listar_todos()
-                posto_obj = next((p for p in postos if p.nome == posto), None)
+                posto_obj = Posto.buscar_por_nome(posto)
                 if not posto_obj:
                     return None
                 
@@ -336,8 +336,7 @@ class ProducaoRegistro:
         from Server.models.posto import Posto
         from Server.models.funcionario import Funcionario
         
-        postos = Posto.listar_todos()
-        posto_obj = next((p for p in postos if p.nome == posto), None)
+        posto_obj = Posto.buscar_por_nome(posto)
         if not posto_obj:
             return False
         
@@ -381,12 +380,8 @@ class ProducaoRegistro:
                 query += " AND data_inicio = %s"
                 params.append(data)
             if posto:
-                from Server.models.posto import Posto
-                postos = Posto.listar_todos()
-                posto_obj = next((p for p in postos if p.nome == posto), None)
-                if posto_obj:
-                    query += " AND posto_id = %s"
-                    params.append(posto_obj.posto_id)
+                query += " AND posto_id = ANY(ARRAY(SELECT posto_id FROM postos WHERE nome = %s))"
+                params.append(posto)
             if operacao_id is not None:
                 query += " AND operacao_id = %s"
                 params.append(operacao_id)
@@ -420,12 +415,8 @@ class ProducaoRegistro:
             query += " AND data_inicio = %s"
             params.append(data)
         if posto:
-            from Server.models.posto import Posto
-            postos = Posto.listar_todos()
-            posto_obj = next((p for p in postos if p.nome == posto), None)
-            if posto_obj:
-                query += " AND posto_id = %s"
-                params.append(posto_obj.posto_id)
+            query += " AND posto_id = ANY(ARRAY(SELECT posto_id FROM postos WHERE nome = %s))"
+            params.append(posto)
         if operacao_id is not None:
             query += " AND operacao_id = %s"
             params.append(operacao_id)
@@ -436,6 +427,66 @@ class ProducaoRegistro:
             return int(count) if count is not None else 0
         return 0
     
+    @staticmethod
+    def registrar_entrada(
+        posto: str,
+        funcionario_matricula: str,
+        modelo_codigo: str,
+        inicio: str,
+        operacao_id: Optional[int] = None,
+        peca_id: Optional[int] = None,
+        codigo_producao: Optional[str] = None,
+        quantidade: Optional[int] = None,
+        dispositivo_nome: Optional[str] = None
+    ) -> Tuple[str, Optional[int], Optional[datetime]]:
+        """
+        Abre um registro em uma única ida ao banco (função registrar_entrada_producao).
+
+        Retorna (status, registro_id, inicio); status é 'ok', 'registro_aberto'
+        (id e início do registro que já estava aberto - garantido pelo índice único
+        parcial), 'posto_nao_encontrado', 'funcionario_nao_encontrado' ou
+        'modelo_nao_encontrado'.
+        """
+        # SELECT *: até a migração 008 terminar (em segundo plano, após os índices), a função
+        # em uso é a da 007, que retorna apenas (status, registro_id); o início fica None
+        query = "SELECT * FROM registrar_entrada_producao(%s, %s, %s, CAST(%s AS TIMESTAMP), %s, %s, %s, %s, %s)"
+        row = DatabaseConnection.execute_query(
+            query,
+            (posto, funcionario_matricula, modelo_codigo, inicio, operacao_id, peca_id,
+             codigo_producao, quantidade, dispositivo_nome),
+            fetch_one=True
+        )
+        if not row:
+            raise Exception("Falha ao registrar entrada: a função não retornou resultado")
+        return row[0], row[1], row[2] if len(row) > 2 else None
+    
+    @staticmethod
+    def registrar_saida(
+        fim: str,
+        registro_id: Optional[int] = None,
+        posto: Optional[str] = None,
+        funcionario_matricula: Optional[str] = None,
+        quantidade: Optional[int] = None
+    ) -> Tuple[str, Optional[int], Optional[int], Optional[int]]:
+        """
+        Fecha o registro aberto em uma única ida ao banco (função registrar_saida_producao).
+
+        Retorna (status, registro_id, duracao_minutos, quantidade); status é 'ok'
+        ou 'nao_encontrado'.
+        """
+        query = "SELECT status, registro_id, duracao_minutos, quantidade FROM registrar_saida_producao(%s, %s, %s, CAST(%s AS TIMESTAMP), %s)"
+        row = DatabaseConnection.execute_query(
+            query,
+            (registro_id, posto, funcionario_matricula, fim, quantidade),
+            fetch_one=True
+        )
+        if not row:
+            raise Exception("Falha ao registrar saída: a função não retornou resultado")
+        if row[0] == 'ok':
+            # O registro encerrado passa a contar na listagem (totais em cache)
+            cache.invalidar('registros_producao', 'registros_encerrados')
+        return row[0], row[1], row[2], row[3]
+    
     @staticmethod
     def deletar_por_id(registro_id: int) -> bool:
         """Deleta um registro de produção pelo ID"""
@@ -449,6 +500,7 @@ class ProducaoRegistro:
             query = "DELETE FROM registros_producao WHERE registro_id = %s"
             cursor.execute(query, (registro_id,))
             conn.commit()
+            cache.invalidar('registros_producao', 'registros_encerrados')
             return cursor.rowcount > 0
         except Exception as e:
             conn.rollback()
@@ -475,8 +527,7 @@ class ProducaoRegistro:
         from Server.models.funcionario import Funcionario
         from Server.models.modelo import Modelo
         
-        postos = Posto.listar_todos()
-        posto_obj = next((p for p in postos if p.nome == posto), None)
+        posto_obj = Posto.buscar_por_nome(posto)
         if not posto_obj:
             raise Exception(f"Posto '{posto}' não encontrado")
         
@@ -1,4 +1,5 @@
 from Server.models.database import DatabaseConnection
+from Server.models import cache
 from typing import Dict, Any, Optional, List
 
 class Produto:
@@ -31,9 +32,14 @@ class Produto:
             query = "UPDATE produtos SET nome = %s WHERE produto_id = %s"
             params = (self.nome, self.id)
             DatabaseConnection.execute_query(query, params)
+        cache.invalidar('produtos')
 
     @classmethod
     def listarTodos(cls) -> List['Produto']:
+        return _cache_produtos.listar()
+    
+    @classmethod
+    def _carregar_todos(cls) -> List['Produto']:
         query = "SELECT produto_id, nome FROM produtos ORDER BY nome"
         resultados = DatabaseConnection.execute_query(query, fetch_all=True)
 
@@ -48,21 +54,11 @@ class Produto:
     
     @classmethod
     def buscarNome(cls, nome: str) -> Optional['Produto']:
-        query = "SELECT produto_id, nome FROM produtos WHERE nome = %s"
-        resultado = DatabaseConnection.execute_query(query, (nome,), fetch_one=True)
-        
-        if resultado:
-            return cls(id=resultado[0], nome=resultado[1])
-        return None
+        return _cache_produtos.buscar('nome', nome)
     
     @classmethod
     def buscarId(cls, produto_id: int) -> Optional['Produto']:
-        query = "SELECT produto_id, nome FROM produtos WHERE produto_id = %s"
-        resultado = DatabaseConnection.execute_query(query, (produto_id,), fetch_one=True)
-        
-        if resultado:
-            return cls(id=resultado[0], nome=resultado[1])
-        return None
+        return _cache_produtos.buscar('id', produto_id)
     
     def deletar(self) -> None:
         if self.id is None:
@@ -73,10 +69,21 @@ class Produto:
             query = "DELETE FROM produtos WHERE produto_id = %s"
             DatabaseConnection.execute_query(query, (produto_id,))
             self.id = None
+            cache.invalidar('produtos')
         except ValueError as e:
             raise e
         except Exception as e:
             raise RuntimeError(f'Erro ao deletar produto ID {produto_id}: {e}')
 
 
-    
\ No newline at end of file
+    
+
+
+_cache_produtos = cache.CatalogoReferencia(
+    'produtos',
+    carregar=Produto._carregar_todos,
+    indices={
+        'id': lambda p: p.id,
+        'nome': lambda p: p.nome,
+    }
+)
@@ -1,5 +1,6 @@
 from typing import Dict, Any, Optional, List, Tuple
 from datetime import datetime
+from Server.models import cache
 from Server.models.database import DatabaseConnection
 
 
@@ -14,26 +15,7 @@ class RegistroProducao:
     @staticmethod
     def verificar_coluna_nome_operacao() -> bool:
         """Verifica se a coluna nome existe na tabela operacoes"""
-        conn = None
-        cursor = None
-        try:
-            conn = DatabaseConnection.get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                SELECT column_name 
-                FROM information_schema.columns 
-                WHERE table_schema = 'public' 
-                AND table_name = 'operacoes'
-                AND column_name = 'nome'
-            """)
-            
-            return cursor.fetchone() is not None
-        finally:
-            if cursor:
-                cursor.close()
-            if conn:
-                conn.close()
+        return DatabaseConnection.column_exists('operacoes', 'nome')
     
     @staticmethod
     def contar_registros(
@@ -69,23 +51,35 @@ class RegistroProducao:
                 conn.close()
     
     @staticmethod
-    def buscar_registros_com_relacionamentos(
-        where_clause: str, 
-        params: List[Any], 
-        limit: int, 
+    def estimar_total() -> Optional[int]:
+        """
+        Estimativa do total de linhas pelas estatísticas do planner (pg_class.reltuples),
+        sem percorrer a tabela. Retorna None se a tabela ainda não foi analisada.
+        """
+        row = DatabaseConnection.execute_query(
+            "SELECT reltuples::BIGINT FROM pg_class WHERE oid = 'registros_producao'::regclass",
+            fetch_one=True
+        )
+        if not row or row[0] is None or row[0] < 0:
+            return None
+        return int(row[0])
+    
+    @staticmethod
+    def montar_consulta_pagina(
+        where_clause: str,
+        params: List[Any],
+        limit: int,
         offset: int,
-        tem_coluna_nome_operacao: bool
-    ) -> List[Tuple]:
-        """Busca registros com todos os relacionamentos via JOINs"""
-        conn = None
-        cursor = None
-        try:
-            conn = DatabaseConnection.get_connection()
-            cursor = conn.cursor()
-            
-            operacao_nome_select = "o.nome" if tem_coluna_nome_operacao else "o.codigo_operacao"
-            
-            query = f"""
+        tem_coluna_nome_operacao: bool,
+        antes_de: Optional[int] = None
+    ) -> Tuple[str, Tuple]:
+        """Consulta e parâmetros de uma página da listagem (também usada no EXPLAIN de verificação)"""
+        operacao_nome_select = "o.nome" if tem_coluna_nome_operacao else "o.codigo_operacao"
+        
+        # A página é montada primeiro (CTE pagina) e os agregados de totens/peças são
+        # calculados uma vez por operação da página (GROUP BY operacao_id), não por linha
+        query = f"""
+            WITH pagina AS (
                 SELECT 
                     r.registro_id,
                     r.posto_id,
@@ -101,68 +95,133 @@ class RegistroProducao:
                     r.data_inicio,
                     r.hora_inicio,
                     r.mes_ano,
+                    r.dispositivo_nome,
                     -- Funcionário
                     f.funcionario_id as f_id,
                     f.nome as f_nome,
                     f.matricula as f_matricula,
-                    f.turno as f_turno,
-                    -- Posto
-                    p.posto_id as p_id,
-                    p.nome as p_nome,
-                    p.toten_id as p_toten_id,
-                    -- Modelo
-                    m.modelo_id as m_id,
-                    m.nome as m_nome,
-                    -- Operação
-                    o.operacao_id as o_id,
-                    o.codigo_operacao as o_codigo,
-                    {operacao_nome_select} as o_nome,
-                    o.produto_id as o_produto_id,
-                    -- Produto
-                    pr.produto_id as pr_id,
-                    pr.nome as pr_nome,
-                    -- Peça do registro
-                    pc.peca_id as pc_id,
-                    pc.codigo as pc_codigo,
-                    pc.nome as pc_nome,
-                    -- Totem da operação (nome do dispositivo adicionado na operação)
-                    (SELECT STRING_AGG(DISTINCT ot.toten_nome, ', ') 
-                     FROM operacao_totens ot 
-                     WHERE ot.operacao_id = r.operacao_id) as o_toten_nome,
-                    -- Nome do dispositivo salvo diretamente no registro
-                    r.dispositivo_nome as r_dispositivo_nome,
-                    -- Todas as peças da operação (JSON array)
-                    (SELECT COALESCE(JSON_AGG(JSON_BUILD_OBJECT(
-                        'id', pec.peca_id,
-                        'codigo', pec.codigo,
-                        'nome', pec.nome
-                    )), '[]'::json)
-                     FROM operacao_pecas op_pec
-                     INNER JOIN pecas pec ON op_pec.peca_id = pec.peca_id
-                     WHERE op_pec.operacao_id = r.operacao_id) as operacao_pecas_json,
-                    -- Todos os totens da operação (JSON array)
-                    (SELECT COALESCE(JSON_AGG(JSON_BUILD_OBJECT(
-                        'nome', ot2.toten_nome
-                    )), '[]'::json)
-                     FROM operacao_totens ot2
-                     WHERE ot2.operacao_id = r.operacao_id) as operacao_totens_json
+                    f.turno as f_turno
                 FROM registros_producao r
                 LEFT JOIN funcionarios f ON r.funcionario_id = f.funcionario_id
-                LEFT JOIN postos p ON r.posto_id = p.posto_id
-                LEFT JOIN modelos m ON r.modelo_id = m.modelo_id
-                LEFT JOIN operacoes o ON r.operacao_id = o.operacao_id
-                LEFT JOIN produtos pr ON o.produto_id = pr.produto_id
-                LEFT JOIN pecas pc ON r.peca_id = pc.peca_id
                 WHERE {where_clause}
+                {"AND r.registro_id < %s" if antes_de is not None else ""}
                 ORDER BY r.registro_id DESC
                 LIMIT %s OFFSET %s
-            """
-            
-            # Adicionar limit e offset aos parâmetros
-            params_extended = params.copy()
-            params_extended.extend([limit, offset])
+            ),
+            totens_operacao AS (
+                SELECT 
+                    ot.operacao_id,
+                    STRING_AGG(DISTINCT ot.toten_nome, ', ') as o_toten_nome,
+                    JSON_AGG(JSON_BUILD_OBJECT('nome', ot.toten_nome)) as operacao_totens_json
+                FROM operacao_totens ot
+                WHERE ot.operacao_id IN (SELECT DISTINCT operacao_id FROM pagina)
+                GROUP BY ot.operacao_id
+            ),
+            pecas_operacao AS (
+                SELECT 
+                    op_pec.operacao_id,
+                    JSON_AGG(JSON_BUILD_OBJECT(
+                        'id', pec.peca_id,
+                        'codigo', pec.codigo,
+                        'nome', pec.nome
+                    )) as operacao_pecas_json
+                FROM operacao_pecas op_pec
+                INNER JOIN pecas pec ON op_pec.peca_id = pec.peca_id
+                WHERE op_pec.operacao_id IN (SELECT DISTINCT operacao_id FROM pagina)
+                GROUP BY op_pec.operacao_id
+            )
+            SELECT 
+                r.registro_id,
+                r.posto_id,
+                r.funcionario_id,
+                r.operacao_id,
+                r.modelo_id,
+                r.peca_id,
+                r.inicio,
+                r.fim,
+                r.quantidade,
+                r.codigo_producao,
+                r.comentarios,
+                r.data_inicio,
+                r.hora_inicio,
+                r.mes_ano,
+                -- Funcionário
+                r.f_id,
+                r.f_nome,
+                r.f_matricula,
+                r.f_turno,
+                -- Posto
+                p.posto_id as p_id,
+                p.nome as p_nome,
+                p.toten_id as p_toten_id,
+                -- Modelo
+                m.modelo_id as m_id,
+                m.nome as m_nome,
+                -- Operação
+                o.operacao_id as o_id,
+                o.codigo_operacao as o_codigo,
+                {operacao_nome_select} as o_nome,
+                o.produto_id as o_produto_id,
+                -- Produto
+                pr.produto_id as pr_id,
+                pr.nome as pr_nome,
+                -- Peça do registro
+                pc.peca_id as pc_id,
+                pc.codigo as pc_codigo,
+                pc.nome as pc_nome,
+                -- Totem da operação (nome do dispositivo adicionado na operação)
+                tot.o_toten_nome,
+                -- Nome do dispositivo salvo diretamente no registro
+                r.dispositivo_nome as r_dispositivo_nome,
+                -- Todas as peças da operação (JSON array)
+                COALESCE(pop.operacao_pecas_json, '[]'::json) as operacao_pecas_json,
+                -- Todos os totens da operação (JSON array)
+                COALESCE(tot.operacao_totens_json, '[]'::json) as operacao_totens_json
+            FROM pagina r
+            LEFT JOIN postos p ON r.posto_id = p.posto_id
+            LEFT JOIN modelos m ON r.modelo_id = m.modelo_id
+            LEFT JOIN operacoes o ON r.operacao_id = o.operacao_id
+            LEFT JOIN produtos pr ON o.produto_id = pr.produto_id
+            LEFT JOIN pecas pc ON r.peca_id = pc.peca_id
+            LEFT JOIN totens_operacao tot ON tot.operacao_id = r.operacao_id
+            LEFT JOIN pecas_operacao pop ON pop.operacao_id = r.operacao_id
+            ORDER BY r.registro_id DESC
+        """
+        
+        # Adicionar cursor, limit e offset aos parâmetros
+        params_extended = params.copy()
+        if antes_de is not None:
+            params_extended.append(antes_de)
+            offset = 0
+        params_extended.extend([limit, offset])
+        return query, tuple(params_extended)
+    
+    @staticmethod
+    def buscar_registros_com_relacionamentos(
+        where_clause: str, 
+        params: List[Any], 
+        limit: int, 
+        offset: int,
+        tem_coluna_nome_operacao: bool,
+        antes_de: Optional[int] = None
+    ) -> List[Tuple]:
+        """
+        Busca registros com todos os relacionamentos via JOINs
+
+        Com antes_de (paginação por cursor), retorna os registros com registro_id menor
+        que o informado, como condição do índice (chave primária ou, filtrando por dia,
+        os índices da migração 014) no lugar do OFFSET.
+        """
+        conn = None
+        cursor = None
+        try:
+            conn = DatabaseConnection.get_connection()
+            cursor = conn.cursor()
             
-            cursor.execute(query, tuple(params_extended))
+            query, params_extended = RegistroProducao.montar_consulta_pagina(
+                where_clause, params, limit, offset, tem_coluna_nome_operacao, antes_de
+            )
+            cursor.execute(query, params_extended)
             return cursor.fetchall()
         finally:
             if cursor:
@@ -285,6 +344,7 @@ class RegistroProducao:
                 (registro_id,)
             )
             conn.commit()
+            cache.invalidar('registros_producao', 'registros_encerrados')
             
             return {
                 "sucesso": True,
@@ -342,6 +402,7 @@ class RegistroProducao:
                     tuple(ids_existentes)
                 )
                 conn.commit()
+                cache.invalidar('registros_producao', 'registros_encerrados')
             
             resultado = {
                 "sucesso": True,
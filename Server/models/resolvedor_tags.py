@@ -0,0 +1,177 @@
+"""
+Resolução de tags RFID (permanentes e temporárias) em memória
+
+Mantém um mapa tag_id -> retrato do funcionário montado a partir do catálogo
+de funcionários (tags permanentes) e das tags temporárias válidas, carregadas
+em uma única consulta. As temporárias saem do mapa em data_expiracao (heap
+ordenado pela expiração, consumido a cada busca), sem depender da limpeza
+periódica. Alterações em funcionarios/tags_temporarias invalidam o mapa pelo
+cache de referência (save/delete dos models e LISTEN/NOTIFY).
+"""
+import heapq
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from Server.models import cache
+from Server.models.database import DatabaseConnection
+try:
+    from zoneinfo import ZoneInfo
+    TZ_MANAUS = ZoneInfo('America/Manaus')
+except ImportError:
+    import pytz
+    TZ_MANAUS = pytz.timezone('America/Manaus')
+
+
+class FuncionarioTag(NamedTuple):
+    """Retrato do funcionário dono de uma tag"""
+    funcionario_id: Optional[int]
+    matricula: str
+    nome: str
+    ativo: bool
+    turno: Optional[str]
+    tag_id: Optional[str]
+    temporaria: bool = False
+    expira_em: Optional[datetime] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.funcionario_id,
+            "matricula": self.matricula,
+            "nome": self.nome,
+            "ativo": self.ativo,
+            "turno": self.turno,
+            "tag_id": self.tag_id,
+            "temporaria": self.temporaria,
+        }
+
+
+class _Mapa(NamedTuple):
+    permanentes: Dict[str, FuncionarioTag]
+    temporarias: Dict[str, FuncionarioTag]
+    expiracoes: List[Tuple[datetime, str]]
+    carregado_em: float
+
+
+def _agora_local() -> datetime:
+    # data_expiracao é TIMESTAMP sem fuso, gravado no horário de Manaus
+    return datetime.now(TZ_MANAUS).replace(tzinfo=None)
+
+
+def _horario_local(valor: datetime) -> datetime:
+    return valor.astimezone(TZ_MANAUS).replace(tzinfo=None) if valor.tzinfo else valor
+
+
+class ResolvedorTags:
+    """Mapa tag_id -> FuncionarioTag com expiração das tags temporárias"""
+
+    _mapa: Optional[_Mapa] = None
+    _geracao = 0
+    _carga_lock = threading.Lock()
+    _estado_lock = threading.Lock()
+    _stats = {'acertos': 0, 'nao_encontradas': 0, 'cargas': 0, 'expiradas': 0, 'invalidacoes': 0}
+
+    @classmethod
+    def resolver(cls, tag_id: Optional[str]) -> Optional[FuncionarioTag]:
+        """Funcionário dono da tag (a temporária válida tem precedência), ou None"""
+        if not tag_id:
+            return None
+        mapa = cls._obter()
+        agora = _agora_local()
+        with cls._estado_lock:
+            # Remover as temporárias que expiraram desde a carga
+            while mapa.expiracoes and mapa.expiracoes[0][0] <= agora:
+                expira_em, tag = heapq.heappop(mapa.expiracoes)
+                atual = mapa.temporarias.get(tag)
+                if atual is not None and atual.expira_em == expira_em:
+                    del mapa.temporarias[tag]
+                    cls._stats['expiradas'] += 1
+            funcionario = mapa.temporarias.get(tag_id) or mapa.permanentes.get(tag_id)
+            cls._stats['acertos' if funcionario else 'nao_encontradas'] += 1
+        return funcionario
+
+    @classmethod
+    def invalidar(cls) -> None:
+        with cls._estado_lock:
+            cls._geracao += 1
+            cls._mapa = None
+            cls._stats['invalidacoes'] += 1
+
+    @classmethod
+    def estatisticas(cls) -> Dict[str, Any]:
+        mapa = cls._mapa
+        with cls._estado_lock:
+            stats: Dict[str, Any] = dict(cls._stats)
+            stats['permanentes'] = len(mapa.permanentes) if mapa else 0
+            stats['temporarias'] = len(mapa.temporarias) if mapa else 0
+        stats['idade_s'] = round(time.monotonic() - mapa.carregado_em, 1) if mapa else None
+        return stats
+
+    @classmethod
+    def _valido(cls, mapa: Optional[_Mapa]) -> bool:
+        ttl = float(os.getenv('CACHE_REFERENCIA_TTL', '300'))
+        return mapa is not None and time.monotonic() - mapa.carregado_em < ttl
+
+    @classmethod
+    def _obter(cls) -> _Mapa:
+        mapa = cls._mapa
+        if cls._valido(mapa):
+            return mapa
+
+        with cls._carga_lock:
+            mapa = cls._mapa
+            if cls._valido(mapa):
+                return mapa
+
+            with cls._estado_lock:
+                geracao = cls._geracao
+            mapa = cls._carregar()
+
+            with cls._estado_lock:
+                cls._stats['cargas'] += 1
+                if cls._geracao == geracao:
+                    cls._mapa = mapa
+            return mapa
+
+    @staticmethod
+    def _carregar() -> _Mapa:
+        from Server.models.funcionario import Funcionario
+
+        funcionarios = {f.funcionario_id: f for f in Funcionario.listar_todos()}
+        permanentes = {
+            f.tag_id: FuncionarioTag(f.funcionario_id, f.matricula, f.nome, f.ativo, f.turno, f.tag_id)
+            for f in funcionarios.values() if f.tag_id
+        }
+
+        with DatabaseConnection.outside_transaction():
+            rows = DatabaseConnection.execute_query(
+                """
+                SELECT tag_id, funcionario_id, data_expiracao
+                FROM tags_temporarias
+                WHERE ativo = TRUE AND data_expiracao > CURRENT_TIMESTAMP
+                ORDER BY data_expiracao
+                """,
+                fetch_all=True
+            ) or []
+
+        temporarias: Dict[str, FuncionarioTag] = {}
+        expiracoes: List[Tuple[datetime, str]] = []
+        for tag_id, funcionario_id, data_expiracao in rows:
+            f = funcionarios.get(funcionario_id)
+            if f is None:
+                continue
+            expira_em = _horario_local(data_expiracao)
+            # Com mais de uma tag ativa igual, vale a de maior validade (última pela ordenação)
+            temporarias[tag_id] = FuncionarioTag(
+                f.funcionario_id, f.matricula, f.nome, f.ativo, f.turno, f.tag_id, True, expira_em
+            )
+            expiracoes.append((expira_em, tag_id))
+        heapq.heapify(expiracoes)
+
+        return _Mapa(permanentes, temporarias, expiracoes, time.monotonic())
+
+
+# funcionarios invalida tags_temporarias em cascata (cache._DEPENDENTES)
+cache.ao_invalidar('tags_temporarias', ResolvedorTags.invalidar)
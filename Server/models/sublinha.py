@@ -1,4 +1,5 @@
 from Server.models.database import DatabaseConnection
+from Server.models import cache
 from typing import Dict, Any, Optional, List
 
 class Sublinha:
@@ -42,71 +43,46 @@ class Sublinha:
             query = "UPDATE sublinhas SET nome = %s, linha_id = %s WHERE sublinha_id = %s"
             params = (self.nome, self.linha_id, self.sublinha_id)
             DatabaseConnection.execute_query(query, params)
+        cache.invalidar('sublinhas')
 
     @classmethod
     def listar_todas(cls, com_linha: bool = False) -> List['Sublinha']:
+        sublinhas = _cache_sublinhas.listar()
         if com_linha:
-            query = """
-                SELECT s.sublinha_id, s.linha_id, s.nome, l.nome as linha_nome
-                FROM sublinhas s
-                LEFT JOIN linhas l ON s.linha_id = l.linha_id
-                ORDER BY l.nome, s.nome
-            """
-            resultados = DatabaseConnection.execute_query(query, fetch_all=True)
-            
-            sublinhas = []
-            if resultados:
-                for resultado in resultados:
-                    sublinha = cls(
-                        sublinha_id=resultado[0],
-                        linha_id=resultado[1],
-                        nome=resultado[2],
-                        linha_nome=resultado[3] if len(resultado) > 3 else None
-                    )
-                    sublinhas.append(sublinha)
-            return sublinhas
-        else:
-            query = "SELECT sublinha_id, linha_id, nome FROM sublinhas ORDER BY nome"
-            resultados = DatabaseConnection.execute_query(query, fetch_all=True)
-
-            sublinhas = []
-            if resultados:
-                for resultado in resultados:
-                    sublinhas.append(cls(
-                        sublinha_id=resultado[0],
-                        linha_id=resultado[1],
-                        nome=resultado[2]
-                    ))
             return sublinhas
+        return sorted((_sem_linha(s) for s in sublinhas), key=lambda s: s.nome)
     
     @classmethod
-    def buscar_por_id(cls, sublinha_id: int) -> Optional['Sublinha']:
-        query = "SELECT sublinha_id, linha_id, nome FROM sublinhas WHERE sublinha_id = %s"
-        resultado = DatabaseConnection.execute_query(query, (sublinha_id,), fetch_one=True)
-
-        if resultado:
-            return cls(
-                sublinha_id=resultado[0],
-                linha_id=resultado[1],
-                nome=resultado[2]
-            )
-        return None
-    
-    @classmethod
-    def buscar_por_nome(cls, nome: str) -> List['Sublinha']:
-        query = "SELECT sublinha_id, linha_id, nome FROM sublinhas WHERE nome = %s ORDER BY nome"
-        resultados = DatabaseConnection.execute_query(query, (nome,), fetch_all=True)
-
+    def _carregar_todas(cls) -> List['Sublinha']:
+        query = """
+            SELECT s.sublinha_id, s.linha_id, s.nome, l.nome as linha_nome
+            FROM sublinhas s
+            LEFT JOIN linhas l ON s.linha_id = l.linha_id
+            ORDER BY l.nome, s.nome
+        """
+        resultados = DatabaseConnection.execute_query(query, fetch_all=True)
+        
         sublinhas = []
         if resultados:
             for resultado in resultados:
-                sublinhas.append(cls(
+                sublinha = cls(
                     sublinha_id=resultado[0],
                     linha_id=resultado[1],
-                    nome=resultado[2]
-                ))
+                    nome=resultado[2],
+                    linha_nome=resultado[3] if len(resultado) > 3 else None
+                )
+                sublinhas.append(sublinha)
         return sublinhas
     
+    @classmethod
+    def buscar_por_id(cls, sublinha_id: int) -> Optional['Sublinha']:
+        sublinha = _cache_sublinhas.buscar('id', sublinha_id)
+        return _sem_linha(sublinha) if sublinha else None
+    
+    @classmethod
+    def buscar_por_nome(cls, nome: str) -> List['Sublinha']:
+        return [_sem_linha(s) for s in _cache_sublinhas.filtrar('nome', nome)]
+    
     @classmethod
     def buscar_por_nome_parcial(cls, nome: str) -> List['Sublinha']:
         query = "SELECT sublinha_id, linha_id, nome FROM sublinhas WHERE nome ILIKE %s ORDER BY nome"
@@ -124,18 +100,8 @@ class Sublinha:
     
     @classmethod
     def buscar_por_linha(cls, linha_id: int) -> List['Sublinha']:
-        query = "SELECT sublinha_id, linha_id, nome FROM sublinhas WHERE linha_id = %s ORDER BY nome"
-        resultados = DatabaseConnection.execute_query(query, (linha_id,), fetch_all=True)
-
-        sublinhas = []
-        if resultados:
-            for resultado in resultados:
-                sublinhas.append(cls(
-                    sublinha_id=resultado[0],
-                    linha_id=resultado[1],
-                    nome=resultado[2]
-                ))
-        return sublinhas
+        sublinhas = [_sem_linha(s) for s in _cache_sublinhas.filtrar('linha_id', linha_id)]
+        return sorted(sublinhas, key=lambda s: s.nome)
     
     @classmethod
     def existe_nome_na_linha(cls, nome: str, linha_id: int, excluir_id: Optional[int] = None) -> bool:
@@ -156,12 +122,14 @@ class Sublinha:
         query = "DELETE FROM sublinhas WHERE sublinha_id = %s"
         DatabaseConnection.execute_query(query, (self.sublinha_id,))
         self.sublinha_id = None
+        cache.invalidar('sublinhas')
         return True
     
     @classmethod
     def deletar_por_id(cls, sublinha_id: int) -> bool:
         query = "DELETE FROM sublinhas WHERE sublinha_id = %s"
         DatabaseConnection.execute_query(query, (sublinha_id,))
+        cache.invalidar('sublinhas')
         return True
     
     def atualizar(self, novo_nome: Optional[str] = None, nova_linha_id: Optional[int] = None) -> None:
@@ -188,4 +156,21 @@ class Sublinha:
         linha = Linha.buscar_por_id(self.linha_id)
         if linha:
             return linha.to_dict()
-        return {}
\ No newline at end of file
+        return {}
+
+
+def _sem_linha(sublinha: Sublinha) -> Sublinha:
+    """Remove o nome da linha (carregado pelo cache) para manter o formato das consultas simples"""
+    sublinha.linha_nome = None
+    return sublinha
+
+
+_cache_sublinhas = cache.CatalogoReferencia(
+    'sublinhas',
+    carregar=Sublinha._carregar_todas,
+    indices={
+        'id': lambda s: s.sublinha_id,
+        'nome': lambda s: s.nome,
+        'linha_id': lambda s: s.linha_id,
+    }
+)
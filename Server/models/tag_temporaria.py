@@ -1,6 +1,7 @@
 from typing import Dict, Any, Optional, List, Tuple
 from datetime import datetime, timedelta
 from Server.models.database import DatabaseConnection
+from Server.models import cache
 try:
     from zoneinfo import ZoneInfo
     TZ_MANAUS = ZoneInfo('America/Manaus')
@@ -150,26 +151,26 @@ class TagTemporaria:
             if isinstance(result, int):
                 self.id = result
         
+        cache.invalidar('tags_temporarias')
         return self
     
     @staticmethod
     def buscar_por_tag_id(tag_id: str) -> Optional['TagTemporaria']:
-        """Busca uma tag temporária pelo tag_id"""
+        """Busca uma tag temporária ativa e não expirada pelo tag_id (somente leitura)"""
+        # A validade é verificada no próprio filtro (índice parcial de tags ativas);
+        # a desativação das expiradas fica com a tarefa periódica de limpeza
         query = """
             SELECT id, tag_id, funcionario_id, data_criacao, data_expiracao, ativo 
             FROM tags_temporarias 
-            WHERE tag_id = %s AND ativo = TRUE
+            WHERE tag_id = %s AND ativo = TRUE AND data_expiracao > CURRENT_TIMESTAMP
+            ORDER BY data_expiracao DESC
+            LIMIT 1
         """
         row = DatabaseConnection.execute_query(query, (tag_id,), fetch_one=True)
         if not row:
             return None
         
-        tag = TagTemporaria.from_row(row)
-        # Verificar se não expirou
-        if tag.data_expiracao < _agora_manaus():
-            return None
-        
-        return tag
+        return TagTemporaria.from_row(row)
     
     @staticmethod
     def buscar_por_funcionario_id(funcionario_id: int) -> List['TagTemporaria']:
@@ -177,30 +178,43 @@ class TagTemporaria:
         query = """
             SELECT id, tag_id, funcionario_id, data_criacao, data_expiracao, ativo 
             FROM tags_temporarias 
-            WHERE funcionario_id = %s AND ativo = TRUE
+            WHERE funcionario_id = %s AND ativo = TRUE AND data_expiracao >= CURRENT_TIMESTAMP
             ORDER BY data_criacao DESC
         """
         rows = DatabaseConnection.execute_query(query, (funcionario_id,), fetch_all=True)
         if not rows:
             return []
         
-        tags = [TagTemporaria.from_row(row) for row in rows]
-        # Filtrar tags expiradas
-        agora = _agora_manaus()
-        tags_validas = [tag for tag in tags if tag.data_expiracao >= agora]
-        
-        return tags_validas
+        return [TagTemporaria.from_row(row) for row in rows]
     
     @staticmethod
     def excluir_expiradas() -> int:
-        """Marca como inativas todas as tags temporárias expiradas"""
+        """Marca como inativas todas as tags temporárias expiradas e retorna quantas foram alteradas"""
         query = """
-            UPDATE tags_temporarias 
-            SET ativo = FALSE 
-            WHERE data_expiracao < CURRENT_TIMESTAMP AND ativo = TRUE
+            WITH expiradas AS (
+                UPDATE tags_temporarias 
+                SET ativo = FALSE 
+                WHERE data_expiracao <= CURRENT_TIMESTAMP AND ativo = TRUE
+                RETURNING id
+            )
+            SELECT COUNT(*) FROM expiradas
+        """
+        row = DatabaseConnection.execute_query(query, fetch_one=True)
+        return row[0] if row else 0
+    
+    @staticmethod
+    def remover_expiradas_antes_de(limite: datetime) -> int:
+        """Exclui fisicamente as tags que expiraram antes do limite e retorna quantas foram removidas"""
+        query = """
+            WITH removidas AS (
+                DELETE FROM tags_temporarias 
+                WHERE data_expiracao < %s
+                RETURNING id
+            )
+            SELECT COUNT(*) FROM removidas
         """
-        DatabaseConnection.execute_query(query)
-        return 0  # Retornamos 0 pois não temos como contar facilmente
+        row = DatabaseConnection.execute_query(query, (limite,), fetch_one=True)
+        return row[0] if row else 0
     
     def delete(self) -> None:
         """Remove a tag temporária do banco de dados"""
@@ -209,6 +223,7 @@ class TagTemporaria:
         query = "DELETE FROM tags_temporarias WHERE id = %s"
         DatabaseConnection.execute_query(query, (self.id,))
         self.id = None
+        cache.invalidar('tags_temporarias')
     
     @staticmethod
     def criar(tag_id: str, funcionario_id: int, horas_duracao: int = 10) -> 'TagTemporaria':
@@ -0,0 +1,139 @@
+"""
+Unidade de trabalho (transação) compartilhada entre chamadas de models
+"""
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, List, Optional
+
+
+class ConexaoTransacao:
+    """
+    Visão da conexão da transação entregue aos models.
+
+    Os models continuam usando o padrão get_connection() / commit() / close();
+    dentro de uma transação esses métodos não encerram nada: commit() e close()
+    são adiados para o fim do bloco e rollback() marca a transação para ser
+    desfeita.
+    """
+
+    def __init__(self, transacao: 'Transacao') -> None:
+        self._transacao = transacao
+
+    @property
+    def closed(self) -> int:
+        return self._transacao.conexao.closed
+
+    def cursor(self, *args: Any, **kwargs: Any) -> Any:
+        return self._transacao.conexao.cursor(*args, **kwargs)
+
+    def commit(self) -> None:
+        # Confirmado apenas ao sair do bloco `with DatabaseConnection.transaction()`
+        pass
+
+    def rollback(self) -> None:
+        self._transacao.marcar_rollback()
+
+    def close(self) -> None:
+        # A conexão pertence à transação e volta ao pool ao final dela
+        pass
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self._transacao.conexao, name)
+
+
+class Transacao:
+    """
+    Transação ativa na thread atual.
+
+    Criada por DatabaseConnection.transaction(); todos os models chamados dentro
+    do bloco usam a mesma conexão e o commit acontece uma única vez ao final.
+    """
+
+    def __init__(self, conexao: Any) -> None:
+        self.conexao = conexao
+        self.somente_rollback = False
+        self._ao_confirmar: List[Callable[[], None]] = []
+        # Savepoints abertos: [nome, falhou]
+        self._savepoints: List[List[Any]] = []
+
+    def marcar_rollback(self) -> None:
+        """
+        Desfaz o que foi feito até aqui e impede o commit ao final do bloco.
+
+        Dentro de savepoint(), desfaz apenas até o savepoint mais interno.
+        """
+        if self._savepoints:
+            savepoint = self._savepoints[-1]
+            savepoint[1] = True
+            self._executar(f"ROLLBACK TO SAVEPOINT {savepoint[0]}")
+            return
+        self.somente_rollback = True
+        try:
+            self.conexao.rollback()
+        except Exception:
+            pass
+
+    @contextmanager
+    def savepoint(self) -> Iterator[None]:
+        """
+        Isola um trecho da transação: se o bloco falhar, apenas o que foi feito
+        dentro dele é desfeito e a exceção é propagada; o restante da transação
+        continua válido (ex.: cada evento de um lote de leituras RFID).
+        """
+        nome = f"sp_{len(self._savepoints) + 1}"
+        self._executar(f"SAVEPOINT {nome}")
+        savepoint: List[Any] = [nome, False]
+        self._savepoints.append(savepoint)
+        try:
+            yield
+        except BaseException:
+            self._savepoints.pop()
+            if not savepoint[1]:
+                self._executar(f"ROLLBACK TO SAVEPOINT {nome}")
+            self._executar(f"RELEASE SAVEPOINT {nome}")
+            raise
+        self._savepoints.pop()
+        self._executar(f"RELEASE SAVEPOINT {nome}")
+        if savepoint[1]:
+            raise Exception("Operação desfeita: um dos comandos falhou dentro do savepoint")
+
+    def _executar(self, comando: str) -> None:
+        cursor = self.conexao.cursor()
+        try:
+            cursor.execute(comando)
+        finally:
+            cursor.close()
+
+    def bloquear(self, chave: str) -> None:
+        """
+        Obtém um advisory lock de transação para a chave informada.
+
+        Serializa operações concorrentes sobre o mesmo recurso (por exemplo duas
+        leituras RFID do mesmo operador no mesmo posto); o lock é liberado
+        automaticamente no commit/rollback.
+        """
+        cursor = self.conexao.cursor()
+        try:
+            cursor.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (chave,))
+        finally:
+            cursor.close()
+
+    def ao_confirmar(self, callback: Callable[[], None]) -> None:
+        """Agenda uma função para rodar somente depois do commit da transação"""
+        self._ao_confirmar.append(callback)
+
+    def finalizar(self, erro: Optional[BaseException]) -> None:
+        """Confirma ou desfaz a transação e executa os callbacks pós-commit"""
+        if erro is not None or self.somente_rollback:
+            self.conexao.rollback()
+            if erro is None:
+                raise Exception("Transação desfeita: uma das operações falhou dentro da unidade de trabalho")
+            return
+
+        self.conexao.commit()
+        for callback in self._ao_confirmar:
+            try:
+                callback()
+            except Exception as e:
+                print(f"[AVISO] Erro em callback pós-commit: {e}")
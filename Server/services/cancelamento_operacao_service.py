@@ -176,29 +176,14 @@ def criar_cancelamento(
         
         try:
             # Verificar se as colunas existem na tabela operacoes_canceladas
-            cursor.execute("""
-                SELECT column_name 
-                FROM information_schema.columns 
-                WHERE table_schema = 'public' 
-                AND table_name = 'operacoes_canceladas'
-                AND column_name IN ('funcionario_nome', 'operacao_nome')
-            """)
-            colunas_existentes = [row[0] for row in cursor.fetchall()]
-            tem_funcionario_nome = 'funcionario_nome' in colunas_existentes
-            tem_operacao_nome = 'operacao_nome' in colunas_existentes
+            tem_funcionario_nome = DatabaseConnection.column_exists('operacoes_canceladas', 'funcionario_nome')
+            tem_operacao_nome = DatabaseConnection.column_exists('operacoes_canceladas', 'operacao_nome')
             
             if not tem_funcionario_nome or not tem_operacao_nome:
                 raise Exception("Colunas funcionario_nome ou operacao_nome não existem na tabela operacoes_canceladas. Execute a migração migrate_add_dados_cancelamentos.py")
             
             # Verificar se a coluna nome existe na tabela operacoes
-            cursor.execute("""
-                SELECT column_name 
-                FROM information_schema.columns 
-                WHERE table_schema = 'public' 
-                AND table_name = 'operacoes'
-                AND column_name = 'nome'
-            """)
-            tem_coluna_nome_operacao = cursor.fetchone() is not None
+            tem_coluna_nome_operacao = DatabaseConnection.column_exists('operacoes', 'nome')
             operacao_nome_select = "COALESCE(o.nome, o.codigo_operacao)" if tem_coluna_nome_operacao else "o.codigo_operacao"
             
             query_registro = f"""
@@ -53,18 +53,15 @@ def buscar_registros(
         # Converter para formato de tupla 
         rows = []
         
-        # Cache para buscar dados relacionados apenas uma vez
+        # Dados relacionados vêm do cache de referência (consulta O(1) em memória)
         from Server.models.posto import Posto
         from Server.models.peca import Peca
         from Server.models.operacao import Operacao
         
-        funcionarios_cache = {f.funcionario_id: f for f in Funcionario.listar_todos()}
-        postos_cache = {p.posto_id: p for p in Posto.listar_todos()}
-        
         for registro in registros:
-            funcionario = funcionarios_cache.get(registro.funcionario_id)
+            funcionario = Funcionario.buscar_por_id(registro.funcionario_id)
             modelo = Modelo.buscar_por_id(registro.modelo_id)
-            posto_obj = postos_cache.get(registro.posto_id)
+            posto_obj = Posto.buscar_por_id(registro.posto_id)
             
             # Buscar peça se existir
             peca_nome = ''
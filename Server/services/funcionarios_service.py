@@ -1,6 +1,7 @@
 from typing import Dict, Any, List, Optional
 from Server.models import Funcionario
 from Server.models.database import DatabaseConnection
+from Server.models import cache
 
 
 # Lista todos os funcionários ativos
@@ -242,4 +243,7 @@ def atualizar_operacoes_habilitadas(funcionario_id: int, operacoes_ids: List[int
             SET habilitada = FALSE 
             WHERE funcionario_id = %s AND operacao_id = %s
         """
-        DatabaseConnection.execute_query(query_desabilitar, (funcionario_id, operacao_id))
\ No newline at end of file
+        DatabaseConnection.execute_query(query_desabilitar, (funcionario_id, operacao_id))
+    
+    # Habilitações aparecem no dashboard (aviso de funcionário não habilitado)
+    cache.invalidar('operacoes_habilitadas')
\ No newline at end of file
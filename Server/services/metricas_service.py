@@ -0,0 +1,28 @@
+"""
+Service para expor métricas internas do backend (pool de conexões, caches, filas)
+"""
+from typing import Dict, Any
+from Server.models.database import DatabaseConnection
+from Server.models.migracoes import Migracoes
+from Server.models import cache
+from Server.models.ouvinte_cache import OuvinteCache
+from Server.models.resolvedor_tags import ResolvedorTags
+from Server.services import dashboard_service, registro_service, rfid_service
+from Server.utils.agendador import Agendador
+from Server.websocket_manager import estatisticas_despacho
+
+
+def obter_metricas() -> Dict[str, Any]:
+    """Retorna um retrato das métricas internas do processo"""
+    return {
+        "pool_conexoes": DatabaseConnection.get_pool_stats(),
+        "migracoes": Migracoes.status(),
+        "cache_referencia": cache.estatisticas(),
+        "resolvedor_tags": ResolvedorTags.estatisticas(),
+        "ouvinte_cache": OuvinteCache.estatisticas(),
+        "rfid": rfid_service.estatisticas(),
+        "tarefas_agendadas": Agendador.estatisticas(),
+        "websocket": estatisticas_despacho(),
+        "dashboard_snapshot": dashboard_service.estatisticas_snapshot(),
+        "registros_total": registro_service.estatisticas_totais()
+    }
@@ -1,16 +1,22 @@
 from typing import Dict, Any, List
 from Server.models import Modelo
+from Server.models.peca import Peca
 from Server.models.database import DatabaseConnection
 from Server.services import pecas_service  
+from Server.utils.carregador_lotes import CarregadorLotes
 
 # LISTAR
 def listar_modelos():
     try: 
         modelos = Modelo.listar_todos()
+        # Peças e produtos de todos os modelos em uma consulta cada (não uma por modelo)
+        ids = [modelo.id for modelo in modelos]
+        pecas_por_modelo = CarregadorLotes(Peca.buscar_por_modelos, padrao=list).agendar(ids)
+        produtos = CarregadorLotes(Modelo.buscar_produtos_por_modelos).agendar(ids)
         resultado = []
         for modelo in modelos:
-            pecas = pecas_service.buscar_por_modelo_id(modelo.id)
-            produto_id = Modelo.buscar_produto_por_modelo_id(modelo.id)
+            pecas = [peca.to_dict() for peca in pecas_por_modelo.obter(modelo.id)]
+            produto_id = produtos.obter(modelo.id)
             resultado.append({
                 'id': modelo.id,
                 'codigo': modelo.codigo,
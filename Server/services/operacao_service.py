@@ -1,4 +1,4 @@
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, NamedTuple, Optional
 from Server.models.operacao import Operacao
 from Server.models.produto import Produto
 from Server.models.modelo import Modelo
@@ -7,6 +7,7 @@ from Server.models.linha import Linha
 from Server.models.posto import Posto
 from Server.models.peca import Peca
 from Server.models.database import DatabaseConnection
+from Server.models import cache
 from Server.services import dispositivo_raspberry_service
 
 
@@ -37,85 +38,193 @@ def _buscar_info_dispositivo_por_toten(toten_id: int) -> Dict[str, Any]:
     }
 
 # LISTAR
+_QUERY_LISTAGEM = """
+    WITH totens AS (
+        SELECT operacao_id, json_agg(DISTINCT toten_nome) AS nomes
+        FROM operacao_totens
+        GROUP BY operacao_id
+    ),
+    pecas_operacao AS (
+        SELECT op.operacao_id,
+               json_agg(p.codigo ORDER BY op.id) AS codigos,
+               json_agg(p.nome ORDER BY op.id) AS nomes
+        FROM operacao_pecas op
+        INNER JOIN pecas p ON op.peca_id = p.peca_id
+        GROUP BY op.operacao_id
+    ),
+    pecas_modelo AS (
+        SELECT mp.modelo_id,
+               json_agg(DISTINCT p.codigo) AS codigos,
+               json_agg(DISTINCT p.nome) AS nomes
+        FROM modelo_pecas mp
+        INNER JOIN pecas p ON mp.peca_id = p.peca_id
+        GROUP BY mp.modelo_id
+    ),
+    dispositivos AS (
+        SELECT id, serial, nome,
+               ROW_NUMBER() OVER (ORDER BY data_registro DESC) AS posicao
+        FROM dispositivos_raspberry
+    )
+    SELECT o.operacao_id, o.codigo_operacao, {coluna_nome},
+           o.produto_id, pr.nome,
+           o.modelo_id, m.nome,
+           o.sublinha_id, l.nome,
+           o.posto_id, ps.nome, ps.toten_id,
+           t.nomes,
+           po.codigos, po.nomes,
+           pm.codigos, pm.nomes,
+           d.id, d.serial, d.nome
+    FROM operacoes o
+    LEFT JOIN produtos pr ON pr.produto_id = o.produto_id
+    LEFT JOIN modelos m ON m.modelo_id = o.modelo_id
+    LEFT JOIN sublinhas s ON s.sublinha_id = o.sublinha_id
+    LEFT JOIN linhas l ON l.linha_id = s.linha_id
+    LEFT JOIN postos ps ON ps.posto_id = o.posto_id
+    LEFT JOIN totens t ON t.operacao_id = o.operacao_id
+    LEFT JOIN pecas_operacao po ON po.operacao_id = o.operacao_id
+    LEFT JOIN pecas_modelo pm ON pm.modelo_id = o.modelo_id
+    -- Associação sequencial: dispositivo 1 -> toten 1, dispositivo 2 -> toten 2, etc.
+    LEFT JOIN dispositivos d
+        ON ps.posto_id IS NOT NULL
+        AND d.posicao = CASE WHEN ps.toten_id > 0 THEN ps.toten_id ELSE 1 END
+    ORDER BY {coluna_nome}, o.codigo_operacao, o.operacao_id
+"""
+
+
+def _carregar_listagem() -> List[Dict[str, Any]]:
+    """
+    Monta a listagem de operações em uma única consulta (joins + agregação JSON
+    de totens e peças). Usado pelo catálogo em memória de listar_operacoes().
+    """
+    coluna_nome = 'o.nome' if DatabaseConnection.column_exists('operacoes', 'nome') else 'NULL::text'
+    rows = DatabaseConnection.execute_query(
+        _QUERY_LISTAGEM.format(coluna_nome=coluna_nome),
+        fetch_all=True
+    )
+    operacoes_agrupadas: Dict[str, Dict[str, Any]] = {}
+
+    for row in rows or []:
+        (operacao_id, codigo_operacao, nome, produto_id, produto_nome,
+         modelo_id, modelo_nome, sublinha_id, linha_nome,
+         posto_id, posto_nome, toten_id, totens,
+         pecas_codigos, pecas_nomes, pecas_modelo_codigos, pecas_modelo_nomes,
+         dispositivo_id, serial, hostname) = row
+
+        nome_operacao = nome or codigo_operacao
+        chave = f"{nome_operacao}_{produto_id or ''}_{modelo_id or ''}_{sublinha_id or ''}_{posto_id or ''}"
+        if chave in operacoes_agrupadas:
+            continue
+
+        totens = totens or []
+        if not totens and posto_id:
+            totens = [f'ID-{toten_id}']
+
+        pecas_codigos = pecas_codigos or []
+        pecas_nomes = pecas_nomes or []
+        if not pecas_codigos and modelo_id:
+            pecas_codigos = pecas_modelo_codigos or []
+            pecas_nomes = pecas_modelo_nomes or []
+
+        # Usar codigo_operacao da própria tabela operacoes
+        codigos_list = [codigo_operacao] if codigo_operacao else []
+        if not codigos_list and pecas_codigos:
+            codigos_list = [pecas_codigos[0]]
+
+        operacoes_agrupadas[chave] = {
+            'id': str(operacao_id),
+            'operacao': nome_operacao,
+            'produto': produto_nome or '',
+            'modelo': modelo_nome or '',
+            'linha': linha_nome or '',
+            'posto': posto_nome or '',
+            'totens': totens,
+            'pecas': pecas_codigos,
+            'pecas_nomes': pecas_nomes,
+            'codigos': codigos_list,
+            'serial': serial or '',
+            'hostname': hostname or '',
+            'dispositivo_id': dispositivo_id
+        }
+
+    resultado = list(operacoes_agrupadas.values())
+    resultado.sort(key=lambda x: x.get('operacao', ''))
+    return resultado
+
+
+_catalogo_listagem = cache.CatalogoReferencia(
+    tabela='operacoes_listagem',
+    carregar=_carregar_listagem,
+    indices={
+        'id': lambda op: op['id'],
+    }
+)
+
+class ResolucaoOperacao(NamedTuple):
+    operacao_id: int
+    operacao: str
+    posto: str
+    dispositivo_nome: Optional[str]
+
+
+def _dispositivo_da_operacao(operacao: Dict[str, Any]) -> Optional[str]:
+    """Nome do dispositivo gravado no registro: primeiro totem nomeado ou hostname do Raspberry"""
+    for toten in operacao.get('totens') or []:
+        if toten and not toten.startswith('ID-'):
+            return toten
+    return operacao.get('hostname') or None
+
+
+def _carregar_resolucao() -> List[ResolucaoOperacao]:
+    """Deriva da listagem (mesma ordem) os dados necessários para resolver a operação de uma entrada"""
+    return [
+        ResolucaoOperacao(
+            operacao_id=int(op['id']),
+            operacao=op['operacao'],
+            posto=op['posto'],
+            dispositivo_nome=_dispositivo_da_operacao(op)
+        )
+        for op in _catalogo_listagem.listar()
+    ]
+
+
+_catalogo_resolucao = cache.CatalogoReferencia(
+    tabela='operacoes_resolucao',
+    carregar=_carregar_resolucao,
+    indices={
+        'id_posto': lambda r: (str(r.operacao_id), r.posto),
+        'nome_posto': lambda r: (r.operacao, r.posto),
+        'id': lambda r: str(r.operacao_id),
+        'nome': lambda r: r.operacao,
+    }
+)
+
+# A listagem combina várias tabelas; linhas, sublinhas, postos, produtos,
+# modelos e peças já chegam aqui pela cascata de invalidação de 'operacoes'
+for _tabela in ('operacoes', 'operacao_totens', 'operacao_pecas', 'modelo_pecas', 'dispositivos_raspberry'):
+    cache.ao_invalidar(_tabela, _catalogo_listagem.invalidar)
+    cache.ao_invalidar(_tabela, _catalogo_resolucao.invalidar)
+
+
+def resolver_operacao(identificador: Any, posto: Optional[str] = None) -> Optional[ResolucaoOperacao]:
+    """
+    Resolve uma operação pelo id, código ou nome (como aparece em listar_operacoes),
+    restrita ao posto quando informado. Consulta O(1) em índices por chave composta.
+    """
+    if identificador is None or identificador == '':
+        return None
+    if posto:
+        return (_catalogo_resolucao.buscar('id_posto', (str(identificador), posto))
+                or _catalogo_resolucao.buscar('nome_posto', (identificador, posto)))
+    return (_catalogo_resolucao.buscar('id', str(identificador))
+            or _catalogo_resolucao.buscar('nome', identificador))
+
+
 def listar_operacoes() -> List[Dict[str, Any]]:
     try:
-        operacoes = Operacao.listar_todas()
-        operacoes_agrupadas = {}
-        
-        for operacao in operacoes:
-            produto = Produto.buscarId(operacao.produto_id) if operacao.produto_id else None
-            modelo = Modelo.buscar_por_id(operacao.modelo_id) if operacao.modelo_id else None
-            sublinha = Sublinha.buscar_por_id(operacao.sublinha_id) if operacao.sublinha_id else None
-            linha = None
-            if sublinha:
-                linha = Linha.buscar_por_id(sublinha.linha_id)
-            posto = Posto.buscar_por_id(operacao.posto_id) if operacao.posto_id else None
-            nome_operacao = operacao.nome or operacao.codigo_operacao
-            chave = f"{nome_operacao}_{produto.id if produto else ''}_{modelo.id if modelo else ''}_{sublinha.sublinha_id if sublinha else ''}_{posto.posto_id if posto else ''}"
-            
-            if chave not in operacoes_agrupadas:
-                query_totens = """
-                    SELECT DISTINCT toten_nome 
-                    FROM operacao_totens 
-                    WHERE operacao_id = %s
-                """
-                totens_rows = DatabaseConnection.execute_query(query_totens, (operacao.operacao_id,), fetch_all=True)
-                totens = [row[0] for row in totens_rows] if totens_rows else []
-                if not totens and posto:
-                    totens = [f'ID-{posto.toten_id}']
-                
-                query_pecas = """
-                    SELECT p.peca_id, p.codigo, p.nome
-                    FROM operacao_pecas op
-                    INNER JOIN pecas p ON op.peca_id = p.peca_id
-                    WHERE op.operacao_id = %s
-                """
-                pecas_rows = DatabaseConnection.execute_query(query_pecas, (operacao.operacao_id,), fetch_all=True)
-                pecas_relacionadas = [Peca.buscar_por_id(row[0]) for row in pecas_rows] if pecas_rows else []
-                pecas_codigos = [p.codigo for p in pecas_relacionadas if p]
-                pecas_nomes = [p.nome for p in pecas_relacionadas if p]
-                
-                if not pecas_codigos and modelo:
-                    pecas_modelo = Peca.buscar_por_modelo_id(modelo.id)
-                    pecas_codigos = list(set([p.codigo for p in pecas_modelo]))
-                    pecas_nomes = list(set([p.nome for p in pecas_modelo]))
-                
-                # Usar codigo_operacao da própria tabela operacoes
-                codigos_list = [operacao.codigo_operacao] if operacao.codigo_operacao else []
-                
-                if not codigos_list and pecas_codigos:
-                    codigos_list = [pecas_codigos[0]]
-                
-                # Buscar informações do dispositivo se houver posto
-                serial = ''
-                nome = ''
-                dispositivo_id = None
-                if posto:
-                    info_dispositivo = _buscar_info_dispositivo_por_toten(posto.toten_id)
-                    serial = info_dispositivo['serial']
-                    nome = info_dispositivo['nome']
-                    dispositivo_id = info_dispositivo['dispositivo_id']
-                
-                operacoes_agrupadas[chave] = {
-                    'id': str(operacao.operacao_id),  
-                    'operacao': operacao.nome or operacao.codigo_operacao,  
-                    'produto': produto.nome if produto else '',
-                    'modelo': modelo.descricao if modelo else '',
-                    'linha': linha.nome if linha else '',
-                    'posto': posto.nome if posto else '',
-                    'totens': totens,
-                    'pecas': pecas_codigos,
-                    'pecas_nomes': pecas_nomes,  
-                    'codigos': codigos_list,
-                    'serial': serial,
-                    'hostname': nome,
-                    'dispositivo_id': dispositivo_id
-                }
-        
-        resultado = list(operacoes_agrupadas.values())
-        resultado.sort(key=lambda x: x.get('operacao', ''))
-        
-        return resultado
+        return [
+            {chave: list(valor) if isinstance(valor, list) else valor for chave, valor in operacao.items()}
+            for operacao in _catalogo_listagem.listar()
+        ]
     except Exception as erro:
         print(f'Erro ao listar operações: {erro}')
         import traceback
@@ -157,9 +266,9 @@ def buscar_operacao_por_id(operacao_id: int) -> Dict[str, Any]:
             WHERE op.operacao_id = %s
         """
         pecas_rows = DatabaseConnection.execute_query(query_pecas, (operacao.operacao_id,), fetch_all=True)
-        pecas_relacionadas = [Peca.buscar_por_id(row[0]) for row in pecas_rows] if pecas_rows else []
-        pecas_codigos = [p.codigo for p in pecas_relacionadas if p]
-        pecas_nomes = [p.nome for p in pecas_relacionadas if p]
+        # Código e nome já vêm do join (sem buscar cada peça por id)
+        pecas_codigos = [row[1] for row in pecas_rows or []]
+        pecas_nomes = [row[2] for row in pecas_rows or []]
         if not pecas_codigos and modelo:
             pecas_modelo = Peca.buscar_por_modelo_id(modelo.id)
             pecas_codigos = [p.codigo for p in pecas_modelo]
@@ -226,12 +335,7 @@ def criar_operacao(
         if not sublinhas:
             return {'erro': f'Nenhuma sublinha encontrada para a linha "{linha}"'}
         sublinha = sublinhas[0]
-        postos = Posto.listar_todos()
-        posto_encontrado = None
-        for p in postos:
-            if p.nome == posto:
-                posto_encontrado = p
-                break
+        posto_encontrado = Posto.buscar_por_nome(posto)
         
         if not posto_encontrado:
             return {'erro': f'Posto "{posto}" não encontrado'}
@@ -273,6 +377,7 @@ def criar_operacao(
                 ON CONFLICT (operacao_id, peca_id) DO NOTHING
             """
             DatabaseConnection.execute_query(query_peca, (nova_operacao.operacao_id, peca.id))
+        cache.invalidar('operacao_totens', 'operacao_pecas')
         
         return {
             'sucesso': True,
@@ -330,12 +435,7 @@ def atualizar_operacao(
             operacao_obj.sublinha_id = sublinhas[0].sublinha_id
         
         if posto:
-            postos = Posto.listar_todos()
-            posto_encontrado = None
-            for p in postos:
-                if p.nome == posto:
-                    posto_encontrado = p
-                    break
+            posto_encontrado = Posto.buscar_por_nome(posto)
             if not posto_encontrado:
                 return {'erro': f'Posto "{posto}" não encontrado'}
             operacao_obj.posto_id = posto_encontrado.posto_id
@@ -369,6 +469,9 @@ def atualizar_operacao(
                             DatabaseConnection.execute_query(query_insert_peca, (operacao_id, p.id))
                             break
         
+        if totens is not None or pecas is not None:
+            cache.invalidar('operacao_totens', 'operacao_pecas')
+        
         
         return {
             'sucesso': True,
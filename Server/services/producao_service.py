@@ -1,7 +1,7 @@
 """
 Service para lógica de negócio de produção
 """
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
 from datetime import datetime
 try:
     from zoneinfo import ZoneInfo
@@ -19,88 +19,37 @@ def _agora_manaus() -> datetime:
     return datetime.now(TZ_MANAUS)
 
 
-def _buscar_operacao_id(operacao_codigo: str, posto: Optional[str] = None) -> Optional[int]:
-    """Busca ID da operação pelo código/nome e opcionalmente pelo posto"""
+def _resolver_operacao(operacao_codigo: str, posto: Optional[str] = None) -> Tuple[Optional[int], Optional[str]]:
+    """
+    Resolve (operacao_id, dispositivo_nome) pelo id/código/nome da operação.
+
+    Com posto informado, o dispositivo só é associado quando a operação pertence
+    ao posto; o ID ainda pode vir de uma operação de mesmo nome em outro posto.
+    """
     from Server.services import operacao_service
-    operacoes = operacao_service.listar_operacoes()
-    
-    # Se temos o posto, buscar a operação específica desse posto
+    resolucao = operacao_service.resolver_operacao(operacao_codigo, posto)
+    if resolucao:
+        return resolucao.operacao_id, resolucao.dispositivo_nome
     if posto:
-        operacao = next(
-            (op for op in operacoes if 
-             (op.get('id') == operacao_codigo or 
-              str(op.get('id')) == operacao_codigo or
-              op.get('operacao') == operacao_codigo) and
-             op.get('posto') == posto),
-            None
-        )
-        if operacao and operacao.get('id'):
-            return int(operacao.get('id'))
-    
-    # Fallback: buscar sem filtro de posto
-    operacao = next(
-        (op for op in operacoes if op.get('id') == operacao_codigo or 
-         str(op.get('id')) == operacao_codigo or
-         op.get('operacao') == operacao_codigo),
-        None
-    )
-    if operacao and operacao.get('id'):
-        return int(operacao.get('id'))
-    return None
+        # Fallback: buscar sem filtro de posto
+        resolucao = operacao_service.resolver_operacao(operacao_codigo)
+        if resolucao:
+            return resolucao.operacao_id, None
+    return None, None
+
+
+def _buscar_operacao_id(operacao_codigo: str, posto: Optional[str] = None) -> Optional[int]:
+    """Busca ID da operação pelo código/nome e opcionalmente pelo posto"""
+    return _resolver_operacao(operacao_codigo, posto)[0]
 
 
 def _buscar_peca_id(peca_identificador: str) -> Optional[int]:
     """Busca ID da peça pelo código ou nome"""
     from Server.models.peca import Peca
-    pecas = Peca.listar_todas()
-    # Tentar buscar primeiro pelo código
-    peca = next((p for p in pecas if p.codigo == peca_identificador), None)
-    # Se não encontrou, tentar buscar pelo nome
-    if not peca:
-        peca = next((p for p in pecas if p.nome == peca_identificador or p.nome.lower() == peca_identificador.lower()), None)
+    peca = Peca.buscar_por_codigo_ou_nome(peca_identificador)
     return peca.id if peca else None
 
 
-def _buscar_dispositivo_nome(operacao_codigo: str, posto: Optional[str] = None) -> Optional[str]:
-    """Busca o nome do dispositivo Raspberry associado à operação"""
-    from Server.services import operacao_service
-    operacoes = operacao_service.listar_operacoes()
-    
-    # Buscar a operação correspondente
-    if posto:
-        operacao = next(
-            (op for op in operacoes if 
-             (op.get('id') == operacao_codigo or 
-              str(op.get('id')) == operacao_codigo or
-              op.get('operacao') == operacao_codigo) and
-             op.get('posto') == posto),
-            None
-        )
-    else:
-        operacao = next(
-            (op for op in operacoes if op.get('id') == operacao_codigo or 
-             str(op.get('id')) == operacao_codigo or
-             op.get('operacao') == operacao_codigo),
-            None
-        )
-    
-    if operacao:
-        # Prioridade 1: Pegar o primeiro totem da lista de totens
-        totens = operacao.get('totens', [])
-        if totens and len(totens) > 0:
-            # Retornar o primeiro totem que não seja um ID genérico
-            for toten in totens:
-                if toten and not toten.startswith('ID-'):
-                    return toten
-        
-        # Prioridade 2: Usar hostname do dispositivo
-        hostname = operacao.get('hostname')
-        if hostname:
-            return hostname
-    
-    return None
-
-
 def _formatar_hora(hora: Optional[str]) -> str:
     """Formata hora removendo segundos se existirem"""
     if not hora:
@@ -111,6 +60,14 @@ def _formatar_hora(hora: Optional[str]) -> str:
     return hora_str
 
 
+def chave_lock_registro(posto: str, funcionario_matricula: str) -> str:
+    """
+    Chave do advisory lock que serializa entrada/saída de um operador em um posto
+    (as funções registrar_entrada_producao/registrar_saida_producao usam a mesma chave)
+    """
+    return f"registro_producao:{posto}:{funcionario_matricula}"
+
+
 def verificar_registro_aberto(posto: str, funcionario_matricula: str, data_atual: str) -> bool:
     """Verifica se existe um registro em aberto"""
     return ProducaoRegistro.verificar_registro_aberto(posto, funcionario_matricula, data_atual)
@@ -124,63 +81,71 @@ def registrar_entrada(
     operacao: Optional[str] = None,
     peca: Optional[str] = None,
     codigo: Optional[str] = None,
-    quantidade: Optional[int] = None
+    quantidade: Optional[int] = None,
+    momento: Optional[datetime] = None
 ) -> Dict[str, Any]:
-    """Registra a entrada de um funcionário em um posto"""
-    agora = _agora_manaus()
+    """
+    Registra a entrada de um funcionário em um posto.
+    `momento` (horário de Manaus) permite registrar leituras antigas; padrão: agora.
+    """
+    agora = momento or _agora_manaus()
     data_atual = agora.strftime('%Y-%m-%d')
     hora_atual = agora.strftime('%H:%M')
     
     produto = produto or modelo_codigo
     
-    # Buscar configuração do posto se necessário
-    config = None
-    try:
-        if DatabaseConnection.table_exists('posto_configuracao'):
-            from Server.models import PostoConfiguracao
-            config = PostoConfiguracao.buscar_por_posto(posto)
-    except Exception:
-        pass
+    # Buscar configuração do posto apenas se faltar operador ou produto
+    if not funcionario_matricula or not produto:
+        config = None
+        try:
+            if DatabaseConnection.table_exists('posto_configuracao'):
+                from Server.models import PostoConfiguracao
+                config = PostoConfiguracao.buscar_por_posto(posto)
+        except Exception:
+            pass
+        
+        funcionario_matricula = funcionario_matricula or (config.funcionario_matricula if config else None)
+        produto = produto or (config.modelo_codigo if config else None)
     
-    funcionario_matricula = funcionario_matricula or (config.funcionario_matricula if config else None)
     if not funcionario_matricula:
         raise Exception("Funcionário não informado e não há configuração para este posto")
-    
-    produto = produto or (config.modelo_codigo if config else None)
     if not produto:
         raise Exception("Produto não informado e não há configuração para este posto")
     
-    # Verificar se já existe registro aberto
-    registro_aberto = ProducaoRegistro.buscar_registro_aberto(
-        posto=posto,
-        funcionario_matricula=funcionario_matricula
-    )
-    if registro_aberto and not registro_aberto.fim:
-        raise Exception(f"Já existe um registro em aberto para este operador neste posto (ID: {registro_aberto.registro_id})")
-    
-    # Buscar IDs opcionais
-    operacao_id = _buscar_operacao_id(operacao, posto) if operacao else None
+    # Buscar IDs opcionais e o nome do dispositivo Raspberry associado à operação (cache em memória)
+    operacao_id, dispositivo_nome = _resolver_operacao(operacao, posto) if operacao else (None, None)
     peca_id = _buscar_peca_id(peca) if peca else None
     
-    # Buscar nome do dispositivo Raspberry associado à operação
-    dispositivo_nome = _buscar_dispositivo_nome(operacao, posto) if operacao else None
+    # Lock, verificação de registro aberto e INSERT em uma única chamada ao banco
+    with DatabaseConnection.transaction():
+        status, registro_id, inicio = ProducaoRegistro.registrar_entrada(
+            posto=posto,
+            funcionario_matricula=funcionario_matricula,
+            modelo_codigo=produto,
+            inicio=f"{data_atual} {hora_atual}:00",
+            operacao_id=operacao_id,
+            peca_id=peca_id,
+            codigo_producao=codigo,
+            quantidade=quantidade,
+            dispositivo_nome=dispositivo_nome
+        )
+        
+        if status == 'posto_nao_encontrado':
+            raise Exception(f"Posto '{posto}' não encontrado")
+        if status == 'funcionario_nao_encontrado':
+            raise Exception(f"Funcionário com matrícula '{funcionario_matricula}' não encontrado")
+        if status == 'modelo_nao_encontrado':
+            raise Exception(f"Modelo '{produto}' não encontrado")
     
-    # Criar registro
-    registro = ProducaoRegistro.criar(
-        posto=posto,
-        funcionario_matricula=funcionario_matricula,
-        produto=produto,
-        data=data_atual,
-        hora_inicio=hora_atual,
-        operacao_id=operacao_id,
-        peca_id=peca_id,
-        codigo_producao=codigo,
-        quantidade=quantidade,
-        dispositivo_nome=dispositivo_nome
-    )
+    # Entrada repetida é idempotente: devolve o registro que já estava aberto
+    ja_aberto = status == 'registro_aberto'
+    if ja_aberto and inicio:
+        data_atual = inicio.strftime('%Y-%m-%d')
+        hora_atual = inicio.strftime('%H:%M')
     
     return {
-        "registro_id": registro.registro_id,
+        "registro_id": registro_id,
+        "ja_aberto": ja_aberto,
         "hora_inicio": hora_atual,
         "data": data_atual,
         "funcionario_matricula": funcionario_matricula,
@@ -213,7 +178,7 @@ def buscar_registro_aberto(
     from Server.models.funcionario import Funcionario
     
     posto_obj = Posto.buscar_por_id(registro.posto_id)
-    funcionario = next((f for f in Funcionario.listar_todos() if f.funcionario_id == registro.funcionario_id), None)
+    funcionario = Funcionario.buscar_por_id(registro.funcionario_id)
     
     return {
         "id": registro.registro_id,
@@ -239,44 +204,62 @@ def calcular_duracao(hora_inicio_str: str, hora_fim_str: str) -> int:
         return 0
 
 
+def fechar_registro_aberto(
+    registro_id: Optional[int] = None, 
+    posto: Optional[str] = None, 
+    funcionario_matricula: Optional[str] = None,
+    quantidade: Optional[int] = None,
+    momento: Optional[datetime] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Fecha o registro em aberto (lock + UPDATE ... RETURNING em uma única chamada).
+    Retorna None se não houver registro aberto.
+    """
+    agora = momento or _agora_manaus()
+    hora_atual = agora.strftime('%H:%M')
+    
+    status, registro_fechado, duracao, quantidade_final = ProducaoRegistro.registrar_saida(
+        fim=f"{agora.strftime('%Y-%m-%d')} {hora_atual}:00",
+        registro_id=registro_id,
+        posto=posto,
+        funcionario_matricula=funcionario_matricula,
+        quantidade=quantidade
+    )
+    if status != 'ok':
+        return None
+    
+    return {
+        "registro_id": registro_fechado,
+        "hora_fim": hora_atual,
+        "duracao_minutos": duracao or 0,
+        "quantidade": quantidade_final
+    }
+
+
 def registrar_saida(
     registro_id: Optional[int] = None, 
     posto: Optional[str] = None, 
     funcionario_matricula: Optional[str] = None,
-    quantidade: Optional[int] = None
+    quantidade: Optional[int] = None,
+    momento: Optional[datetime] = None
 ) -> Dict[str, Any]:
     """Registra a saída de um funcionário de um posto"""
-    registro_obj = ProducaoRegistro.buscar_registro_aberto(
+    if not registro_id and not (posto and funcionario_matricula):
+        raise Exception("É necessário fornecer registro_id ou posto/funcionario_matricula")
+    
+    resultado = fechar_registro_aberto(
+        registro_id=registro_id,
         posto=posto,
         funcionario_matricula=funcionario_matricula,
-        registro_id=registro_id
+        quantidade=quantidade,
+        momento=momento
     )
-    
-    if not registro_obj:
+    if not resultado:
         raise Exception(
             f"Nenhum registro em aberto encontrado. "
             f"Verifique se existe um registro de entrada para {funcionario_matricula or 'o funcionário'} no posto {posto or 'o posto'}."
         )
-    
-    if registro_obj.fim:
-        raise Exception(f"Registro {registro_obj.registro_id} já está fechado")
-    
-    hora_atual = _agora_manaus().strftime('%H:%M')
-    hora_inicio = registro_obj.inicio or registro_obj.hora_inicio or '00:00'
-    duracao = calcular_duracao(hora_inicio, hora_atual)
-    
-    if quantidade is not None:
-        registro_obj.quantidade = quantidade
-    
-    registro_obj.fim = hora_atual
-    registro_obj.save()
-    
-    return {
-        "registro_id": registro_obj.registro_id,
-        "hora_fim": hora_atual,
-        "duracao_minutos": duracao,
-        "quantidade": registro_obj.quantidade
-    }
+    return resultado
 
 
 def listar_registros(
@@ -303,7 +286,7 @@ def listar_registros(
         from Server.models import Funcionario, Modelo, Posto
         from Server.models.operacao import Operacao
         
-        funcionario = next((f for f in Funcionario.listar_todos() if f.funcionario_id == registro.funcionario_id), None)
+        funcionario = Funcionario.buscar_por_id(registro.funcionario_id)
         modelo = Modelo.buscar_por_id(registro.modelo_id)
         posto_obj = Posto.buscar_por_id(registro.posto_id)
         
@@ -1,20 +1,38 @@
+import os
 from typing import Dict, Any, Optional, List, Tuple
-from datetime import datetime
+from datetime import date, datetime, time as dt_time, timedelta
 from Server.models.registros import RegistroProducao
-from Server.models import Funcionario, Modelo, Posto
-from Server.models.operacao import Operacao
+from Server.models import cache, Funcionario, Modelo
 from Server.models.produto import Produto
 from Server.models.peca import Peca
 from Server.services import dispositivo_raspberry_service
+from Server.utils.carregador_lotes import CarregadorLotes
+from Server.utils.janela_resultados import JanelaResultados
 
+# Totais da listagem por assinatura do filtro (where + parâmetros). Alterações no conjunto
+# de registros encerrados (saída, exclusão, edição - 'registros_encerrados', migração 015) e
+# em funcionarios descartam os totais; a entrada (INSERT de registro aberto) não.
+# REGISTROS_TOTAL_TTL limita a idade mesmo sem invalidação.
+_totais = JanelaResultados(
+    'registros_total',
+    float(os.getenv('REGISTROS_TOTAL_TTL', '60')),
+    max_entradas=int(os.getenv('REGISTROS_TOTAL_MAX', '256'))
+)
+# Sem filtros, a partir deste total estimado usa pg_class.reltuples no lugar do COUNT(*) (0 desliga)
+_TOTAL_APROXIMADO_MIN = int(os.getenv('REGISTROS_TOTAL_APROXIMADO_MIN', '100000'))
 
-def _buscar_info_dispositivo_por_toten(toten_id: int) -> Dict[str, Any]:
+
+def _buscar_info_dispositivo_por_toten(toten_id: int, dispositivos: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
     """
     Busca informações do dispositivo Raspberry baseado no toten_id
     Retorna dict com serial, nome e dispositivo_id ou valores vazios
+
+    Args:
+        dispositivos: lista já carregada (listagens carregam uma vez para todas as linhas)
     """
     try:
-        dispositivos = dispositivo_raspberry_service.listar_dispositivos()
+        if dispositivos is None:
+            dispositivos = dispositivo_raspberry_service.listar_dispositivos()
         if dispositivos and len(dispositivos) > 0:
             # Associar sequencialmente: dispositivo 0 -> toten 1, dispositivo 1 -> toten 2, etc.
             toten_index = toten_id - 1 if toten_id > 0 else 0
@@ -133,38 +151,102 @@ def _extrair_data_de_timestamp(timestamp: Optional[str]) -> Optional[str]:
         return None
 
 
+def _converter_data(valor: str) -> date:
+    try:
+        return datetime.strptime(valor.strip(), '%Y-%m-%d').date()
+    except (ValueError, AttributeError):
+        raise Exception(f"Data inválida: {valor} (esperado AAAA-MM-DD)")
+
+
+def _converter_hora(valor: str) -> Tuple[dt_time, timedelta]:
+    """Hora do filtro e a resolução informada (HH:MM cobre o minuto inteiro)"""
+    valor = valor.strip()
+    for formato, resolucao in (('%H:%M', timedelta(minutes=1)), ('%H:%M:%S', timedelta(seconds=1))):
+        try:
+            return datetime.strptime(valor, formato).time(), resolucao
+        except ValueError:
+            continue
+    raise Exception(f"Hora inválida: {valor} (esperado HH:MM)")
+
+
+def validar_filtros_data_hora(
+    data: Optional[str] = None,
+    data_inicio: Optional[str] = None,
+    data_fim: Optional[str] = None,
+    hora_inicio: Optional[str] = None,
+    hora_fim: Optional[str] = None
+) -> Optional[str]:
+    """Mensagem do primeiro filtro de data/hora em formato inválido, ou None se todos são válidos"""
+    try:
+        for valor in (data, data_inicio, data_fim):
+            if valor:
+                _converter_data(valor)
+        for valor in (hora_inicio, hora_fim):
+            if valor and valor.strip():
+                _converter_hora(valor)
+    except Exception as e:
+        return str(e)
+    return None
+
+
 def _construir_filtros(
     posto: Optional[str] = None,
     operacao: Optional[str] = None,
     data: Optional[str] = None,
     turno: Optional[List[str]] = None,
     hora_inicio: Optional[str] = None,
-    hora_fim: Optional[str] = None
+    hora_fim: Optional[str] = None,
+    data_inicio: Optional[str] = None,
+    data_fim: Optional[str] = None
 ) -> Tuple[str, List[Any]]:
+    """
+    Monta o WHERE da listagem de registros.
+
+    Um único dia (data, ou data_inicio = data_fim) vira r.data_inicio = dia, atendido
+    junto com a ordenação por registro_id pelos índices da migração 014; a janela de
+    horário desse dia é um intervalo sobre r.inicio. Vários dias viram um intervalo
+    sobre r.inicio (índices da migração 012), com o horário como filtro sobre as linhas
+    do intervalo. inicio é gravado no horário de Manaus, o mesmo fuso de
+    data_inicio/hora_inicio (preenchidos pelo trigger a partir de inicio).
+    """
     where_conditions = ["r.fim IS NOT NULL"]
     params = []
     
-    posto_id_filtro = None
+    # Nome do posto / código da operação resolvidos na própria consulta (índices da
+    # migração 013), sem carregar os catálogos; nome inexistente não retorna registros.
+    # Subconsulta escalar (um único id, como na função de entrada): a igualdade permite
+    # que os índices (posto_id, ..., registro_id) entreguem a página já ordenada
     if posto:
-        postos = Posto.listar_todos()
-        posto_obj = next((p for p in postos if p.nome == posto), None)
-        if posto_obj:
-            posto_id_filtro = posto_obj.posto_id
-            where_conditions.append("r.posto_id = %s")
-            params.append(posto_id_filtro)
-    
-    operacao_id_filtro = None
+        where_conditions.append("r.posto_id = (SELECT posto_id FROM postos WHERE nome = %s ORDER BY posto_id LIMIT 1)")
+        params.append(posto)
+    
     if operacao:
-        operacoes = Operacao.listar_todas()
-        operacao_obj = next((op for op in operacoes if op.codigo_operacao == operacao), None)
-        if operacao_obj:
-            operacao_id_filtro = operacao_obj.operacao_id
-            where_conditions.append("r.operacao_id = %s")
-            params.append(operacao_id_filtro)
-    
-    if data:
+        where_conditions.append("r.operacao_id = (SELECT operacao_id FROM operacoes WHERE codigo_operacao = %s ORDER BY operacao_id LIMIT 1)")
+        params.append(operacao)
+    
+    # Intervalo de datas (data é um único dia)
+    dia_inicial = _converter_data(data_inicio or data) if (data_inicio or data) else None
+    dia_final = _converter_data(data_fim or data) if (data_fim or data) else None
+    hora_minima = _converter_hora(hora_inicio) if hora_inicio and hora_inicio.strip() else None
+    hora_maxima = _converter_hora(hora_fim) if hora_fim and hora_fim.strip() else None
+    um_dia = dia_inicial is not None and dia_inicial == dia_final
+    
+    if um_dia:
         where_conditions.append("r.data_inicio = %s")
-        params.append(data)
+        params.append(dia_inicial)
+        if hora_minima:
+            where_conditions.append("r.inicio >= %s")
+            params.append(datetime.combine(dia_inicial, hora_minima[0]))
+        if hora_maxima:
+            where_conditions.append("r.inicio < %s")
+            params.append(datetime.combine(dia_final, hora_maxima[0]) + hora_maxima[1])
+    else:
+        if dia_inicial is not None:
+            where_conditions.append("r.inicio >= %s")
+            params.append(datetime.combine(dia_inicial, dt_time.min))
+        if dia_final is not None:
+            where_conditions.append("r.inicio < %s")
+            params.append(datetime.combine(dia_final + timedelta(days=1), dt_time.min))
     
     # Filtro por turno (através do funcionário)
     if turno and len(turno) > 0:
@@ -172,39 +254,26 @@ def _construir_filtros(
         where_conditions.append(f"f.turno IN ({placeholders})")
         params.extend(turno)
     
-    # Filtro por hora de início
-    if hora_inicio:
-        hora_inicio_formatada = hora_inicio.strip()
-        if len(hora_inicio_formatada) == 5 and ':' in hora_inicio_formatada:
-            hora_com_segundos = hora_inicio_formatada + ':00'
-            where_conditions.append("(r.hora_inicio::time >= %s::time OR (r.hora_inicio IS NULL AND r.inicio::time >= %s::time))")
-            params.append(hora_com_segundos)
-            params.append(hora_com_segundos)
-        else:
-            where_conditions.append("(r.hora_inicio::time >= %s::time OR (r.hora_inicio IS NULL AND r.inicio::time >= %s::time))")
-            params.append(hora_inicio_formatada)
-            params.append(hora_inicio_formatada)
-    
-    # Filtro por hora de fim
-    if hora_fim:
-        hora_fim_formatada = hora_fim.strip()
-        if len(hora_fim_formatada) == 5 and ':' in hora_fim_formatada:
-            hora_com_segundos = hora_fim_formatada + ':59'
-            where_conditions.append("(r.hora_inicio::time <= %s::time OR (r.hora_inicio IS NULL AND r.inicio::time <= %s::time) OR (r.fim IS NOT NULL AND r.fim::time <= %s::time))")
-            params.append(hora_com_segundos)
-            params.append(hora_com_segundos)
-            params.append(hora_com_segundos)
-        else:
-            where_conditions.append("(r.hora_inicio::time <= %s::time OR (r.hora_inicio IS NULL AND r.inicio::time <= %s::time) OR (r.fim IS NOT NULL AND r.fim::time <= %s::time))")
-            params.append(hora_fim_formatada)
-            params.append(hora_fim_formatada)
-            params.append(hora_fim_formatada)
+    # Janela de horário em vários dias (ou sem data): hora do início dentro da janela
+    if hora_minima and not um_dia:
+        where_conditions.append("r.inicio::time >= %s")
+        params.append(hora_minima[0])
+    
+    if hora_maxima and not um_dia:
+        # Último instante coberto pela hora informada (23:59 -> 23:59:59.999999)
+        where_conditions.append("r.inicio::time <= %s")
+        params.append((datetime.combine(date.min, hora_maxima[0]) + hora_maxima[1] - timedelta(microseconds=1)).time())
     
     where_clause = " AND ".join(where_conditions)
     return where_clause, params
 
 
-def _formatar_registro(row: Tuple, pecas_cache: Dict[int, List[Dict]], totens_dict: Dict[int, Dict]) -> Dict[str, Any]:
+def _formatar_registro(
+    row: Tuple,
+    pecas_por_modelo: CarregadorLotes,
+    totens_dict: Dict[int, Dict],
+    dispositivos: Optional[List[Dict[str, Any]]] = None
+) -> Dict[str, Any]:
     registro_id = row[0]
     posto_id = row[1]
     funcionario_id = row[2]
@@ -263,8 +332,8 @@ def _formatar_registro(row: Tuple, pecas_cache: Dict[int, List[Dict]], totens_di
     # Todos os totens da operação (JSON array)
     operacao_totens_json = row[35] if len(row) > 35 else []
     
-    # Buscar peças do modelo (usar cache pré-carregado)
-    pecas_modelo = pecas_cache.get(modelo_id, []) if modelo_id else []
+    # Peças do modelo (carregadas em lote junto com as dos demais modelos da página)
+    pecas_modelo = pecas_por_modelo.obter(modelo_id)
     
     # Formatar horários
     # Se hora_inicio não existe, usar o campo inicio (timestamp)
@@ -305,7 +374,7 @@ def _formatar_registro(row: Tuple, pecas_cache: Dict[int, List[Dict]], totens_di
             toten_id_int = int(p_toten_id)
             
             # Buscar informações do dispositivo primeiro
-            info_dispositivo = _buscar_info_dispositivo_por_toten(toten_id_int)
+            info_dispositivo = _buscar_info_dispositivo_por_toten(toten_id_int, dispositivos)
             serial = info_dispositivo['serial']
             nome = info_dispositivo['nome']  # nome editável do dispositivo
             dispositivo_id = info_dispositivo['dispositivo_id']
@@ -423,6 +492,46 @@ def _formatar_registro(row: Tuple, pecas_cache: Dict[int, List[Dict]], totens_di
     return registro_formatado
 
 
+def _contar_registros(where_clause: str, params: List[Any], filtro_turno: bool) -> Tuple[int, bool]:
+    """Total da listagem e se é aproximado (estimativa do planner, apenas sem filtros)"""
+    if not params and _TOTAL_APROXIMADO_MIN > 0:
+        estimativa = RegistroProducao.estimar_total()
+        if estimativa is not None and estimativa >= _TOTAL_APROXIMADO_MIN:
+            return estimativa, True
+    
+    chave = (where_clause, tuple(params), bool(filtro_turno))
+    total, _ = _totais.executar(chave, lambda: RegistroProducao.contar_registros(where_clause, params, filtro_turno))
+    return total, False
+
+
+def estatisticas_totais() -> Dict[str, Any]:
+    return _totais.estatisticas()
+
+
+def _buscar_pecas_modelos(modelos_ids: List[int]) -> Dict[int, List[Dict]]:
+    """Peças de vários modelos em uma única busca (carregar_lote do CarregadorLotes)"""
+    return {
+        modelo_id: [{
+            "id": p.id,
+            "codigo": p.codigo,
+            "nome": p.nome
+        } for p in pecas_list]
+        for modelo_id, pecas_list in Peca.buscar_por_modelos(modelos_ids).items()
+    }
+
+
+def _formatar_registros(rows: List[Tuple]) -> List[Dict[str, Any]]:
+    # Totens não são mais consultados à parte (mantido vazio para compatibilidade)
+    totens_dict = {}
+    pecas_por_modelo = CarregadorLotes(_buscar_pecas_modelos, padrao=list).agendar(
+        row[4] for row in rows if len(row) > 4
+    )
+    # Dispositivos apenas se alguma linha cair no totem do posto (sem dispositivo no registro/operação)
+    usa_totem_posto = any(not row[33] and not row[32] and row[20] for row in rows if len(row) > 33)
+    dispositivos = dispositivo_raspberry_service.listar_dispositivos() if usa_totem_posto else []
+    return [_formatar_registro(row, pecas_por_modelo, totens_dict, dispositivos) for row in rows]
+
+
 def listar_registros(
     limit: int = 100, 
     offset: int = 0, 
@@ -431,16 +540,30 @@ def listar_registros(
     operacao: Optional[str] = None,
     turno: Optional[List[str]] = None,
     hora_inicio: Optional[str] = None,
-    hora_fim: Optional[str] = None
+    hora_fim: Optional[str] = None,
+    antes_de: Optional[int] = None,
+    data_inicio: Optional[str] = None,
+    data_fim: Optional[str] = None
 ) -> Dict[str, Any]:
-    """Lista registros de produção usando o model"""
+    """
+    Lista registros de produção usando o model
+
+    Args:
+        data_inicio, data_fim: intervalo de datas (inclusivo, AAAA-MM-DD); data é um único dia
+        antes_de: cursor da página (registro_id); quando informado, substitui o offset e
+            a página custa o mesmo que a primeira. A resposta traz o cursor da próxima
+            página em proximo_antes_de.
+    """
     
     if not RegistroProducao.verificar_tabela_existe():
         return {
             "registros": [],
             "total": 0,
+            "total_aproximado": False,
             "limit": limit,
-            "offset": offset
+            "offset": offset,
+            "antes_de": antes_de,
+            "proximo_antes_de": None
         }
     
     try:
@@ -449,53 +572,29 @@ def listar_registros(
         
         # Construir filtros
         where_clause, params = _construir_filtros(
-            posto, operacao, data, turno, hora_inicio, hora_fim
+            posto, operacao, data, turno, hora_inicio, hora_fim, data_inicio, data_fim
         )
         
-        # Contar registros
+        # Contar registros (em cache por filtro)
         filtro_turno = turno and len(turno) > 0
-        total = RegistroProducao.contar_registros(where_clause, params, filtro_turno)
+        total, total_aproximado = _contar_registros(where_clause, params, filtro_turno)
         
         # Buscar registros com relacionamentos
         rows = RegistroProducao.buscar_registros_com_relacionamentos(
-            where_clause, params, limit, offset, tem_coluna_nome_operacao
+            where_clause, params, limit, offset, tem_coluna_nome_operacao, antes_de=antes_de
         )
         
-        # Otimização: buscar totens uma única vez (não usado mais, mas mantido para compatibilidade)
-        totens = []
-        totens_dict = {}
-        
-        # Otimização: buscar peças de modelos únicos de uma vez
-        modelos_ids_unicos = set()
-        for row in rows:
-            modelo_id = row[4] if len(row) > 4 and row[4] else None
-            if modelo_id:
-                modelos_ids_unicos.add(modelo_id)
-        
-        # Buscar peças de todos os modelos de uma vez
-        pecas_cache = {}
-        for modelo_id in modelos_ids_unicos:
-            try:
-                pecas_list = Peca.buscar_por_modelo_id(modelo_id)
-                pecas_cache[modelo_id] = [{
-                    "id": p.id,
-                    "codigo": p.codigo,
-                    "nome": p.nome
-                } for p in pecas_list]
-            except:
-                pecas_cache[modelo_id] = []
-        
         # Formatar registros
-        registros_formatados = []
-        for row in rows:
-            registro = _formatar_registro(row, pecas_cache, totens_dict)
-            registros_formatados.append(registro)
+        registros_formatados = _formatar_registros(rows)
         
         return {
             "registros": registros_formatados,
             "total": total,
+            "total_aproximado": total_aproximado,
             "limit": limit,
-            "offset": offset
+            "offset": 0 if antes_de is not None else offset,
+            "antes_de": antes_de,
+            "proximo_antes_de": rows[-1][0] if len(rows) == limit else None
         }
         
     except Exception as e:
@@ -505,6 +604,25 @@ def listar_registros(
         raise Exception(f"Erro ao listar registros: {str(e)}")
 
 
+def buscar_registros_formatados(registro_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+    """
+    Registros da listagem (encerrados) no mesmo formato de listar_registros, por id.
+    Ids ausentes do resultado não aparecem na listagem (em aberto ou excluídos).
+    """
+    ids = sorted({int(registro_id) for registro_id in registro_ids})
+    if not ids:
+        return {}
+    
+    rows = RegistroProducao.buscar_registros_com_relacionamentos(
+        "r.fim IS NOT NULL AND r.registro_id = ANY(%s)",
+        [ids],
+        len(ids),
+        0,
+        RegistroProducao.verificar_coluna_nome_operacao()
+    )
+    return {registro["id"]: registro for registro in _formatar_registros(rows)}
+
+
 def atualizar_comentario(registro_id: int, comentario: str) -> Dict[str, Any]:
     """Atualiza o comentário de um registro de produção usando o model"""
     
@@ -556,4 +674,9 @@ def deletar_registros_multiplos(registro_ids: List[int]) -> Dict[str, Any]:
         import traceback
         error_details = traceback.format_exc()
         print(f"Erro ao deletar registros: {error_details}")
-        raise Exception(f"Erro ao deletar registros: {str(e)}")
\ No newline at end of file
+        raise Exception(f"Erro ao deletar registros: {str(e)}")
+
+
+# O filtro de turno depende de funcionarios (JOIN), os demais dos registros encerrados
+for _tabela in ('registros_encerrados', 'funcionarios'):
+    cache.ao_invalidar(_tabela, _totais.limpar)
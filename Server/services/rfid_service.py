@@ -1,48 +1,178 @@
-from typing import Dict, Any, Optional
+import os
+from typing import Dict, Any, Optional, List, Callable, Hashable, Tuple
+from datetime import datetime
 from Server.models.funcionario import Funcionario
+from Server.models.database import DatabaseConnection
+from Server.utils.janela_resultados import JanelaResultados
+try:
+    from zoneinfo import ZoneInfo
+    TZ_MANAUS = ZoneInfo('America/Manaus')
+except ImportError:
+    # Fallback para Python < 3.9
+    import pytz
+    TZ_MANAUS = pytz.timezone('America/Manaus')
+
+# Leitores RFID repetem a mesma leitura várias vezes em menos de um segundo: dentro da
+# janela (RFID_DEBOUNCE_MS) a mesma tag no mesmo posto recebe o resultado da primeira
+# leitura sem acessar o banco (evita que a repetição transforme a entrada em saída)
+_debounce = JanelaResultados(
+    'debounce_rfid',
+    janela=float(os.getenv('RFID_DEBOUNCE_MS', '2000')) / 1000,
+    max_entradas=int(os.getenv('RFID_DEBOUNCE_MAX', '10000'))
+)
+# Requisições reenviadas com a mesma chave de idempotência recebem a resposta original
+_idempotencia = JanelaResultados(
+    'idempotencia_rfid',
+    janela=float(os.getenv('RFID_IDEMPOTENCIA_TTL', '600')),
+    max_entradas=int(os.getenv('RFID_IDEMPOTENCIA_MAX', '10000'))
+)
 
 
 # Processa leitura RFID e registra entrada ou saída automaticamente
-def processar_leitura_rfid(tag_id: str, posto: Optional[str] = None) -> Dict[str, Any]:
-    from Server.models import PostoConfiguracao, ProducaoRegistro
-    from Server.services import producao_service
-    from Server.services import tags_temporarias_service
+def processar_leitura_rfid(
+    tag_id: str,
+    posto: Optional[str] = None,
+    lido_em: Optional[datetime] = None,
+    chave_idempotencia: Optional[str] = None
+) -> Dict[str, Any]:
+    def executar() -> Dict[str, Any]:
+        resultado, duplicada = _debounce.executar((tag_id, posto or ''), lambda: _processar_em_transacao(tag_id, posto, lido_em))
+        return {**resultado, "duplicada": True} if duplicada else dict(resultado)
     
-    # Primeiro verificar se é uma tag temporária
-    funcionario_dict = tags_temporarias_service.buscar_funcionario_por_tag_temporaria(tag_id)
+    if chave_idempotencia:
+        return dict(_idempotencia.executar(('leitura', chave_idempotencia), executar)[0])
+    return executar()
+
+
+def _processar_em_transacao(tag_id: str, posto: Optional[str], lido_em: Optional[datetime]) -> Dict[str, Any]:
+    # Toda a leitura (consultas, decisão entrada/saída e gravação) em uma única transação
+    with DatabaseConnection.transaction():
+        return _processar_leitura(tag_id, posto, lido_em)
+
+
+# Processa um lote ordenado de leituras (ex.: buffer de um totem que ficou sem rede)
+def processar_lote_rfid(eventos: List[Dict[str, Any]], chave_idempotencia: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Processa os eventos na ordem recebida, em uma única transação, usando o
+    horário original de cada leitura (lido_em). Cada evento roda em um
+    savepoint: uma leitura inválida vira um resultado 'erro' sem desfazer as
+    demais. Tag, posto e produto são resolvidos uma vez por lote e leituras
+    repetidas da mesma tag/posto dentro da janela de debounce (pelo lido_em)
+    recebem o resultado da anterior, marcadas como duplicadas.
+    """
+    if chave_idempotencia:
+        resultados, _ = _idempotencia.executar(('lote', chave_idempotencia), lambda: _processar_lote(eventos))
+        return [dict(resultado) for resultado in resultados]
+    return _processar_lote(eventos)
+
+
+def _processar_lote(eventos: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    resultados: List[Dict[str, Any]] = []
+    memo: Dict[Hashable, Any] = {}
+    ultimas: Dict[Tuple[str, str], Tuple[datetime, Dict[str, Any]]] = {}
     
-    if funcionario_dict:
-        # É uma tag temporária, buscar o funcionário pelo ID
-        funcionario = Funcionario.buscar_por_id(funcionario_dict.get('id') or funcionario_dict.get('funcionario_id'))
-    else:
-        # Buscar funcionário diretamente pela tag permanente
-        funcionario = Funcionario.buscar_por_tag(tag_id)
+    with DatabaseConnection.transaction() as tx:
+        for indice, evento in enumerate(eventos):
+            evento = evento if isinstance(evento, dict) else {}
+            tag_id = str(evento.get('tag_id') or '').strip()
+            posto = evento.get('posto') or None
+            base = {"indice": indice, "tag_id": tag_id, "lido_em": evento.get('lido_em')}
+            try:
+                if not tag_id:
+                    raise Exception("Código da tag RFID (tag_id) é obrigatório")
+                lido_em = converter_lido_em(evento.get('lido_em')) or datetime.now(TZ_MANAUS)
+                
+                chave = (tag_id, posto or '')
+                anterior = ultimas.get(chave)
+                if anterior and 0 <= (lido_em - anterior[0]).total_seconds() < _debounce.janela:
+                    resultados.append({**base, **anterior[1], "duplicada": True})
+                    continue
+                
+                with tx.savepoint():
+                    resultado = _processar_leitura(tag_id, posto, lido_em, memo)
+                ultimas[chave] = (lido_em, resultado)
+                resultados.append({**base, **resultado})
+            except Exception as e:
+                resultados.append({**base, "tipo": "erro", "posto": posto, "message": str(e)})
     
-    if not funcionario:
-        raise Exception(f"Tag RFID '{tag_id}' não está associada a nenhum funcionário.")
+    return resultados
+
+
+# Contadores do debounce e da idempotência (leituras suprimidas, entradas na janela)
+def estatisticas() -> Dict[str, Any]:
+    return {
+        "debounce": _debounce.estatisticas(),
+        "idempotencia": _idempotencia.estatisticas()
+    }
+
+
+# Converte o horário da leitura enviado pelo totem (ISO 8601 ou epoch em segundos)
+def converter_lido_em(valor: Any) -> Optional[datetime]:
+    if valor is None or valor == '':
+        return None
+    try:
+        if isinstance(valor, (int, float)):
+            return datetime.fromtimestamp(valor, TZ_MANAUS)
+        momento = datetime.fromisoformat(str(valor).strip().replace('Z', '+00:00'))
+    except (ValueError, TypeError, OverflowError, OSError):
+        raise Exception(f"Horário de leitura (lido_em) inválido: '{valor}'")
+    # Sem fuso explícito, o horário já é o local do totem (Manaus)
+    if momento.tzinfo is None:
+        return momento.replace(tzinfo=TZ_MANAUS)
+    return momento.astimezone(TZ_MANAUS)
+
+
+def _processar_leitura(
+    tag_id: str,
+    posto: Optional[str],
+    lido_em: Optional[datetime],
+    memo: Optional[Dict[Hashable, Any]] = None
+) -> Dict[str, Any]:
+    from Server.services import producao_service
     
-    funcionario = _buscar_funcionario_valido(funcionario.matricula)
+    funcionario = _memorizar(memo, ('tag', tag_id), lambda: _buscar_funcionario_por_tag(tag_id))
     
     if not posto:
-        posto = _buscar_posto_funcionario(funcionario)
+        posto = _memorizar(memo, ('posto', funcionario.matricula), lambda: _buscar_posto_funcionario(funcionario))
     
-    produto = _buscar_produto_posto(posto)
+    # Posto sem produto configurado recusa a leitura (entrada ou saída), como antes
+    produto = _memorizar(memo, ('produto', posto), lambda: _buscar_produto_posto(posto))
     
-    registro_aberto = ProducaoRegistro.buscar_registro_aberto(posto=posto, funcionario_matricula=funcionario.matricula)
+    # Fechar o registro aberto, se houver (o lock da função impede que duas leituras
+    # simultâneas da mesma tag vejam "nenhum registro aberto" e é mantido até o commit)
+    saida = producao_service.fechar_registro_aberto(
+        posto=posto,
+        funcionario_matricula=funcionario.matricula,
+        momento=lido_em
+    )
+    if saida:
+        return _registrar_saida(saida, posto, funcionario)
     
-    if registro_aberto:
-        return _registrar_saida(registro_aberto, posto, funcionario, producao_service)
-    else:
-        return _registrar_entrada(posto, funcionario, produto, producao_service)
+    return _registrar_entrada(posto, funcionario, produto, producao_service, lido_em)
+
 
+# Reaproveita consultas dentro de um lote (sem memo, apenas executa)
+def _memorizar(memo: Optional[Dict[Hashable, Any]], chave: Hashable, buscar: Callable[[], Any]) -> Any:
+    if memo is None:
+        return buscar()
+    if chave not in memo:
+        try:
+            memo[chave] = (True, buscar())
+        except Exception as e:
+            memo[chave] = (False, e)
+    sucesso, valor = memo[chave]
+    if not sucesso:
+        raise valor
+    return valor
 
-# Busca e valida funcionário
-def _buscar_funcionario_valido(matricula: str):
-    from Server.models.funcionario import Funcionario
+
+# Identifica o funcionário pela tag (temporária ou permanente) no mapa em memória
+def _buscar_funcionario_por_tag(tag_id: str):
+    from Server.models.resolvedor_tags import ResolvedorTags
     
-    funcionario = Funcionario.buscar_por_matricula(matricula)
+    funcionario = ResolvedorTags.resolver(tag_id)
     if not funcionario:
-        raise Exception(f"Funcionário com matrícula '{matricula}' não encontrado.")
+        raise Exception(f"Tag RFID '{tag_id}' não está associada a nenhum funcionário.")
     if not funcionario.ativo:
         raise Exception(f"Funcionário '{funcionario.nome}' está inativo.")
     return funcionario
@@ -74,14 +204,8 @@ def _buscar_produto_posto(posto: str) -> str:
     return config.modelo_codigo
 
 
-# Registra saída do funcionário
-def _registrar_saida(registro, posto: str, funcionario, producao_service) -> Dict[str, Any]:
-    resultado = producao_service.registrar_saida(
-        registro_id=registro.id,
-        posto=posto,
-        funcionario_matricula=funcionario.matricula
-    )
-    
+# Formata a saída do funcionário
+def _registrar_saida(resultado: Dict[str, Any], posto: str, funcionario) -> Dict[str, Any]:
     return {
         "tipo": "saida",
         "message": f"Saída registrada para {funcionario.nome}",
@@ -94,11 +218,12 @@ def _registrar_saida(registro, posto: str, funcionario, producao_service) -> Dic
 
 
 # Registra entrada do funcionário
-def _registrar_entrada(posto: str, funcionario, produto: str, producao_service) -> Dict[str, Any]:
+def _registrar_entrada(posto: str, funcionario, produto: str, producao_service, lido_em: Optional[datetime] = None) -> Dict[str, Any]:
     resultado = producao_service.registrar_entrada(
         posto=posto,
         funcionario_matricula=funcionario.matricula,
-        modelo_codigo=produto
+        modelo_codigo=produto,
+        momento=lido_em
     )
     
     if not resultado or not resultado.get("registro_id"):
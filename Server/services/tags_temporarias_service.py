@@ -1,6 +1,8 @@
+import os
 from typing import Dict, Any, Optional, List
 from Server.models.tag_temporaria import TagTemporaria
 from Server.models.funcionario import Funcionario
+from Server.models.resolvedor_tags import ResolvedorTags
 from datetime import datetime, timedelta
 try:
     from zoneinfo import ZoneInfo
@@ -32,13 +34,12 @@ def listar_tags_temporarias_funcionario(funcionario_id: int) -> List[Dict[str, A
     return [tag.to_dict() for tag in tags]
 
 def buscar_funcionario_por_tag_temporaria(tag_id: str) -> Optional[Dict[str, Any]]:
-    limpar_tags_expiradas_automaticamente()
-    
-    tag = TagTemporaria.buscar_por_tag_id(tag_id)
-    if not tag:
+    # Somente leitura: consulta o mapa de tags em memória (expiradas já são ignoradas)
+    resolvido = ResolvedorTags.resolver(tag_id)
+    if not resolvido or not resolvido.temporaria:
         return None
     
-    funcionario = Funcionario.buscar_por_id(tag.funcionario_id)
+    funcionario = Funcionario.buscar_por_id(resolvido.funcionario_id)
     if not funcionario:
         return None
     
@@ -54,23 +55,22 @@ def excluir_tag_temporaria(tag_id: str) -> None:
 
 
 def limpar_tags_expiradas() -> int:
-    TagTemporaria.excluir_expiradas()
-    
-    # Também excluir fisicamente tags muito antigas (mais de 24 horas expiradas)
-    from Server.models.database import DatabaseConnection
-    
+    # Excluir fisicamente tags muito antigas (mais de 24 horas expiradas)
     limite_exclusao = datetime.now(TZ_MANAUS) - timedelta(hours=24)
-    query = """
-        DELETE FROM tags_temporarias 
-        WHERE data_expiracao < %s
-    """
-    DatabaseConnection.execute_query(query, (limite_exclusao,)) 
-    return 0 
-
+    removidas = TagTemporaria.remover_expiradas_antes_de(limite_exclusao)
+    
+    # As demais expiradas ficam apenas inativas
+    desativadas = TagTemporaria.excluir_expiradas()
+    return removidas + desativadas
 
-def limpar_tags_expiradas_automaticamente() -> None:
-    try:
-        limpar_tags_expiradas()
-    except Exception as e:
-        print(f"Erro ao limpar tags expiradas automaticamente: {e}")
 
+def agendar_limpeza_tags_expiradas() -> None:
+    """
+    Registra a limpeza de tags expiradas no agendador em segundo plano
+    (TAGS_TEMPORARIAS_LIMPEZA_INTERVALO, em segundos; 0 desabilita).
+    As buscas já ignoram tags expiradas, então a limpeza não precisa ser imediata.
+    """
+    from Server.utils.agendador import Agendador
+    
+    intervalo = float(os.getenv('TAGS_TEMPORARIAS_LIMPEZA_INTERVALO', '300'))
+    Agendador.registrar('limpeza_tags_temporarias', intervalo, limpar_tags_expiradas)
@@ -0,0 +1,97 @@
+"""
+Agendador de tarefas periódicas em segundo plano
+
+Uma única thread por processo executa as tarefas registradas no intervalo
+configurado de cada uma (manutenção que não deve ficar no caminho das
+requisições, como a expiração de tags temporárias). Falhas são registradas e
+a tarefa volta a rodar no próximo intervalo.
+"""
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+
+class Agendador:
+    """Executa tarefas registradas periodicamente em uma thread dedicada"""
+
+    _thread: Optional[threading.Thread] = None
+    _parar = threading.Event()
+    _acordar = threading.Event()
+    _lock = threading.Lock()
+    _tarefas: Dict[str, Dict[str, Any]] = {}
+
+    @classmethod
+    def registrar(cls, nome: str, intervalo: float, funcao: Callable[[], Any], imediata: bool = True) -> None:
+        """
+        Registra (ou substitui) uma tarefa. intervalo <= 0 desabilita a tarefa.
+
+        Args:
+            imediata: executa logo ao iniciar, sem esperar o primeiro intervalo
+        """
+        if intervalo <= 0:
+            return
+        with cls._lock:
+            cls._tarefas[nome] = {
+                'funcao': funcao,
+                'intervalo': intervalo,
+                'proxima': time.monotonic() + (0 if imediata else intervalo),
+                'execucoes': 0,
+                'falhas': 0,
+                'ultima_execucao': None,
+                'ultima_duracao_ms': None,
+                'ultimo_resultado': None,
+                'ultimo_erro': None,
+            }
+        cls._acordar.set()
+
+    @classmethod
+    def iniciar(cls) -> None:
+        """Inicia a thread do agendador (idempotente)"""
+        with cls._lock:
+            if cls._thread is not None and cls._thread.is_alive():
+                return
+            cls._parar.clear()
+            cls._thread = threading.Thread(target=cls._executar, name='agendador', daemon=True)
+            cls._thread.start()
+
+    @classmethod
+    def parar(cls) -> None:
+        cls._parar.set()
+        cls._acordar.set()
+
+    @classmethod
+    def estatisticas(cls) -> Dict[str, Any]:
+        with cls._lock:
+            return {
+                nome: {chave: valor for chave, valor in tarefa.items() if chave not in ('funcao', 'proxima')}
+                for nome, tarefa in cls._tarefas.items()
+            }
+
+    @classmethod
+    def _executar(cls) -> None:
+        while not cls._parar.is_set():
+            agora = time.monotonic()
+            with cls._lock:
+                pendentes = [(nome, tarefa) for nome, tarefa in cls._tarefas.items() if tarefa['proxima'] <= agora]
+                proxima = min((tarefa['proxima'] for tarefa in cls._tarefas.values()), default=agora + 60)
+
+            for nome, tarefa in pendentes:
+                inicio = time.monotonic()
+                resultado, erro = None, None
+                try:
+                    resultado = tarefa['funcao']()
+                except Exception as e:
+                    erro = str(e)
+                    print(f"[AVISO] Tarefa agendada '{nome}' falhou: {e}")
+                with cls._lock:
+                    tarefa['execucoes'] += 1
+                    tarefa['falhas'] += 1 if erro else 0
+                    tarefa['ultima_execucao'] = time.time()
+                    tarefa['ultima_duracao_ms'] = round((time.monotonic() - inicio) * 1000, 2)
+                    tarefa['ultimo_resultado'] = resultado
+                    tarefa['ultimo_erro'] = erro
+                    tarefa['proxima'] = time.monotonic() + tarefa['intervalo']
+
+            if not pendentes:
+                cls._acordar.wait(max(proxima - time.monotonic(), 0.05))
+                cls._acordar.clear()
@@ -0,0 +1,160 @@
+"""
+Benchmark de operacao_service.listar_operacoes()
+
+Compara a implementação anterior (consultas por operação) com a atual
+(uma consulta com joins + agregação JSON, servida pelo catálogo em memória).
+Mede número de consultas (empréstimos de conexão do pool) e latência.
+
+Uso (a partir da raiz do repositório, com as variáveis DB_* configuradas):
+    python -m Server.utils.benchmark_operacoes [repeticoes]
+"""
+import statistics
+import sys
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+from Server.models.database import DatabaseConnection
+from Server.services import operacao_service
+
+
+def _listar_operacoes_legado() -> List[Dict[str, Any]]:
+    """Cópia da implementação anterior, sem cache de referência (uma consulta por busca)"""
+    from Server.models.dispositivo_raspberry import DispositivoRaspberry
+    from Server.models.peca import Peca
+
+    def consultar(query: str, params: Any = None, **kwargs: Any) -> Any:
+        return DatabaseConnection.execute_query(query, params, **kwargs)
+
+    def dispositivos() -> List[Dict[str, Any]]:
+        rows = consultar("SELECT id, serial, nome, data_registro FROM dispositivos_raspberry ORDER BY data_registro DESC", fetch_all=True)
+        return [DispositivoRaspberry.from_row(row).to_dict() for row in rows or []]
+
+    coluna_nome = 'nome' if DatabaseConnection.column_exists('operacoes', 'nome') else 'NULL'
+    operacoes = consultar(
+        f"SELECT operacao_id, codigo_operacao, {coluna_nome}, produto_id, modelo_id, sublinha_id, posto_id "
+        f"FROM operacoes ORDER BY {coluna_nome}, codigo_operacao",
+        fetch_all=True
+    ) or []
+    operacoes_agrupadas: Dict[str, Dict[str, Any]] = {}
+
+    for operacao_id, codigo_operacao, nome, produto_id, modelo_id, sublinha_id, posto_id in operacoes:
+        produto = consultar("SELECT nome FROM produtos WHERE produto_id = %s", (produto_id,), fetch_one=True) if produto_id else None
+        modelo = consultar("SELECT nome FROM modelos WHERE modelo_id = %s", (modelo_id,), fetch_one=True) if modelo_id else None
+        sublinha = consultar("SELECT linha_id FROM sublinhas WHERE sublinha_id = %s", (sublinha_id,), fetch_one=True) if sublinha_id else None
+        linha = consultar("SELECT nome FROM linhas WHERE linha_id = %s", (sublinha[0],), fetch_one=True) if sublinha else None
+        posto = consultar("SELECT nome, toten_id FROM postos WHERE posto_id = %s", (posto_id,), fetch_one=True) if posto_id else None
+        nome_operacao = nome or codigo_operacao
+        chave = f"{nome_operacao}_{produto_id if produto else ''}_{modelo_id if modelo else ''}_{sublinha_id if sublinha else ''}_{posto_id if posto else ''}"
+        if chave in operacoes_agrupadas:
+            continue
+
+        totens_rows = consultar("SELECT DISTINCT toten_nome FROM operacao_totens WHERE operacao_id = %s", (operacao_id,), fetch_all=True)
+        totens = [row[0] for row in totens_rows] if totens_rows else []
+        if not totens and posto:
+            totens = [f'ID-{posto[1]}']
+
+        pecas_rows = consultar(
+            "SELECT p.peca_id FROM operacao_pecas op INNER JOIN pecas p ON op.peca_id = p.peca_id WHERE op.operacao_id = %s",
+            (operacao_id,), fetch_all=True
+        )
+        pecas_relacionadas = [
+            consultar("SELECT codigo, nome FROM pecas WHERE peca_id = %s", (row[0],), fetch_one=True)
+            for row in pecas_rows or []
+        ]
+        pecas_codigos = [p[0] for p in pecas_relacionadas if p]
+        pecas_nomes = [p[1] for p in pecas_relacionadas if p]
+        if not pecas_codigos and modelo:
+            pecas_modelo = Peca.buscar_por_modelo_id(modelo_id)
+            pecas_codigos = list(set(p.codigo for p in pecas_modelo))
+            pecas_nomes = list(set(p.nome for p in pecas_modelo))
+
+        codigos_list = [codigo_operacao] if codigo_operacao else []
+        if not codigos_list and pecas_codigos:
+            codigos_list = [pecas_codigos[0]]
+
+        serial, hostname, dispositivo_id = '', '', None
+        if posto:
+            lista = dispositivos()
+            indice = posto[1] - 1 if posto[1] > 0 else 0
+            if indice < len(lista):
+                serial = lista[indice].get('serial', '')
+                hostname = lista[indice].get('nome', '')
+                dispositivo_id = lista[indice].get('id')
+
+        operacoes_agrupadas[chave] = {
+            'id': str(operacao_id),
+            'operacao': nome_operacao,
+            'produto': produto[0] if produto else '',
+            'modelo': modelo[0] if modelo else '',
+            'linha': linha[0] if linha else '',
+            'posto': posto[0] if posto else '',
+            'totens': totens,
+            'pecas': pecas_codigos,
+            'pecas_nomes': pecas_nomes,
+            'codigos': codigos_list,
+            'serial': serial,
+            'hostname': hostname,
+            'dispositivo_id': dispositivo_id
+        }
+
+    resultado = list(operacoes_agrupadas.values())
+    resultado.sort(key=lambda x: x.get('operacao', ''))
+    return resultado
+
+
+def _medir(nome: str, funcao: Callable[[], List[Dict[str, Any]]], repeticoes: int,
+           antes: Callable[[], None] = lambda: None) -> List[Dict[str, Any]]:
+    tempos: List[float] = []
+    consultas: List[int] = []
+    resultado: List[Dict[str, Any]] = []
+    for _ in range(repeticoes):
+        antes()
+        emprestimos = DatabaseConnection.get_pool_stats()['emprestimos']
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+        consultas.append(DatabaseConnection.get_pool_stats()['emprestimos'] - emprestimos)
+
+    print(
+        f"{nome:<36} consultas={statistics.median(consultas):>6.0f}  "
+        f"mediana={statistics.median(tempos):>9.2f} ms  max={max(tempos):>9.2f} ms  "
+        f"operações={len(resultado)}"
+    )
+    return resultado
+
+
+def _chave_ordenacao(valor: Any) -> Tuple[bool, str]:
+    return (valor is None, str(valor))
+
+
+def _normalizar(operacoes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Listas agregadas sem ordem definida (DISTINCT/set) são comparadas ordenadas.
+    A chave aceita None e tipos misturados nas listas (None por último).
+    """
+    return [
+        {chave: sorted(valor, key=_chave_ordenacao) if isinstance(valor, list) else valor
+         for chave, valor in op.items()}
+        for op in operacoes
+    ]
+
+
+def main() -> None:
+    repeticoes = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    DatabaseConnection.refresh_schema()
+    total = DatabaseConnection.execute_query("SELECT COUNT(*) FROM operacoes", fetch_one=True)[0]
+    print(f"Operações cadastradas: {total} | repetições: {repeticoes}\n")
+
+    legado = _medir("antes (consultas por operação)", _listar_operacoes_legado, repeticoes)
+    frio = _medir("depois (consulta única, sem cache)", operacao_service.listar_operacoes, repeticoes,
+                  antes=operacao_service._catalogo_listagem.invalidar)
+    _medir("depois (catálogo em memória)", operacao_service.listar_operacoes, repeticoes)
+
+    if _normalizar(legado) == _normalizar(frio):
+        print("\nResultados idênticos entre as duas implementações")
+    else:
+        print("\n[AVISO] Resultados diferentes entre as duas implementações")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""
+Carregamento em lote de relacionamentos (padrão dataloader)
+
+Um CarregadorLotes vive durante uma requisição (ou uma listagem): as chaves
+agendadas com `agendar` são acumuladas e, na primeira leitura com `obter`,
+todas as pendentes são buscadas em uma única chamada de `carregar_lote`. Os
+resultados ficam memorizados na instância, então chaves repetidas não voltam
+ao banco. Chaves ausentes do resultado do lote recebem o valor padrão.
+"""
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional
+
+
+class CarregadorLotes:
+    """Agrupa chaves em uma única chamada ao carregador e memoriza os resultados"""
+
+    def __init__(
+        self,
+        carregar_lote: Callable[[List[Hashable]], Dict[Hashable, Any]],
+        padrao: Optional[Callable[[], Any]] = None
+    ) -> None:
+        """
+        Args:
+            carregar_lote: recebe a lista de chaves pendentes e retorna chave -> valor
+            padrao: fábrica do valor das chaves que o lote não retornou (ex.: list)
+        """
+        self._carregar_lote = carregar_lote
+        self._padrao = padrao
+        self._resultados: Dict[Hashable, Any] = {}
+        self._pendentes: Dict[Hashable, None] = {}
+        self.lotes = 0
+
+    def agendar(self, chaves: Iterable[Hashable]) -> 'CarregadorLotes':
+        """Acumula as chaves para o próximo lote (None e já carregadas são ignoradas)"""
+        for chave in chaves:
+            if chave is not None and chave not in self._resultados:
+                self._pendentes[chave] = None
+        return self
+
+    def obter(self, chave: Hashable) -> Any:
+        """Valor da chave, carregando junto todas as chaves pendentes se necessário"""
+        if chave is None:
+            return self._padrao() if self._padrao else None
+        if chave not in self._resultados:
+            self._pendentes[chave] = None
+            self._carregar_pendentes()
+        return self._resultados[chave]
+
+    def obter_varios(self, chaves: Iterable[Hashable]) -> Dict[Hashable, Any]:
+        chaves = list(chaves)
+        self.agendar(chaves)
+        return {chave: self.obter(chave) for chave in chaves}
+
+    def _carregar_pendentes(self) -> None:
+        chaves = list(self._pendentes)
+        self._pendentes.clear()
+        self.lotes += 1
+        resultados = self._carregar_lote(chaves) or {}
+        for chave in chaves:
+            if chave in resultados:
+                self._resultados[chave] = resultados[chave]
+            else:
+                self._resultados[chave] = self._padrao() if self._padrao else None
@@ -0,0 +1,111 @@
+"""
+Janela de resultados recentes em memória (debounce e idempotência)
+
+Guarda o resultado de uma operação por chave durante `janela` segundos. Uma
+nova chamada com a mesma chave dentro da janela recebe o resultado guardado
+sem executar a operação de novo; chamadas simultâneas aguardam a primeira
+(single-flight). As entradas ficam em ordem de criação (OrderedDict), então as
+expiradas são removidas pelo início e, acima de `max_entradas`, a mais antiga
+é descartada.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class _Entrada:
+    __slots__ = ('criada_em', 'pronta', 'resultado', 'erro')
+
+    def __init__(self, criada_em: float) -> None:
+        self.criada_em = criada_em
+        self.pronta = threading.Event()
+        self.resultado: Any = None
+        self.erro: Optional[BaseException] = None
+
+
+class JanelaResultados:
+    """Resultados por chave com expiração por tempo e tamanho limitado"""
+
+    def __init__(self, nome: str, janela: float, max_entradas: int = 10000, espera_maxima: float = 10.0) -> None:
+        self.nome = nome
+        self.janela = janela
+        self.max_entradas = max_entradas
+        self.espera_maxima = espera_maxima
+        self._entradas: 'OrderedDict[Hashable, _Entrada]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'execucoes': 0, 'reaproveitadas': 0, 'aguardaram': 0, 'expiradas': 0, 'despejadas': 0}
+
+    def executar(self, chave: Hashable, funcao: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Executa `funcao` ou devolve o resultado guardado para a chave.
+
+        Returns:
+            (resultado, reaproveitado) - reaproveitado=True quando a operação
+            não foi executada nesta chamada
+        """
+        if self.janela <= 0:
+            return funcao(), False
+
+        agora = time.monotonic()
+        with self._lock:
+            self._expirar(agora)
+            entrada = self._entradas.get(chave)
+            if entrada is None:
+                entrada = _Entrada(agora)
+                self._entradas[chave] = entrada
+                self._stats['execucoes'] += 1
+                dona = True
+                while len(self._entradas) > self.max_entradas:
+                    self._entradas.popitem(last=False)
+                    self._stats['despejadas'] += 1
+            else:
+                dona = False
+                self._stats['aguardaram' if not entrada.pronta.is_set() else 'reaproveitadas'] += 1
+
+        if not dona:
+            if not entrada.pronta.wait(self.espera_maxima):
+                raise Exception(f"Tempo esgotado aguardando leitura anterior em andamento ({self.nome})")
+            if entrada.erro is not None:
+                raise entrada.erro
+            return entrada.resultado, True
+
+        try:
+            entrada.resultado = funcao()
+            return entrada.resultado, False
+        except BaseException as e:
+            # Falhas não ficam na janela: a próxima tentativa executa de novo
+            entrada.erro = e
+            with self._lock:
+                if self._entradas.get(chave) is entrada:
+                    del self._entradas[chave]
+            raise
+        finally:
+            entrada.pronta.set()
+
+    def descartar(self, chave: Hashable) -> None:
+        with self._lock:
+            self._entradas.pop(chave, None)
+
+    def limpar(self) -> None:
+        with self._lock:
+            self._entradas.clear()
+
+    def estatisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            self._expirar(time.monotonic())
+            return {
+                **self._stats,
+                'entradas': len(self._entradas),
+                'janela_segundos': self.janela,
+                'max_entradas': self.max_entradas,
+            }
+
+    def _expirar(self, agora: float) -> None:
+        # Chamado com self._lock adquirido; as mais antigas estão no início
+        while self._entradas:
+            entrada = next(iter(self._entradas.values()))
+            if agora - entrada.criada_em < self.janela or not entrada.pronta.is_set():
+                break
+            self._entradas.popitem(last=False)
+            self._stats['expiradas'] += 1
@@ -0,0 +1,197 @@
+"""
+Verificação dos planos de execução dos filtros da listagem de registros
+
+Para cada combinação de filtros usada na tela de Registros, monta o WHERE com
+registro_service._construir_filtros e roda EXPLAIN (FORMAT JSON) da contagem e da
+página da listagem (RegistroProducao.montar_consulta_pagina, com e sem o cursor
+antes_de). A combinação passa quando registros_producao é lida por índice com
+condição sobre inicio/data_inicio (Index Cond), e não por Seq Scan. Com volume
+sintético, nas combinações de um único dia (sem janela de horário ou turno) a página
+deve vir ordenada do próprio índice (Index Scan, com o cursor também no Index Cond),
+para que a leitura pare no LIMIT.
+
+Intervalos de vários dias não têm índice que atenda ao intervalo e à ordenação por
+registro_id ao mesmo tempo: a página deles é exibida como [INFO], sem contar como
+falha (o cursor limita as páginas seguintes; a primeira percorre os registros mais
+novos que o fim do intervalo).
+
+Sem volume sintético, o plano é gerado com enable_seqscan = off: em bases pequenas o
+planner prefere Seq Scan mesmo com índice disponível, e o que se verifica é se o
+predicado permite o uso do índice. Sai com código 1 se alguma verificação falhar.
+
+Os planos dependem das estatísticas: em bases de desenvolvimento, informe um volume
+de registros sintéticos, inseridos e analisados dentro da transação da verificação
+e desfeitos ao final (ANALYZE ainda atualiza a estimativa de linhas da tabela até o
+próximo autovacuum, então não use o volume na base de produção).
+
+Uso (a partir da raiz do repositório, com as variáveis DB_* configuradas):
+    python -m Server.utils.verificar_planos_registros [volume_sintetico]
+"""
+import json
+import sys
+from datetime import date, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from Server.models.database import DatabaseConnection
+from Server.models.registros import RegistroProducao
+from Server.services import registro_service
+
+
+def _combinacoes(posto: Optional[str], dia: date) -> List[Tuple[str, Dict[str, Any], bool]]:
+    """(nome, filtros, página ordenada pelo índice esperada)"""
+    data = dia.isoformat()
+    inicio_intervalo = (dia - timedelta(days=3)).isoformat()
+    fim_intervalo = (dia + timedelta(days=3)).isoformat()
+    combinacoes = [
+        ("data", {'data': data}, True),
+        ("data + horário", {'data': data, 'hora_inicio': '08:00', 'hora_fim': '12:00'}, False),
+        # Turno filtra pelo join com funcionarios: o dia fica no índice, a ordem não
+        ("data + turno", {'data': data, 'turno': ['matutino']}, False),
+        ("intervalo de datas", {'data_inicio': inicio_intervalo, 'data_fim': fim_intervalo}, False),
+        ("intervalo de datas + horário", {'data_inicio': inicio_intervalo, 'data_fim': fim_intervalo, 'hora_inicio': '08:00'}, False),
+    ]
+    if posto:
+        combinacoes += [
+            ("posto + data", {'posto': posto, 'data': data}, True),
+            ("posto + data + horário", {'posto': posto, 'data': data, 'hora_inicio': '08:00'}, False),
+            ("posto + intervalo de datas", {'posto': posto, 'data_inicio': inicio_intervalo, 'data_fim': fim_intervalo}, False),
+        ]
+    return combinacoes
+
+
+def _gerar_volume(cursor, quantidade: int) -> None:
+    """
+    Insere registros encerrados sintéticos (90 dias, até 20 postos) e atualiza as
+    estatísticas, dentro da transação da verificação (desfeita ao final). Em bases
+    pequenas o planner escolhe qualquer índice; com volume os planos são os de produção.
+    """
+    cursor.execute(
+        """
+        INSERT INTO registros_producao (posto_id, funcionario_id, modelo_id, inicio, fim)
+        SELECT p.ids[1 + g.i %% array_length(p.ids, 1)],
+               f.ids[1 + g.i %% array_length(f.ids, 1)],
+               m.modelo_id,
+               g.ts, g.ts + INTERVAL '5 minutes'
+        FROM (
+            SELECT i, CURRENT_DATE - 90 + (i * (90 * 86400.0 / %s)) * INTERVAL '1 second' AS ts
+            FROM generate_series(1, %s) i
+        ) g,
+        (SELECT ARRAY(SELECT posto_id FROM postos ORDER BY posto_id LIMIT 20) AS ids) p,
+        (SELECT ARRAY(SELECT funcionario_id FROM funcionarios ORDER BY funcionario_id) AS ids) f,
+        (SELECT modelo_id FROM modelos ORDER BY modelo_id LIMIT 1) m
+        """,
+        (quantidade, quantidade)
+    )
+    print(f"{cursor.rowcount} registros sintéticos inseridos (desfeitos ao final)")
+    cursor.execute("ANALYZE registros_producao")
+
+
+def _nos(plano: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    yield plano
+    for filho in plano.get('Plans', []):
+        yield from _nos(filho)
+
+
+def _avaliar(plano: Dict[str, Any], ordenada: bool = False, antes_de: bool = False) -> Tuple[bool, str]:
+    """
+    (passou, descrição) da leitura de registros_producao no plano
+
+    Args:
+        ordenada: exige Index Scan (a página sai na ordem do índice, sem Sort)
+        antes_de: exige também o cursor (registro_id) no Index Cond
+    """
+    for no in _nos(plano):
+        if no.get('Relation Name') != 'registros_producao':
+            continue
+        tipo = no['Node Type']
+        if tipo == 'Seq Scan':
+            return False, 'Seq Scan'
+        condicoes = [no.get('Index Cond', '')]
+        if tipo == 'Bitmap Heap Scan':
+            condicoes += [filho.get('Index Cond', '') for filho in _nos(no) if filho['Node Type'] == 'Bitmap Index Scan']
+        indices = [filho.get('Index Name') for filho in _nos(no) if filho.get('Index Name')]
+        descricao = f"{tipo} ({', '.join(indices)}): {' | '.join(c for c in condicoes if c)}"
+        passou = any('inicio' in condicao for condicao in condicoes)
+        if ordenada:
+            passou = passou and tipo == 'Index Scan'
+            if antes_de:
+                passou = passou and 'registro_id' in no.get('Index Cond', '')
+        return passou, descricao
+    return False, 'registros_producao não encontrada no plano'
+
+
+def _explicar(cursor, query: str, params: Tuple) -> Dict[str, Any]:
+    cursor.execute(f"EXPLAIN (FORMAT JSON) {query}", params)
+    resultado = cursor.fetchone()[0]
+    return (json.loads(resultado) if isinstance(resultado, str) else resultado)[0]['Plan']
+
+
+def main(volume: int = 0) -> int:
+    tem_coluna_nome_operacao = RegistroProducao.verificar_coluna_nome_operacao()
+    falhas = 0
+
+    conn = DatabaseConnection.get_connection()
+    cursor = conn.cursor()
+    try:
+        if volume > 0:
+            _gerar_volume(cursor, volume)
+        else:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+
+        cursor.execute("SELECT MAX(registro_id) FROM registros_producao")
+        maior_id = cursor.fetchone()[0] or 1
+        dia = date(2025, 1, 15)
+        if volume > 0:
+            # Meio do histórico sintético e o posto do registro mais recente
+            dia = date.today() - timedelta(days=45)
+            cursor.execute(
+                """
+                SELECT nome FROM postos
+                WHERE posto_id = (SELECT posto_id FROM registros_producao ORDER BY registro_id DESC LIMIT 1)
+                """
+            )
+        else:
+            cursor.execute("SELECT nome FROM postos ORDER BY posto_id LIMIT 1")
+        posto = cursor.fetchone()
+
+        for nome, filtros, ordenada in _combinacoes(posto[0] if posto else None, dia):
+            # Sem volume os planos não refletem a ordenação de produção: só o índice é exigido
+            ordenada = ordenada and volume > 0
+            where_clause, params = registro_service._construir_filtros(**filtros)
+            plano = _explicar(
+                cursor,
+                f"""
+                SELECT COUNT(*)
+                FROM registros_producao r
+                LEFT JOIN funcionarios f ON r.funcionario_id = f.funcionario_id
+                WHERE {where_clause}
+                """,
+                tuple(params)
+            )
+            passou, descricao = _avaliar(plano)
+            falhas += 0 if passou else 1
+            print(f"[{'OK' if passou else 'FALHA'}] {nome} (contagem): {descricao}")
+
+            # Página da listagem, primeira (OFFSET 0) e seguinte (cursor antes_de)
+            for antes_de in (None, maior_id):
+                query, params_pagina = RegistroProducao.montar_consulta_pagina(
+                    where_clause, params, 100, 0, tem_coluna_nome_operacao, antes_de
+                )
+                passou, descricao = _avaliar(_explicar(cursor, query, params_pagina), ordenada, antes_de is not None)
+                rotulo = f"{nome} (página{', antes_de' if antes_de else ''})"
+                if 'data_inicio' in filtros:
+                    print(f"[INFO] {rotulo}: {descricao}")
+                    continue
+                falhas += 0 if passou else 1
+                print(f"[{'OK' if passou else 'FALHA'}] {rotulo}: {descricao}")
+    finally:
+        conn.rollback()
+        cursor.close()
+        conn.close()
+
+    print(f"\n{falhas} verificação(ões) sem leitura indexada de inicio" if falhas else "\nTodas as verificações usam leitura indexada de inicio")
+    return 1 if falhas else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 0))
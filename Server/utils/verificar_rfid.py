@@ -0,0 +1,229 @@
+"""
+Verificação da ingestão RFID em lote, do debounce e da idempotência
+
+Roda contra o banco configurado (variáveis DB_*), dentro de uma única transação
+que é desfeita ao final, com uma tag de funcionário ativo e um posto com produto
+configurado já cadastrados. Verifica que:
+
+- um savepoint que falha desfaz apenas o próprio trecho e a transação continua
+  utilizável (Transacao.savepoint);
+- no lote (processar_lote_rfid), um evento com erro não desfaz os demais;
+- o debounce do lote compara o horário da leitura (lido_em), não o relógio do
+  servidor: leituras próximas no lido_em são duplicadas, leituras distantes no
+  lido_em processadas em seguida não são;
+- a repetição com a mesma chave de idempotência (lote e leitura avulsa) devolve a
+  resposta original sem gravar de novo.
+
+Os resultados guardados nas janelas de debounce e idempotência durante a
+verificação são descartados ao final. Sai com código 1 se alguma verificação falhar.
+
+Uso (a partir da raiz do repositório, com as variáveis DB_* configuradas):
+    python -m Server.utils.verificar_rfid
+"""
+import sys
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from Server.models.database import DatabaseConnection
+from Server.models.resolvedor_tags import ResolvedorTags
+from Server.services import rfid_service
+
+# Posto configurado apenas dentro da transação da verificação (não existe em postos)
+_POSTO_INEXISTENTE = '__verificacao_rfid__'
+
+
+class _Desfazer(Exception):
+    """Interrompe a transação da verificação para desfazê-la"""
+
+
+def _verificar(nome: str, passou: bool, detalhe: str = '') -> int:
+    print(f"[{'OK' if passou else 'FALHA'}] {nome}{f': {detalhe}' if detalhe else ''}")
+    return 0 if passou else 1
+
+
+def _buscar_cenario() -> Optional[Tuple[str, str, str, int]]:
+    """(tag_id, posto, modelo_codigo, funcionario_id) de um funcionário ativo e um posto configurado"""
+    posto = DatabaseConnection.execute_query(
+        """
+        SELECT c.posto, c.modelo_codigo
+        FROM posto_configuracao c
+        JOIN postos p ON p.nome = c.posto
+        JOIN modelos m ON m.nome = c.modelo_codigo
+        WHERE c.modelo_codigo IS NOT NULL
+        ORDER BY c.id
+        LIMIT 1
+        """,
+        fetch_one=True
+    )
+    funcionarios = DatabaseConnection.execute_query(
+        """
+        SELECT tag_id, funcionario_id FROM funcionarios
+        WHERE ativo AND tag_id IS NOT NULL AND tag_id <> ''
+        ORDER BY funcionario_id
+        """,
+        fetch_all=True
+    )
+    if not posto:
+        return None
+    for tag_id, funcionario_id in funcionarios or []:
+        if ResolvedorTags.resolver(tag_id):
+            return tag_id, posto[0], posto[1], funcionario_id
+    return None
+
+
+def _estado(funcionario_id: int) -> Tuple[int, int]:
+    """(registros, registros encerrados) do funcionário: muda a cada entrada ou saída gravada"""
+    return tuple(DatabaseConnection.execute_query(
+        "SELECT COUNT(*), COUNT(fim) FROM registros_producao WHERE funcionario_id = %s",
+        (funcionario_id,),
+        fetch_one=True
+    ))
+
+
+def _verificar_savepoint(tx) -> int:
+    DatabaseConnection.execute_query("CREATE TEMP TABLE verificacao_rfid (n INTEGER) ON COMMIT DROP")
+    DatabaseConnection.execute_query("INSERT INTO verificacao_rfid VALUES (1)")
+    try:
+        with tx.savepoint():
+            DatabaseConnection.execute_query("INSERT INTO verificacao_rfid VALUES (2)")
+            DatabaseConnection.execute_query("SELECT 1 / 0", fetch_one=True)
+        erro = None
+    except Exception as e:
+        erro = e
+    linhas = [row[0] for row in DatabaseConnection.execute_query("SELECT n FROM verificacao_rfid ORDER BY n", fetch_all=True) or []]
+    return _verificar(
+        "savepoint com erro desfaz só o próprio trecho",
+        erro is not None and linhas == [1],
+        f"linhas após o erro: {linhas}"
+    )
+
+
+def _verificar_lote(tag_id: str, posto: str, funcionario_id: int, inicio: datetime) -> int:
+    aberto = DatabaseConnection.execute_query(
+        """
+        SELECT 1 FROM registros_producao r JOIN postos p ON p.posto_id = r.posto_id
+        WHERE r.funcionario_id = %s AND p.nome = %s AND r.fim IS NULL
+        """,
+        (funcionario_id, posto),
+        fetch_one=True
+    )
+    primeiro, segundo = ('saida', 'entrada') if aberto else ('entrada', 'saida')
+    janela = rfid_service._debounce.janela
+
+    eventos: List[Dict[str, Any]] = [{"tag_id": tag_id, "posto": posto, "lido_em": inicio.isoformat()}]
+    if janela > 0:
+        eventos.append({"tag_id": tag_id, "posto": posto, "lido_em": (inicio + timedelta(seconds=janela / 2)).isoformat()})
+    eventos.append({"tag_id": tag_id, "posto": _POSTO_INEXISTENTE, "lido_em": (inicio + timedelta(seconds=1)).isoformat()})
+    # Processada logo em seguida, mas com lido_em fora da janela: não é repetição
+    eventos.append({"tag_id": tag_id, "posto": posto, "lido_em": (inicio + timedelta(seconds=janela + 60)).isoformat()})
+
+    resultados = rfid_service.processar_lote_rfid(eventos)
+    tipos = [(r.get('tipo'), bool(r.get('duplicada'))) for r in resultados]
+    esperado = [(primeiro, False)] + ([(primeiro, True)] if janela > 0 else []) + [('erro', False), (segundo, False)]
+    falhas = _verificar("lote processado na ordem", tipos == esperado, f"{tipos}")
+
+    erro = resultados[-2]
+    falhas += _verificar(
+        "evento com erro isolado no lote",
+        erro.get('tipo') == 'erro' and resultados[0].get('registro_id') is not None
+        and resultados[-1].get('registro_id') is not None,
+        erro.get('message', '')
+    )
+    if janela > 0:
+        falhas += _verificar(
+            "debounce pelo lido_em",
+            resultados[1].get('registro_id') == resultados[0].get('registro_id') and not resultados[-1].get('duplicada'),
+            f"janela de {janela:g}s"
+        )
+    else:
+        print("[INFO] debounce desligado (RFID_DEBOUNCE_MS=0)")
+
+    if primeiro == 'entrada':
+        registro_id = resultados[0].get('registro_id')
+        encerrado = DatabaseConnection.execute_query(
+            "SELECT fim IS NOT NULL FROM registros_producao WHERE registro_id = %s",
+            (registro_id,),
+            fetch_one=True
+        )
+        falhas += _verificar(
+            "entrada do lote encerrada pela saída do mesmo lote",
+            bool(encerrado and encerrado[0]) and resultados[-1].get('registro_id') == registro_id,
+            f"registro {registro_id}"
+        )
+    return falhas
+
+
+def _verificar_idempotencia(tag_id: str, posto: str, funcionario_id: int, lido_em: datetime,
+                            chave_lote: str, chave_leitura: str) -> int:
+    falhas = 0
+    eventos = [{"tag_id": tag_id, "posto": posto, "lido_em": lido_em.isoformat()}]
+    antes = _estado(funcionario_id)
+    primeira = rfid_service.processar_lote_rfid(eventos, chave_idempotencia=chave_lote)
+    depois = _estado(funcionario_id)
+    repetida = rfid_service.processar_lote_rfid(eventos, chave_idempotencia=chave_lote)
+    falhas += _verificar(
+        "lote repetido com a mesma chave de idempotência",
+        depois != antes and _estado(funcionario_id) == depois and repetida == primeira,
+        f"{primeira[0].get('tipo')} {primeira[0].get('registro_id')}"
+    )
+
+    antes = _estado(funcionario_id)
+    primeira = rfid_service.processar_leitura_rfid(tag_id, posto, chave_idempotencia=chave_leitura)
+    depois = _estado(funcionario_id)
+    repetida = rfid_service.processar_leitura_rfid(tag_id, posto, chave_idempotencia=chave_leitura)
+    falhas += _verificar(
+        "leitura repetida com a mesma chave de idempotência",
+        depois != antes and _estado(funcionario_id) == depois and repetida == primeira,
+        f"{primeira.get('tipo')} {primeira.get('registro_id')}"
+    )
+
+    if rfid_service._debounce.janela > 0:
+        # Mesma tag e posto logo em seguida, sem chave: suprimida pela janela de debounce
+        repetida = rfid_service.processar_leitura_rfid(tag_id, posto)
+        falhas += _verificar(
+            "leitura avulsa repetida dentro da janela de debounce",
+            bool(repetida.get('duplicada')) and repetida.get('registro_id') == primeira.get('registro_id')
+            and _estado(funcionario_id) == depois
+        )
+    return falhas
+
+
+def main() -> int:
+    cenario = _buscar_cenario()
+    if not cenario:
+        print("[FALHA] Nenhum funcionário ativo com tag e posto com produto configurado para a verificação")
+        return 1
+    tag_id, posto, modelo_codigo, funcionario_id = cenario
+    print(f"Tag {tag_id} no posto {posto} (alterações desfeitas ao final)\n")
+
+    chave_lote = f"verificar_rfid:{uuid.uuid4().hex}"
+    chave_leitura = f"verificar_rfid:{uuid.uuid4().hex}"
+    inicio = datetime.now(rfid_service.TZ_MANAUS).replace(microsecond=0) - timedelta(hours=2)
+    falhas = 0
+    try:
+        with DatabaseConnection.transaction() as tx:
+            DatabaseConnection.execute_query(
+                "INSERT INTO posto_configuracao (posto, modelo_codigo) VALUES (%s, %s)",
+                (_POSTO_INEXISTENTE, modelo_codigo)
+            )
+            falhas += _verificar_savepoint(tx)
+            falhas += _verificar_lote(tag_id, posto, funcionario_id, inicio)
+            falhas += _verificar_idempotencia(
+                tag_id, posto, funcionario_id, inicio + timedelta(hours=1), chave_lote, chave_leitura
+            )
+            raise _Desfazer()
+    except _Desfazer:
+        pass
+    finally:
+        # Os resultados guardados apontam para registros desfeitos
+        rfid_service._idempotencia.descartar(('lote', chave_lote))
+        rfid_service._idempotencia.descartar(('leitura', chave_leitura))
+        rfid_service._debounce.descartar((tag_id, posto))
+
+    print(f"\n{falhas} verificação(ões) com falha" if falhas else "\nTodas as verificações passaram")
+    return 1 if falhas else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
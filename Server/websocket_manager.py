@@ -2,10 +2,11 @@ import os
 import time
 import logging
 import threading
-from typing import Optional
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
 from flask import Flask, request
-from flask_socketio import SocketIO, emit
-from Server.services import dashboard_service
+from flask_socketio import SocketIO, emit, join_room, leave_room
+from Server.services import dashboard_service, registro_service
+from Server.models.database import DatabaseConnection
 
 # Configurar logger para sempre mostrar mensagens
 logger = logging.getLogger(__name__)
@@ -13,11 +14,44 @@ logger.setLevel(logging.INFO)
 
 # Instância global do SocketIO
 _socketio_instance: Optional[SocketIO] = None
-_last_update_time = 0
-_throttle_interval = 0.5  # Reduzido de 3s para 0.5s para atualizações mais rápidas
 _connected_clients = set()  # Rastrear clientes conectados
 _clients_lock = threading.Lock()  # Lock para thread safety
 
+# Despacho assíncrono: as escritas apenas marcam o evento como pendente e uma única
+# tarefa em segundo plano monta o payload e faz o broadcast. Sinais recebidos dentro do
+# intervalo mínimo entre broadcasts (WEBSOCKET_INTERVALO_MS) são agrupados e enviados
+# ao fim do intervalo (borda de saída); o primeiro sinal após um período ocioso sai na hora.
+_intervalo_broadcast = float(os.getenv('WEBSOCKET_INTERVALO_MS', '500')) / 1000
+_despacho_cond = threading.Condition()
+_pendentes: Dict[str, float] = {}  # evento -> instante (monotonic) do primeiro sinal pendente
+_forcar_envio = False
+_despachante_iniciado = False
+_ultimo_broadcast = 0.0
+# Salas do dashboard: cada cliente acompanha uma sala (planta inteira, uma linha ou uma
+# sublinha) e recebe apenas os cards dela. Cada sala tem sua própria sequência de
+# patches, e o último snapshot transmitido é a base dos patches de todas.
+SALA_DASHBOARD_TODOS = 'dashboard:todos'
+_dashboard_lock = threading.Lock()
+_dashboard_transmitido: Dict[str, Any] = {'dados': None}
+_seq_salas: Dict[str, int] = {}
+_inscricoes: Dict[str, str] = {}  # sid -> sala do dashboard
+# Registros: os ids alterados desde o último broadcast são acumulados (após o commit) e
+# enviados com as linhas já formatadas e uma sequência global; acima de
+# WEBSOCKET_REGISTROS_MAX ids (ou sinal sem ids) o cliente é orientado a recarregar.
+_max_registros_patch = int(os.getenv('WEBSOCKET_REGISTROS_MAX', '200'))
+_registros_lock = threading.Lock()
+_seq_registros = 0
+_registros_pendentes: Dict[str, Any] = {'criados': set(), 'atualizados': set(), 'removidos': set(), 'completo': False}
+_despacho_stats: Dict[str, Any] = {
+    'sinais': 0,
+    'agrupados': 0,
+    'broadcasts': {},
+    'erros': 0,
+    'latencia_ultima_ms': None,
+    'latencia_max_ms': 0.0,
+    'latencia_total_ms': 0.0,
+}
+
 
 def init_socketio(app: Flask) -> SocketIO:
     """Inicializa e retorna a instância do SocketIO"""
@@ -75,67 +109,345 @@ def get_socketio() -> Optional[SocketIO]:
 
 
 def enviar_atualizacao_dashboard(forcar: bool = False):
-    """Envia atualização do dashboard via WebSocket para TODOS os clientes
+    """Agenda o envio da atualização do dashboard para TODOS os clientes (não bloqueia)
     
     Args:
-        forcar: Se True, ignora o throttle e envia imediatamente
+        forcar: Se True, ignora o intervalo mínimo entre broadcasts
     """
-    global _last_update_time
+    # Os dados mudaram: a próxima leitura do snapshot recalcula (uma vez, no despachante)
+    _sinalizar('dashboard_update', forcar, antes=dashboard_service.invalidar_snapshot)
 
-    socketio_instance = get_socketio()
-    if not socketio_instance:
-        logger.warning("[WebSocket] SocketIO não inicializado, não é possível enviar atualização")
+
+def enviar_atualizacao_registros(
+    forcar: bool = False,
+    criados: Optional[Iterable[int]] = None,
+    atualizados: Optional[Iterable[int]] = None,
+    removidos: Optional[Iterable[int]] = None
+):
+    """Agenda o envio dos registros alterados para TODOS os clientes (não bloqueia)
+    
+    Args:
+        forcar: Se True, ignora o intervalo mínimo entre broadcasts
+        criados: ids dos registros que passaram a existir na listagem (ex.: saída registrada)
+        atualizados: ids dos registros alterados
+        removidos: ids dos registros excluídos
+        Sem nenhum id, os clientes recebem apenas o aviso para recarregar a listagem.
+    """
+    alteracoes = {'criados': _ids(criados), 'atualizados': _ids(atualizados), 'removidos': _ids(removidos)}
+    _sinalizar('registros_update', forcar, antes=lambda: _acumular_registros(alteracoes))
+
+
+def estatisticas_despacho() -> Dict[str, Any]:
+    """Fila e latência do despacho (do primeiro sinal pendente até o fim do broadcast)"""
+    with _despacho_cond:
+        stats = dict(_despacho_stats)
+        stats['broadcasts'] = dict(_despacho_stats['broadcasts'])
+        stats['fila'] = len(_pendentes)
+        stats['pendentes'] = sorted(_pendentes)
+    total = sum(stats['broadcasts'].values())
+    stats['latencia_media_ms'] = round(stats.pop('latencia_total_ms') / total, 2) if total else None
+    with _clients_lock:
+        stats['clientes_conectados'] = len(_connected_clients)
+    with _dashboard_lock:
+        stats['salas_dashboard'] = _salas_ativas()
+    with _registros_lock:
+        stats['seq_registros'] = _seq_registros
+    return stats
+
+
+def _sinalizar(evento: str, forcar: bool = False, antes: Optional[Callable[[], None]] = None) -> None:
+    # Dentro de uma transação, o sinal só vale após o commit (o snapshot precisa ver os dados)
+    transacao = DatabaseConnection.current_transaction()
+    if transacao is not None:
+        transacao.ao_confirmar(lambda: _enfileirar(evento, forcar, antes))
         return
+    _enfileirar(evento, forcar, antes)
+
+
+def _enfileirar(evento: str, forcar: bool, antes: Optional[Callable[[], None]] = None) -> None:
+    global _forcar_envio
 
-    current_time = time.time()
-    if not forcar and current_time - _last_update_time < _throttle_interval:
-        logger.debug("[WebSocket] Throttle ativo, ignorando atualização")
+    if antes is not None:
+        antes()
+
+    if not _iniciar_despachante():
+        logger.warning(f"[WebSocket] SocketIO não inicializado, não é possível enviar {evento}")
         return
 
-    _last_update_time = current_time
+    with _despacho_cond:
+        _despacho_stats['sinais'] += 1
+        if evento in _pendentes:
+            _despacho_stats['agrupados'] += 1
+        else:
+            _pendentes[evento] = time.monotonic()
+        _forcar_envio = _forcar_envio or forcar
+        _despacho_cond.notify()
+
+
+def _iniciar_despachante() -> bool:
+    global _despachante_iniciado
+
+    socketio_instance = get_socketio()
+    if not socketio_instance:
+        return False
+    with _despacho_cond:
+        if not _despachante_iniciado:
+            socketio_instance.start_background_task(_executar_despachante)
+            _despachante_iniciado = True
+    return True
+
+
+def _executar_despachante() -> None:
+    global _forcar_envio, _ultimo_broadcast
+
+    while True:
+        with _despacho_cond:
+            while not _pendentes:
+                _despacho_cond.wait()
+            espera = _ultimo_broadcast + _intervalo_broadcast - time.monotonic()
+            if espera > 0 and not _forcar_envio:
+                # Borda de saída: aguardar o fim do intervalo acumulando novos sinais
+                _despacho_cond.wait(espera)
+                continue
+            eventos = dict(_pendentes)
+            _pendentes.clear()
+            _forcar_envio = False
+
+        for evento, sinalizado_em in eventos.items():
+            enviado = _TRANSMISSORES[evento]()
+            latencia = (time.monotonic() - sinalizado_em) * 1000
+            with _despacho_cond:
+                if not enviado:
+                    _despacho_stats['erros'] += 1
+                    continue
+                _despacho_stats['broadcasts'][evento] = _despacho_stats['broadcasts'].get(evento, 0) + 1
+                _despacho_stats['latencia_ultima_ms'] = round(latencia, 2)
+                _despacho_stats['latencia_max_ms'] = round(max(_despacho_stats['latencia_max_ms'], latencia), 2)
+                _despacho_stats['latencia_total_ms'] += latencia
+        _ultimo_broadcast = time.monotonic()
+
+
+def _estrutura_dashboard(dados: Dict[str, Any]) -> List[Any]:
+    """Sublinhas e a ordem dos postos (mudou -> snapshot completo em vez de patch)"""
+    return [
+        (sublinha.get('sublinha_id'), sublinha.get('nome'), [posto.get('posto_id') for posto in sublinha.get('postos', [])])
+        for sublinha in dados.get('sublinhas', [])
+    ]
+
+
+def _diferenca_dashboard(anterior: Dict[str, Any], atual: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Patch por posto entre dois snapshots: métricas (se mudaram) e os cards alterados.
+    Retorna None quando a estrutura mudou (sublinhas/postos) e é preciso enviar tudo.
+    """
+    if _estrutura_dashboard(anterior) != _estrutura_dashboard(atual):
+        return None
+    postos_anteriores = {
+        posto.get('posto_id'): posto
+        for sublinha in anterior.get('sublinhas', []) for posto in sublinha.get('postos', [])
+    }
+    patch: Dict[str, Any] = {
+        'postos': [
+            posto
+            for sublinha in atual.get('sublinhas', []) for posto in sublinha.get('postos', [])
+            if postos_anteriores.get(posto.get('posto_id')) != posto
+        ]
+    }
+    if anterior.get('metricas') != atual.get('metricas'):
+        patch['metricas'] = atual.get('metricas')
+    return patch
+
+
+def _sala_dashboard(filtro: Optional[Dict[str, Any]]) -> str:
+    filtro = filtro or {}
+    if filtro.get('sublinha_id') is not None:
+        return f"dashboard:sublinha:{int(filtro['sublinha_id'])}"
+    if filtro.get('linha_id') is not None:
+        return f"dashboard:linha:{int(filtro['linha_id'])}"
+    return SALA_DASHBOARD_TODOS
+
+
+def _filtro_da_sala(sala: str) -> Dict[str, Any]:
+    _, tipo, identificador = sala.split(':')
+    return {f'{tipo}_id': int(identificador)}
+
+
+def _sublinhas_da_sala(sala: str) -> Optional[Set[int]]:
+    if sala == SALA_DASHBOARD_TODOS:
+        return None
+    _, tipo, identificador = sala.split(':')
+    if tipo == 'sublinha':
+        return dashboard_service.sublinhas_do_filtro(sublinha_id=int(identificador))
+    return dashboard_service.sublinhas_do_filtro(linha_id=int(identificador))
+
+
+def _salas_ativas() -> Dict[str, int]:
+    # Chamado com _dashboard_lock adquirido
+    salas: Dict[str, int] = {}
+    for sala in _inscricoes.values():
+        salas[sala] = salas.get(sala, 0) + 1
+    return salas
 
+
+def _proxima_seq(sala: str) -> int:
+    _seq_salas[sala] = _seq_salas.get(sala, 0) + 1
+    return _seq_salas[sala]
+
+
+def _snapshot_completo(sala: str) -> Dict[str, Any]:
+    """Último snapshot transmitido, filtrado para a sala, com a sequência da sala"""
+    # Chamado com _dashboard_lock adquirido
+    dados = _dashboard_transmitido['dados']
+    return {**dashboard_service.filtrar_snapshot(dados, _sublinhas_da_sala(sala)), 'seq': _seq_salas.get(sala, 0)}
+
+
+def _inscrever_dashboard(sid: str, filtro: Optional[Dict[str, Any]]) -> None:
+    """Coloca o cliente na sala do filtro e envia a ele o snapshot completo da sala"""
+    sala = _sala_dashboard(filtro)
+    atual = dashboard_service.obter_snapshot().dados
+    with _dashboard_lock:
+        if _dashboard_transmitido['dados'] is None:
+            _dashboard_transmitido['dados'] = atual
+        desatualizado = _dashboard_transmitido['dados'] is not atual
+        anterior = _inscricoes.get(sid)
+        if anterior and anterior != sala:
+            leave_room(anterior)
+        join_room(sala)
+        _inscricoes[sid] = sala
+        # Emitido com o lock para não intercalar com patches da sala
+        emit('dashboard_update', _snapshot_completo(sala))
+    # Há uma versão mais nova ainda não transmitida: ela chega a todos como patch
+    if desatualizado:
+        _enfileirar('dashboard_update', False)
+
+
+def _transmitir_dashboard() -> bool:
+    """
+    Monta o snapshot do dashboard uma vez e envia a cada sala com clientes apenas os
+    cards alterados das suas sublinhas (dashboard_patch com a sequência da sala).
+    O cliente que perceber uma lacuna na sequência pede o snapshot completo.
+    """
+    socketio_instance = get_socketio()
     try:
-        dados = dashboard_service.buscar_postos_em_uso()
-        with _clients_lock:
-            num_clients = len(_connected_clients)
-        
-        logger.info(f"[WebSocket] === BROADCAST dashboard_update ===")
-        logger.info(f"[WebSocket] Clientes conectados: {num_clients}")
-        logger.info(f"[WebSocket] Dados: {len(dados.get('sublinhas', []))} sublinhas")
+        dados = dashboard_service.obter_snapshot().dados
         
-        # IMPORTANTE: Usar o servidor SocketIO para fazer broadcast
-        # O método emit() do servidor envia para TODOS os clientes quando chamado assim
-        socketio_instance.emit('dashboard_update', dados, namespace='/')
+        # O lock mantém a ordem das sequências emitidas
+        with _dashboard_lock:
+            anterior = _dashboard_transmitido['dados']
+            patch = _diferenca_dashboard(anterior, dados) if anterior is not None else None
+            if patch is not None and not patch['postos'] and 'metricas' not in patch:
+                return True
+            _dashboard_transmitido['dados'] = dados
+            
+            salas = _salas_ativas()
+            logger.info(f"[WebSocket] === BROADCAST dashboard ({'completo' if patch is None else 'patch'}) para {len(salas)} salas ===")
+            for sala in salas:
+                sublinhas = _sublinhas_da_sala(sala)
+                if patch is None:
+                    payload = {**dashboard_service.filtrar_snapshot(dados, sublinhas), 'seq': _proxima_seq(sala)}
+                    socketio_instance.emit('dashboard_update', payload, to=sala, namespace='/')
+                    continue
+                
+                postos = [p for p in patch['postos'] if sublinhas is None or p.get('sublinha_id') in sublinhas]
+                if not postos and 'metricas' not in patch:
+                    continue
+                payload = {'postos': postos, 'seq': _proxima_seq(sala)}
+                if 'metricas' in patch:
+                    payload['metricas'] = patch['metricas']
+                socketio_instance.emit('dashboard_patch', payload, to=sala, namespace='/')
         
-        logger.info(f"[WebSocket] Broadcast dashboard_update enviado com sucesso!")
+        return True
     except Exception as e:
         logger.error(f"[WebSocket] ERRO ao enviar atualização do dashboard: {e}", exc_info=True)
+        return False
 
 
-def enviar_atualizacao_registros(forcar: bool = False):
-    """Envia atualização dos registros via WebSocket para TODOS os clientes
-    
-    Args:
-        forcar: Se True, ignora o throttle e envia imediatamente
-    """
-    socketio_instance = get_socketio()
-    if not socketio_instance:
-        logger.warning("[WebSocket] SocketIO não inicializado, não é possível enviar atualização de registros")
+def _ids(valores: Optional[Iterable[Any]]) -> Set[int]:
+    ids = set()
+    for valor in valores or ():
+        try:
+            ids.add(int(valor))
+        except (TypeError, ValueError):
+            continue
+    return ids
+
+
+def _acumular_registros(alteracoes: Dict[str, Set[int]]) -> None:
+    if get_socketio() is None:
         return
+    with _despacho_cond:
+        if not any(alteracoes.values()):
+            _registros_pendentes['completo'] = True
+        for tipo, ids in alteracoes.items():
+            _registros_pendentes[tipo].update(ids)
+        total = sum(len(_registros_pendentes[tipo]) for tipo in alteracoes)
+        if total > _max_registros_patch:
+            _registros_pendentes['completo'] = True
+
+
+def _retirar_registros_pendentes() -> Dict[str, Any]:
+    with _despacho_cond:
+        pendentes = dict(_registros_pendentes)
+        _registros_pendentes.update(criados=set(), atualizados=set(), removidos=set(), completo=False)
+    return pendentes
+
 
+def _transmitir_registros() -> bool:
+    """
+    Envia a todos os clientes os registros alterados desde o último broadcast:
+    criados/atualizados com as linhas formatadas como em listar_registros e os ids
+    removidos, com a sequência global (registros_update). Ids que não estão mais na
+    listagem (em aberto ou excluídos) vão em removidos. O cliente que perceber uma
+    lacuna na sequência, ou receber completo=True, recarrega a listagem.
+    """
+    global _seq_registros
+    
+    socketio_instance = get_socketio()
+    pendentes = _retirar_registros_pendentes()
     try:
+        payload: Dict[str, Any] = {'completo': True}
+        if not pendentes['completo']:
+            removidos = pendentes['removidos']
+            criados = pendentes['criados'] - removidos
+            atualizados = pendentes['atualizados'] - removidos - criados
+            linhas = registro_service.buscar_registros_formatados(list(criados | atualizados))
+            payload = {
+                'completo': False,
+                'criados': [linhas[i] for i in sorted(criados, reverse=True) if i in linhas],
+                'atualizados': [linhas[i] for i in sorted(atualizados, reverse=True) if i in linhas],
+                # Criados fora da listagem (entrada ainda em aberto) nunca foram vistos
+                'removidos': sorted(removidos | {i for i in atualizados if i not in linhas}),
+            }
+            if not (payload['criados'] or payload['atualizados'] or payload['removidos']):
+                return True
+        
         with _clients_lock:
             num_clients = len(_connected_clients)
         
-        logger.info(f"[WebSocket] === BROADCAST registros_update ===")
-        logger.info(f"[WebSocket] Clientes conectados: {num_clients}")
-        
-        # Emitir evento notificando que houve mudança nos registros
-        socketio_instance.emit('registros_update', {'timestamp': time.time()}, namespace='/')
-        
-        logger.info(f"[WebSocket] Broadcast registros_update enviado com sucesso!")
+        # O lock mantém a ordem das sequências emitidas
+        with _registros_lock:
+            _seq_registros += 1
+            payload.update(seq=_seq_registros, timestamp=time.time())
+            logger.info(
+                f"[WebSocket] === BROADCAST registros_update seq={_seq_registros} "
+                f"({'completo' if payload['completo'] else 'patch'}) para {num_clients} clientes ==="
+            )
+            socketio_instance.emit('registros_update', payload, namespace='/')
+        return True
     except Exception as e:
+        # Sem o patch, os clientes precisam recarregar: agenda uma transmissão completa
+        # (sai após o intervalo de broadcast, sem depender de uma nova escrita)
+        with _despacho_cond:
+            _registros_pendentes['completo'] = True
         logger.error(f"[WebSocket] ERRO ao enviar atualização de registros: {e}", exc_info=True)
+        _sinalizar('registros_update')
+        return False
+
+
+_TRANSMISSORES: Dict[str, Callable[[], bool]] = {
+    'dashboard_update': _transmitir_dashboard,
+    'registros_update': _transmitir_registros,
+}
 
 
 def register_socketio_events(socketio_instance: SocketIO):
@@ -149,10 +461,15 @@ def register_socketio_events(socketio_instance: SocketIO):
             _connected_clients.add(sid)
             total = len(_connected_clients)
         logger.info(f"[WebSocket] +++ Cliente CONECTADO: {sid} (total: {total})")
-        # Enviar atualização imediata para o cliente que acabou de conectar
+        # Enviar atualização imediata para o cliente que acabou de conectar; telas de
+        # linha/sublinha informam o filtro na conexão (?sublinha_id= / ?linha_id=)
         try:
-            dados = dashboard_service.buscar_postos_em_uso()
-            emit('dashboard_update', dados)
+            filtro = {
+                chave: request.args.get(chave, type=int)
+                for chave in ('sublinha_id', 'linha_id')
+                if request.args.get(chave, type=int) is not None
+            }
+            _inscrever_dashboard(sid, filtro)
             logger.info(f"[WebSocket] Dados iniciais enviados para cliente {sid}")
         except Exception as e:
             logger.error(f"[WebSocket] Erro ao enviar dados iniciais: {e}", exc_info=True)
@@ -164,6 +481,8 @@ def register_socketio_events(socketio_instance: SocketIO):
         with _clients_lock:
             _connected_clients.discard(sid)
             total = len(_connected_clients)
+        with _dashboard_lock:
+            _inscricoes.pop(sid, None)
         logger.info(f"[WebSocket] --- Cliente DESCONECTADO: {sid} (total: {total})")
     
     @socketio_instance.on('request_dashboard_update')
@@ -172,15 +491,28 @@ def register_socketio_events(socketio_instance: SocketIO):
         sid = request.sid if hasattr(request, 'sid') else 'unknown'
         logger.info(f"[WebSocket] Cliente {sid} solicitou atualização do dashboard")
         try:
-            dados = dashboard_service.buscar_postos_em_uso()
-            emit('dashboard_update', dados)
+            with _dashboard_lock:
+                sala = _inscricoes.get(sid, SALA_DASHBOARD_TODOS)
+            _inscrever_dashboard(sid, None if sala == SALA_DASHBOARD_TODOS else _filtro_da_sala(sala))
             logger.info(f"[WebSocket] Dados enviados para cliente {sid}")
         except Exception as e:
             logger.error(f"[WebSocket] Erro ao enviar dados: {e}", exc_info=True)
     
+    @socketio_instance.on('inscrever_dashboard')
+    def handle_inscrever_dashboard(filtro=None):
+        """Telas de linha/sublinha recebem apenas os seus cards: {sublinha_id} ou {linha_id} ({} = planta inteira)"""
+        sid = request.sid if hasattr(request, 'sid') else 'unknown'
+        try:
+            _inscrever_dashboard(sid, filtro if isinstance(filtro, dict) else None)
+            logger.info(f"[WebSocket] Cliente {sid} inscrito em {_sala_dashboard(filtro if isinstance(filtro, dict) else None)}")
+        except Exception as e:
+            logger.error(f"[WebSocket] Erro ao inscrever cliente {sid}: {e}", exc_info=True)
+    
     @socketio_instance.on('request_registros_update')
     def handle_request_registros_update():
         """Permite que o cliente solicite atualização manual dos registros"""
         sid = request.sid if hasattr(request, 'sid') else 'unknown'
         logger.info(f"[WebSocket] Cliente {sid} solicitou atualização dos registros")
-        emit('registros_update', {'timestamp': time.time()})
+        # Resposta só para o cliente: recarregar a listagem a partir da sequência atual
+        with _registros_lock:
+            emit('registros_update', {'completo': True, 'seq': _seq_registros, 'timestamp': time.time()})
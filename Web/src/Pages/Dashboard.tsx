@@ -25,6 +25,40 @@ interface Sublinha {
   postos: CardProps[];
 }
 
+interface DashboardPatch {
+  seq: number;
+  metricas?: Metricas;
+  postos: CardProps[];
+}
+
+interface Metricas {
+  postosAtivos: number;
+  totalPostos: number;
+  producaoHoje: number;
+  operadoresAtivos: number;
+}
+
+// Tela de andon de uma linha/sublinha: /dashboard?sublinha=ID ou /dashboard?linha=ID
+const lerFiltroTela = (): { sublinha_id?: number; linha_id?: number } => {
+  const params = new URLSearchParams(window.location.search);
+  const sublinha = Number(params.get('sublinha'));
+  const linha = Number(params.get('linha'));
+  if (params.get('sublinha') && !Number.isNaN(sublinha)) return { sublinha_id: sublinha };
+  if (params.get('linha') && !Number.isNaN(linha)) return { linha_id: linha };
+  return {};
+};
+
+// Substitui apenas os cards alterados, mantendo a referência dos demais (evita re-render)
+const aplicarPatchPostos = (sublinhas: Sublinha[], postos: CardProps[]): Sublinha[] => {
+  if (postos.length === 0) return sublinhas;
+  const alterados = new Map(postos.map((posto) => [posto.posto_id, posto]));
+  return sublinhas.map((sublinha) =>
+    sublinha.postos.some((posto) => alterados.has(posto.posto_id))
+      ? { ...sublinha, postos: sublinha.postos.map((posto) => alterados.get(posto.posto_id) ?? posto) }
+      : sublinha
+  );
+};
+
 const MetricCard = ({ titulo, valor, icone, cor }: { titulo: string; valor: string | number; icone: string; cor: string }) => {
   return (
     <div className="rounded-lg p-3 shadow" style={{ backgroundColor: cor }}>
@@ -47,7 +81,7 @@ const Dashboard = () => {
   const [processoSelecionado, setProcessoSelecionado] = useState('sub_linha_chassi');
   const [selectAberto, setSelectAberto] = useState(false);
   const [sublinhas, setSublinhas] = useState<Sublinha[]>([]);
-  const [metricas, setMetricas] = useState({
+  const [metricas, setMetricas] = useState<Metricas>({
     postosAtivos: 0,
     totalPostos: 0,
     producaoHoje: 0,
@@ -55,6 +89,9 @@ const Dashboard = () => {
   });
   const [carregando, setCarregando] = useState(true);
   const socketRef = useRef<Socket | null>(null);
+  // Sequência do último snapshot/patch aplicado (null = aguardando snapshot completo)
+  const seqRef = useRef<number | null>(null);
+  const filtroTela = useRef(lerFiltroTela()).current;
 
   // Carregar dados iniciais e configurar WebSocket
   useEffect(() => {
@@ -88,6 +125,8 @@ const Dashboard = () => {
       reconnectionDelayMax: 5000,
       timeout: 20000,
       forceNew: true,
+      // Receber apenas os cards da linha/sublinha desta tela (sala do dashboard)
+      query: Object.fromEntries(Object.entries(filtroTela).map(([chave, valor]) => [chave, String(valor)])),
     });
 
     socketRef.current = socket;
@@ -103,21 +142,22 @@ const Dashboard = () => {
 
     socket.on('disconnect', (reason) => {
       console.log('[Dashboard] Socket.IO desconectado:', reason);
+      // Na reconexão o servidor envia o snapshot completo
+      seqRef.current = null;
     });
 
-    // Receber atualizações do dashboard
+    // Snapshot completo (na conexão ou quando pedido após uma lacuna na sequência)
     socket.on('dashboard_update', (dados: any) => {
-      console.log('[Dashboard] Atualização recebida via Socket.IO', dados);
+      console.log('[Dashboard] Snapshot recebido via Socket.IO', dados?.seq);
       try {
         if (dados && typeof dados === 'object') {
           if (dados.metricas) {
-            console.log('[Dashboard] Atualizando métricas:', dados.metricas);
             setMetricas(dados.metricas);
           }
           if (dados.sublinhas && Array.isArray(dados.sublinhas)) {
-            console.log('[Dashboard] Atualizando sublinhas:', dados.sublinhas.length);
             setSublinhas(dados.sublinhas);
           }
+          seqRef.current = typeof dados.seq === 'number' ? dados.seq : null;
         }
       } catch (error) {
         console.error('[Dashboard] Erro ao processar atualização:', error);
@@ -125,8 +165,28 @@ const Dashboard = () => {
       setCarregando(false);
     });
 
-    // Polling como fallback a cada 30 segundos
+    // Apenas os cards alterados desde o patch anterior
+    socket.on('dashboard_patch', (patch: DashboardPatch) => {
+      const atual = seqRef.current;
+      if (atual !== null && patch.seq <= atual) {
+        return; // Já contido no snapshot aplicado
+      }
+      if (atual === null || patch.seq !== atual + 1) {
+        console.log('[Dashboard] Lacuna na sequência, solicitando snapshot completo', atual, patch.seq);
+        seqRef.current = null;
+        socket.emit('request_dashboard_update');
+        return;
+      }
+      if (patch.metricas) {
+        setMetricas(patch.metricas);
+      }
+      setSublinhas((anteriores) => aplicarPatchPostos(anteriores, patch.postos || []));
+      seqRef.current = patch.seq;
+    });
+
+    // Polling como fallback a cada 30 segundos (apenas sem conexão Socket.IO)
     const pollingInterval = setInterval(() => {
+      if (socket.connected) return;
       console.log('[Dashboard] Polling de dados...');
       carregarDadosDashboard();
     }, 30000);
@@ -141,7 +201,7 @@ const Dashboard = () => {
   const carregarDadosDashboard = async () => {
     try {
       setCarregando(true);
-      const dados = await dashboardAPI.obterDados();
+      const dados = await dashboardAPI.obterDados(filtroTela);
       
       if (dados.metricas) {
         setMetricas(dados.metricas);
@@ -40,6 +40,43 @@ interface Registro {
     operacao_totens?: Array<{ nome: string }>
 }
 
+// Registros alterados desde o broadcast anterior (linhas no formato de GET /api/registros)
+interface RegistrosPatch {
+    seq: number
+    completo: boolean
+    criados?: any[]
+    atualizados?: any[]
+    removidos?: number[]
+}
+
+const mapearRegistro = (reg: any): Registro => ({
+    id: reg.id,
+    data: reg.data_inicio || '',
+    data_inicio: reg.data_inicio || '',
+    data_fim: reg.data_fim || '',
+    hora: reg.hora_inicio || '',
+    hora_inicio: reg.hora_inicio || '',
+    hora_fim: reg.hora_fim || '',
+    operador: reg.funcionario?.nome || '',
+    matricula: reg.funcionario?.matricula || '',
+    posto: reg.posto?.nome || reg.posto || '',
+    totem: reg.totem?.nome || (reg.totem?.id ? `Totem ${reg.totem.id}` : ''),
+    produto: reg.produto?.nome || reg.modelo?.descricao || reg.modelo?.codigo || '',
+    modelo: reg.modelo?.descricao || reg.modelo?.codigo || '',
+    modelo_codigo: reg.modelo?.codigo || '',
+    quantidade: reg.quantidade || 0,
+    turno: reg.funcionario?.turno || '',
+    operacao: reg.operacao?.nome || reg.operacao?.codigo || '-',
+    comentarios: reg.comentarios || '-',
+    peca: reg.peca?.nome || reg.peca?.codigo || '',
+    pecas: reg.pecas || [],
+    codigo_producao: reg.codigo_producao || '',
+    serial: reg.serial || '',
+    nome: reg.nome || '',
+    operacao_pecas: reg.operacao_pecas || [],
+    operacao_totens: reg.operacao_totens || []
+})
+
 const Registros = () => {
     const [paginaAtual, setPaginaAtual] = useState(1)
     const [itensPorPagina, setItensPorPagina] = useState(10)
@@ -58,6 +95,8 @@ const Registros = () => {
     const [registrosSelecionados, setRegistrosSelecionados] = useState<Set<number>>(new Set())
     const [carregando, setCarregando] = useState(false)
     const [totalRegistros, setTotalRegistros] = useState(0)
+    // Sem filtros e com histórico grande o backend devolve o total estimado
+    const [totalAproximado, setTotalAproximado] = useState(false)
     const [modalExcluirAberto, setModalExcluirAberto] = useState(false)
     const [excluindo, setExcluindo] = useState(false)
     const [modalSucessoAberto, setModalSucessoAberto] = useState(false)
@@ -80,6 +119,13 @@ const Registros = () => {
     // Ref para WebSocket
     const socketRef = useRef<Socket | null>(null)
     const buscarRegistrosRef = useRef<() => void>(() => {})
+    const aplicarPatchRef = useRef<(patch: RegistrosPatch) => void>(() => {})
+    // Sequência do último registros_update aplicado (null = sem base, recarregar)
+    const seqRef = useRef<number | null>(null)
+    const registrosRef = useRef<Registro[]>([])
+    const totalRef = useRef(0)
+    // Cursor (antes_de) de cada página já alcançada com os filtros atuais
+    const cursoresRef = useRef<{ chave: string; paginas: Map<number, number> }>({ chave: '', paginas: new Map() })
 
     // Configurar WebSocket para atualizações em tempo real
     useEffect(() => {
@@ -116,6 +162,8 @@ const Registros = () => {
 
         socket.on('connect', () => {
             console.log('[Registros] Socket.IO conectado:', socket.id)
+            // Sequência atual do servidor: a resposta recarrega a listagem como base dos patches
+            socket.emit('request_registros_update')
         })
 
         socket.on('connect_error', (error) => {
@@ -124,19 +172,28 @@ const Registros = () => {
 
         socket.on('disconnect', (reason) => {
             console.log('[Registros] Socket.IO desconectado:', reason)
+            seqRef.current = null
         })
 
-        // Receber notificações de atualização de registros
-        socket.on('registros_update', () => {
-            console.log('[Registros] Notificação de atualização recebida via Socket.IO')
-            // Buscar dados atualizados
-            if (buscarRegistrosRef.current) {
+        // Registros alterados: aplicar localmente; recarregar apenas em lacuna na sequência
+        socket.on('registros_update', (patch: RegistrosPatch) => {
+            const atual = seqRef.current
+            if (!patch.completo && atual !== null && patch.seq <= atual) {
+                return // Já contido na listagem carregada
+            }
+            if (patch.completo || atual === null || patch.seq !== atual + 1) {
+                console.log('[Registros] Recarregando listagem', atual, patch.seq)
+                seqRef.current = patch.seq
                 buscarRegistrosRef.current()
+                return
             }
+            seqRef.current = patch.seq
+            aplicarPatchRef.current(patch)
         })
 
-        // Polling como fallback a cada 20 segundos
+        // Polling como fallback a cada 20 segundos (apenas sem conexão Socket.IO)
         const pollingInterval = setInterval(() => {
+            if (socket.connected) return
             console.log('[Registros] Polling de dados...')
             if (buscarRegistrosRef.current) {
                 buscarRegistrosRef.current()
@@ -178,11 +235,16 @@ const Registros = () => {
     const buscarRegistros = useCallback(async () => {
         setCarregando(true)
         try {
-            const offset = (paginaAtual - 1) * itensPorPagina
-            const params: any = {
-                limit: itensPorPagina,
-                offset: offset
+            const chaveCursores = JSON.stringify([itensPorPagina, filtros.data, filtros.processo, filtros.turno, filtros.horario])
+            if (cursoresRef.current.chave !== chaveCursores) {
+                cursoresRef.current = { chave: chaveCursores, paginas: new Map() }
             }
+            const antesDe = cursoresRef.current.paginas.get(paginaAtual)
+
+            // Com o cursor da página, o backend não percorre as anteriores (OFFSET)
+            const params: any = antesDe
+                ? { limit: itensPorPagina, antes_de: antesDe }
+                : { limit: itensPorPagina, offset: (paginaAtual - 1) * itensPorPagina }
 
             if (filtros.data) {
                 params.data = filtros.data
@@ -202,38 +264,22 @@ const Registros = () => {
 
             const resposta = await registrosAPI.listar(params)
             
-            const registrosMapeados: Registro[] = resposta.registros.map((reg: any) => ({
-                id: reg.id,
-                data: reg.data_inicio || '',
-                data_inicio: reg.data_inicio || '',
-                data_fim: reg.data_fim || '',
-                hora: reg.hora_inicio || '',
-                hora_inicio: reg.hora_inicio || '',
-                hora_fim: reg.hora_fim || '',
-                operador: reg.funcionario?.nome || '',
-                matricula: reg.funcionario?.matricula || '',
-                posto: reg.posto?.nome || reg.posto || '',
-                totem: reg.totem?.nome || (reg.totem?.id ? `Totem ${reg.totem.id}` : ''),
-                produto: reg.produto?.nome || reg.modelo?.descricao || reg.modelo?.codigo || '',
-                modelo: reg.modelo?.descricao || reg.modelo?.codigo || '',
-                modelo_codigo: reg.modelo?.codigo || '',
-                quantidade: reg.quantidade || 0,
-                turno: reg.funcionario?.turno || '',
-                operacao: reg.operacao?.nome || reg.operacao?.codigo || '-',
-                comentarios: reg.comentarios || '-',
-                peca: reg.peca?.nome || reg.peca?.codigo || '',
-                pecas: reg.pecas || [],
-                codigo_producao: reg.codigo_producao || '',
-                serial: reg.serial || '',
-                nome: reg.nome || '',
-                operacao_pecas: reg.operacao_pecas || [],
-                operacao_totens: reg.operacao_totens || []
-            }))
+            const registrosMapeados: Registro[] = resposta.registros.map(mapearRegistro)
+            if (resposta.proximo_antes_de) {
+                cursoresRef.current.paginas.set(paginaAtual + 1, resposta.proximo_antes_de)
+            } else {
+                cursoresRef.current.paginas.delete(paginaAtual + 1)
+            }
 
+            registrosRef.current = registrosMapeados
+            totalRef.current = resposta.total || 0
             setRegistros(registrosMapeados)
             setTotalRegistros(resposta.total || 0)
+            setTotalAproximado(Boolean(resposta.total_aproximado))
         } catch (error) {
             console.error('Erro ao buscar registros:', error)
+            registrosRef.current = []
+            totalRef.current = 0
             setRegistros([])
             setTotalRegistros(0)
         } finally {
@@ -241,10 +287,71 @@ const Registros = () => {
         }
     }, [paginaAtual, itensPorPagina, filtros.data, filtros.processo, filtros.turno, filtros.horario])
 
-    // Atualizar ref para WebSocket poder chamar buscarRegistros
+    // Aplicar na página atual os registros recebidos via WebSocket (mesmos filtros do backend)
+    const aplicarPatchRegistros = useCallback((patch: RegistrosPatch) => {
+        const atendeFiltros = (reg: any) => (
+            (!filtros.data || reg.data_inicio === filtros.data) &&
+            (filtros.processo.length === 0 || reg.posto?.nome === filtros.processo[0]) &&
+            (filtros.turno.length === 0 || filtros.turno.includes(String(reg.funcionario?.turno ?? ''))) &&
+            (!filtros.horario || (reg.hora_inicio || '') >= filtros.horario)
+        )
+        const removidos = new Set(patch.removidos || [])
+        const criados = new Set((patch.criados || []).map((reg) => reg.id))
+        let lista = registrosRef.current.filter((registro) => !removidos.has(registro.id))
+        let delta = lista.length - registrosRef.current.length
+        // Registros novos deslocam as páginas seguintes à primeira, mesmo fora da página atual
+        let entraramRegistros = false
+
+        for (const reg of [...(patch.criados || []), ...(patch.atualizados || [])]) {
+            const naPagina = lista.some((registro) => registro.id === reg.id)
+            if (naPagina) {
+                if (atendeFiltros(reg)) {
+                    lista = lista.map((registro) => registro.id === reg.id ? mapearRegistro(reg) : registro)
+                } else {
+                    lista = lista.filter((registro) => registro.id !== reg.id)
+                    delta -= 1
+                }
+            } else if (criados.has(reg.id) && atendeFiltros(reg)) {
+                delta += 1
+                entraramRegistros = true
+                // Ordenação por id decrescente: registros novos entram apenas na primeira página
+                if (paginaAtual === 1) {
+                    lista = [mapearRegistro(reg), ...lista].sort((a, b) => b.id - a.id).slice(0, itensPorPagina)
+                }
+            }
+        }
+
+        const total = Math.max(totalRef.current + delta, 0)
+        if (lista.length < itensPorPagina && total > (paginaAtual - 1) * itensPorPagina + lista.length) {
+            // A página perdeu linhas que vêm das páginas seguintes
+            buscarRegistros()
+            return
+        }
+        const idsAnteriores = registrosRef.current.map((registro) => registro.id).join(',')
+        if (entraramRegistros || lista.map((registro) => registro.id).join(',') !== idsAnteriores) {
+            // Os cursores salvos deixaram de valer: linhas empurradas para fora desta página teriam
+            // id acima do cursor da próxima e seriam puladas. Só o cursor da próxima página é
+            // recalculado pela lista nova; as demais voltam a usar offset até serem alcançadas.
+            const paginas = new Map<number, number>()
+            if (lista.length === itensPorPagina && lista.length > 0) {
+                paginas.set(paginaAtual + 1, lista[lista.length - 1].id)
+            }
+            cursoresRef.current = { chave: cursoresRef.current.chave, paginas }
+        }
+        registrosRef.current = lista
+        totalRef.current = total
+        setRegistros(lista)
+        setTotalRegistros(total)
+        if (removidos.size > 0) {
+            setRegistrosSelecionados((selecionados) => new Set([...selecionados].filter((id) => !removidos.has(id))))
+        }
+    }, [buscarRegistros, paginaAtual, itensPorPagina, filtros.data, filtros.processo, filtros.turno, filtros.horario])
+
+    // Atualizar refs para WebSocket poder chamar buscarRegistros/aplicarPatchRegistros
     useEffect(() => {
         buscarRegistrosRef.current = buscarRegistros
-    }, [buscarRegistros])
+        aplicarPatchRef.current = aplicarPatchRegistros
+    }, [buscarRegistros, aplicarPatchRegistros])
 
     // Buscar registros quando filtros ou paginação mudarem
     useEffect(() => {
@@ -849,7 +956,7 @@ const Registros = () => {
                                             }
                                         </button>
                                         <span className="text-sm text-gray-700">
-                                            Mostrando {indiceInicial} - {indiceFinal} de {totalItens}
+                                            Mostrando {indiceInicial} - {indiceFinal} de {totalAproximado ? '~' : ''}{totalItens}
                                         </span>
                                     </div>
                                 </div>
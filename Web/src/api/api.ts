@@ -378,11 +378,17 @@ export const registrosAPI = {
     turno?: string[]
     hora_inicio?: string
     hora_fim?: string
+    antes_de?: number
+    data_inicio?: string
+    data_fim?: string
   }) => {
     const queryParams = new URLSearchParams()
     if (params?.limit) queryParams.append('limit', params.limit.toString())
     if (params?.offset) queryParams.append('offset', params.offset.toString())
+    if (params?.antes_de) queryParams.append('antes_de', params.antes_de.toString())
     if (params?.data) queryParams.append('data', params.data)
+    if (params?.data_inicio) queryParams.append('data_inicio', params.data_inicio)
+    if (params?.data_fim) queryParams.append('data_fim', params.data_fim)
     if (params?.posto) queryParams.append('posto', params.posto)
     if (params?.operacao) queryParams.append('operacao', params.operacao)
     if (params?.turno && params.turno.length > 0) {
@@ -413,7 +419,14 @@ export const registrosAPI = {
 // CHAMADA PARA DASHBOARD_CONTROLLER.PY
 
 export const dashboardAPI = {
-  obterDados: () => fetchAPI('/dashboard'),
+  // filtro opcional: apenas uma sublinha ou linha (telas de andon)
+  obterDados: (filtro?: { sublinha_id?: number; linha_id?: number }) => {
+    const params = new URLSearchParams();
+    if (filtro?.sublinha_id !== undefined) params.append('sublinha_id', String(filtro.sublinha_id));
+    if (filtro?.linha_id !== undefined) params.append('linha_id', String(filtro.linha_id));
+    const query = params.toString();
+    return fetchAPI(`/dashboard${query ? `?${query}` : ''}`);
+  },
 }
 
 // CHAMADA PARA USUARIOS_CONTROLLER.PY
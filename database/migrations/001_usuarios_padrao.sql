@@ -0,0 +1,15 @@
+-- Migração: Garante os usuários padrão (admin, operador, master)
+-- Substitui DatabaseConnection.ensure_default_usuarios, que rodava a cada inicialização
+-- Senhas (SHA-256): admin123, operador123, master123
+
+INSERT INTO usuarios (username, senha_hash, nome, role, ativo)
+VALUES ('admin', '240be518fabd2724ddb6f04eeb1da5967448d7e831c08c8fa822809f74c720a9', 'Administrador', 'admin', TRUE)
+ON CONFLICT (username) DO NOTHING;
+
+INSERT INTO usuarios (username, senha_hash, nome, role, ativo)
+VALUES ('operador', '1725165c9a0b3698a3d01016e0d8205155820b8d7f21835ca64c0f81c728d880', 'Operador RFID', 'operador', TRUE)
+ON CONFLICT (username) DO NOTHING;
+
+INSERT INTO usuarios (username, senha_hash, nome, role, ativo)
+VALUES ('master', 'e7bc2f973afb8dfaf00fadfb19596741108be08ab4a107c6a799c429b684c64a', 'Master User', 'master', TRUE)
+ON CONFLICT (username) DO NOTHING;
@@ -0,0 +1,6 @@
+-- Migração: Adiciona coluna dispositivo_nome na tabela registros_producao
+-- Esta coluna armazena o nome do dispositivo Raspberry diretamente no registro
+-- para que não seja necessário buscá-lo através da operação ou posto
+-- O preenchimento dos registros antigos é feito em lotes pela migração 004
+
+ALTER TABLE registros_producao ADD COLUMN IF NOT EXISTS dispositivo_nome TEXT;
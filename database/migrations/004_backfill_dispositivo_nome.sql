@@ -0,0 +1,29 @@
+-- migracao: background-em-lotes
+-- Migração: Preenche dispositivo_nome dos registros antigos a partir dos totens da operação
+--
+-- Executada em segundo plano, fora da inicialização: o runner repete este UPDATE
+-- (um lote por transação) até que nenhuma linha seja alterada e só então registra
+-- a versão em schema_migrations. Cada lote só seleciona registros que ainda têm
+-- dispositivo_nome nulo e que possuem totens, então o processo sempre termina.
+UPDATE registros_producao r
+SET dispositivo_nome = lote.dispositivo_nome
+FROM (
+    SELECT
+        rp.registro_id,
+        (
+            SELECT STRING_AGG(DISTINCT ot.toten_nome, ', ')
+            FROM operacao_totens ot
+            WHERE ot.operacao_id = rp.operacao_id
+            AND ot.toten_nome IS NOT NULL
+        ) AS dispositivo_nome
+    FROM registros_producao rp
+    WHERE rp.dispositivo_nome IS NULL
+    AND rp.operacao_id IS NOT NULL
+    AND EXISTS (
+        SELECT 1 FROM operacao_totens ot
+        WHERE ot.operacao_id = rp.operacao_id
+        AND ot.toten_nome IS NOT NULL
+    )
+    LIMIT 1000
+) AS lote
+WHERE r.registro_id = lote.registro_id;
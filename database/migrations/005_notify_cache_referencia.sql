@@ -0,0 +1,37 @@
+-- Migração: Notifica alterações nas tabelas de referência pelo canal cache_referencia
+-- Cada processo do backend mantém um cache em memória dessas tabelas e uma thread
+-- que executa LISTEN cache_referencia (Server/models/ouvinte_cache.py); o payload
+-- é o nome da tabela alterada. O trigger é por comando (FOR EACH STATEMENT) e o
+-- PostgreSQL só entrega a notificação após o commit, descartando payloads repetidos
+-- na mesma transação: um UPDATE em lote gera uma única notificação.
+
+CREATE OR REPLACE FUNCTION notificar_cache_referencia()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('cache_referencia', TG_TABLE_NAME);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+DECLARE
+    tabela TEXT;
+BEGIN
+    FOREACH tabela IN ARRAY ARRAY[
+        'linhas', 'sublinhas', 'produtos', 'modelos', 'pecas', 'postos',
+        'operacoes', 'operacao_totens', 'funcionarios', 'tags_temporarias',
+        'dispositivos_raspberry'
+    ]
+    LOOP
+        IF to_regclass('public.' || tabela) IS NOT NULL THEN
+            EXECUTE format('DROP TRIGGER IF EXISTS trg_notificar_cache_referencia ON %I', tabela);
+            EXECUTE format(
+                'CREATE TRIGGER trg_notificar_cache_referencia '
+                'AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON %I '
+                'FOR EACH STATEMENT EXECUTE FUNCTION notificar_cache_referencia()',
+                tabela
+            );
+        END IF;
+    END LOOP;
+END;
+$$;
@@ -0,0 +1,22 @@
+-- Migração: Estende as notificações do canal cache_referencia às tabelas de relacionamento
+-- usadas pela listagem de operações (peças da operação e peças do modelo)
+-- A função notificar_cache_referencia() foi criada na migração 005
+
+DO $$
+DECLARE
+    tabela TEXT;
+BEGIN
+    FOREACH tabela IN ARRAY ARRAY['operacao_pecas', 'modelo_pecas']
+    LOOP
+        IF to_regclass('public.' || tabela) IS NOT NULL THEN
+            EXECUTE format('DROP TRIGGER IF EXISTS trg_notificar_cache_referencia ON %I', tabela);
+            EXECUTE format(
+                'CREATE TRIGGER trg_notificar_cache_referencia '
+                'AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON %I '
+                'FOR EACH STATEMENT EXECUTE FUNCTION notificar_cache_referencia()',
+                tabela
+            );
+        END IF;
+    END LOOP;
+END;
+$$;
@@ -0,0 +1,128 @@
+-- Migração: Funções de entrada/saída de produção executadas em uma única ida ao banco
+-- Cada função resolve posto/funcionário/modelo pelos identificadores de negócio, obtém o
+-- advisory lock do par posto+matrícula (mesma chave de producao_service.chave_lock_registro),
+-- aplica a regra de um registro aberto por operador/posto e grava com RETURNING.
+-- Falhas de negócio são devolvidas na coluna status (sem exceção) para que o backend
+-- gere as mesmas mensagens de erro de antes.
+
+CREATE OR REPLACE FUNCTION registrar_entrada_producao(
+    p_posto TEXT,
+    p_matricula TEXT,
+    p_modelo TEXT,
+    p_inicio TIMESTAMP,
+    p_operacao_id INTEGER DEFAULT NULL,
+    p_peca_id INTEGER DEFAULT NULL,
+    p_codigo_producao TEXT DEFAULT NULL,
+    p_quantidade INTEGER DEFAULT NULL,
+    p_dispositivo_nome TEXT DEFAULT NULL
+)
+RETURNS TABLE (status TEXT, registro_id INTEGER)
+AS $$
+#variable_conflict use_column
+DECLARE
+    v_posto_id INTEGER;
+    v_sublinha_id INTEGER;
+    v_funcionario_id INTEGER;
+    v_modelo_id INTEGER;
+    v_aberto INTEGER;
+BEGIN
+    SELECT p.posto_id, p.sublinha_id INTO v_posto_id, v_sublinha_id
+    FROM postos p WHERE p.nome = p_posto ORDER BY p.posto_id LIMIT 1;
+    IF v_posto_id IS NULL THEN
+        RETURN QUERY SELECT 'posto_nao_encontrado'::TEXT, NULL::INTEGER;
+        RETURN;
+    END IF;
+
+    SELECT f.funcionario_id INTO v_funcionario_id
+    FROM funcionarios f WHERE f.matricula = p_matricula ORDER BY f.funcionario_id LIMIT 1;
+    IF v_funcionario_id IS NULL THEN
+        RETURN QUERY SELECT 'funcionario_nao_encontrado'::TEXT, NULL::INTEGER;
+        RETURN;
+    END IF;
+
+    SELECT m.modelo_id INTO v_modelo_id
+    FROM modelos m WHERE m.nome = p_modelo ORDER BY m.modelo_id LIMIT 1;
+    IF v_modelo_id IS NULL THEN
+        RETURN QUERY SELECT 'modelo_nao_encontrado'::TEXT, NULL::INTEGER;
+        RETURN;
+    END IF;
+
+    PERFORM pg_advisory_xact_lock(hashtext('registro_producao:' || p_posto || ':' || p_matricula));
+
+    SELECT r.registro_id INTO v_aberto
+    FROM registros_producao r
+    WHERE r.posto_id = v_posto_id AND r.funcionario_id = v_funcionario_id AND r.fim IS NULL
+    ORDER BY r.registro_id DESC LIMIT 1;
+    IF v_aberto IS NOT NULL THEN
+        RETURN QUERY SELECT 'registro_aberto'::TEXT, v_aberto;
+        RETURN;
+    END IF;
+
+    RETURN QUERY
+    INSERT INTO registros_producao (
+        posto_id, funcionario_id, modelo_id, sublinha_id, inicio, quantidade,
+        operacao_id, peca_id, codigo_producao, dispositivo_nome, criado_em
+    )
+    VALUES (
+        v_posto_id, v_funcionario_id, v_modelo_id, v_sublinha_id, p_inicio, p_quantidade,
+        p_operacao_id, p_peca_id, NULLIF(p_codigo_producao, ''), NULLIF(p_dispositivo_nome, ''),
+        CURRENT_TIMESTAMP
+    )
+    RETURNING 'ok'::TEXT, registros_producao.registro_id;
+END;
+$$ LANGUAGE plpgsql;
+
+
+CREATE OR REPLACE FUNCTION registrar_saida_producao(
+    p_registro_id INTEGER,
+    p_posto TEXT,
+    p_matricula TEXT,
+    p_fim TIMESTAMP,
+    p_quantidade INTEGER DEFAULT NULL
+)
+RETURNS TABLE (status TEXT, registro_id INTEGER, duracao_minutos INTEGER, quantidade INTEGER)
+AS $$
+#variable_conflict use_column
+DECLARE
+    v_posto_id INTEGER;
+    v_funcionario_id INTEGER;
+    v_registro_id INTEGER := p_registro_id;
+BEGIN
+    IF p_posto IS NOT NULL AND p_matricula IS NOT NULL THEN
+        PERFORM pg_advisory_xact_lock(hashtext('registro_producao:' || p_posto || ':' || p_matricula));
+
+        IF v_registro_id IS NULL THEN
+            SELECT p.posto_id INTO v_posto_id
+            FROM postos p WHERE p.nome = p_posto ORDER BY p.posto_id LIMIT 1;
+            SELECT f.funcionario_id INTO v_funcionario_id
+            FROM funcionarios f WHERE f.matricula = p_matricula ORDER BY f.funcionario_id LIMIT 1;
+
+            SELECT r.registro_id INTO v_registro_id
+            FROM registros_producao r
+            WHERE r.posto_id = v_posto_id AND r.funcionario_id = v_funcionario_id AND r.fim IS NULL
+            ORDER BY r.registro_id DESC LIMIT 1;
+        END IF;
+    END IF;
+
+    IF v_registro_id IS NULL THEN
+        RETURN QUERY SELECT 'nao_encontrado'::TEXT, NULL::INTEGER, NULL::INTEGER, NULL::INTEGER;
+        RETURN;
+    END IF;
+
+    RETURN QUERY
+    UPDATE registros_producao r
+    SET fim = p_fim,
+        quantidade = COALESCE(p_quantidade, r.quantidade)
+    WHERE r.registro_id = v_registro_id AND r.fim IS NULL
+    RETURNING 'ok'::TEXT, r.registro_id,
+              GREATEST(
+                  (EXTRACT(EPOCH FROM (p_fim - date_trunc('minute', r.inicio))) / 60)::INTEGER,
+                  0
+              ),
+              r.quantidade;
+
+    IF NOT FOUND THEN
+        RETURN QUERY SELECT 'nao_encontrado'::TEXT, NULL::INTEGER, NULL::INTEGER, NULL::INTEGER;
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,113 @@
+-- migracao: sem-transacao
+-- Migração: Índices parciais e unicidade para registros de produção em aberto (fim IS NULL)
+-- As consultas de registro aberto (dashboard, buscar_registro_aberto, verificar_registro_aberto
+-- e as funções de entrada/saída) passam a percorrer apenas os registros abertos, qualquer que
+-- seja o tamanho do histórico.
+--
+-- Executada em segundo plano, fora da transação de inicialização: o UPDATE roda em uma
+-- transação curta própria, os índices são criados com CONCURRENTLY (sem bloquear as
+-- gravações durante a leitura do histórico) e a função só é trocada depois que o índice
+-- único existe. Até lá, a função da migração 007 continua em uso (retorna só status e
+-- registro_id; ProducaoRegistro.registrar_entrada aceita os dois formatos). Se surgir um novo
+-- duplicado entre o UPDATE e o build do índice único, o build falha e a migração inteira é
+-- refeita na próxima inicialização.
+
+-- 1. Fechar duplicidades existentes: para cada posto/funcionário fica aberto apenas o registro
+--    mais recente (o mesmo que buscar_registro_aberto já retornava); os anteriores são
+--    encerrados no início do registro seguinte
+WITH abertos AS (
+    SELECT registro_id,
+           inicio,
+           LEAD(inicio) OVER (PARTITION BY posto_id, funcionario_id ORDER BY registro_id) AS inicio_seguinte,
+           ROW_NUMBER() OVER (PARTITION BY posto_id, funcionario_id ORDER BY registro_id DESC) AS ordem
+    FROM registros_producao
+    WHERE fim IS NULL
+)
+UPDATE registros_producao r
+SET fim = GREATEST(a.inicio, a.inicio_seguinte)
+FROM abertos a
+WHERE r.registro_id = a.registro_id
+AND a.ordem > 1;
+
+-- 2. No máximo um registro aberto por posto/funcionário (também atende às buscas por esse par)
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS uq_registros_producao_aberto
+    ON registros_producao (posto_id, funcionario_id)
+    WHERE fim IS NULL;
+
+-- 3. Registros abertos por posto (dashboard)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_registros_producao_abertos_posto
+    ON registros_producao (posto_id)
+    WHERE fim IS NULL;
+
+-- 4. A entrada usa o índice único (ON CONFLICT ... DO NOTHING) no lugar da consulta prévia:
+--    o conflito vira o resultado "registro já aberto", com o id e o início do registro existente
+DROP FUNCTION IF EXISTS registrar_entrada_producao(TEXT, TEXT, TEXT, TIMESTAMP, INTEGER, INTEGER, TEXT, INTEGER, TEXT);
+
+CREATE OR REPLACE FUNCTION registrar_entrada_producao(
+    p_posto TEXT,
+    p_matricula TEXT,
+    p_modelo TEXT,
+    p_inicio TIMESTAMP,
+    p_operacao_id INTEGER DEFAULT NULL,
+    p_peca_id INTEGER DEFAULT NULL,
+    p_codigo_producao TEXT DEFAULT NULL,
+    p_quantidade INTEGER DEFAULT NULL,
+    p_dispositivo_nome TEXT DEFAULT NULL
+)
+RETURNS TABLE (status TEXT, registro_id INTEGER, inicio TIMESTAMP)
+AS $$
+#variable_conflict use_column
+DECLARE
+    v_posto_id INTEGER;
+    v_sublinha_id INTEGER;
+    v_funcionario_id INTEGER;
+    v_modelo_id INTEGER;
+    v_registro_id INTEGER;
+    v_inicio TIMESTAMP;
+BEGIN
+    SELECT p.posto_id, p.sublinha_id INTO v_posto_id, v_sublinha_id
+    FROM postos p WHERE p.nome = p_posto ORDER BY p.posto_id LIMIT 1;
+    IF v_posto_id IS NULL THEN
+        RETURN QUERY SELECT 'posto_nao_encontrado'::TEXT, NULL::INTEGER, NULL::TIMESTAMP;
+        RETURN;
+    END IF;
+
+    SELECT f.funcionario_id INTO v_funcionario_id
+    FROM funcionarios f WHERE f.matricula = p_matricula ORDER BY f.funcionario_id LIMIT 1;
+    IF v_funcionario_id IS NULL THEN
+        RETURN QUERY SELECT 'funcionario_nao_encontrado'::TEXT, NULL::INTEGER, NULL::TIMESTAMP;
+        RETURN;
+    END IF;
+
+    SELECT m.modelo_id INTO v_modelo_id
+    FROM modelos m WHERE m.nome = p_modelo ORDER BY m.modelo_id LIMIT 1;
+    IF v_modelo_id IS NULL THEN
+        RETURN QUERY SELECT 'modelo_nao_encontrado'::TEXT, NULL::INTEGER, NULL::TIMESTAMP;
+        RETURN;
+    END IF;
+
+    PERFORM pg_advisory_xact_lock(hashtext('registro_producao:' || p_posto || ':' || p_matricula));
+
+    INSERT INTO registros_producao (
+        posto_id, funcionario_id, modelo_id, sublinha_id, inicio, quantidade,
+        operacao_id, peca_id, codigo_producao, dispositivo_nome, criado_em
+    )
+    VALUES (
+        v_posto_id, v_funcionario_id, v_modelo_id, v_sublinha_id, p_inicio, p_quantidade,
+        p_operacao_id, p_peca_id, NULLIF(p_codigo_producao, ''), NULLIF(p_dispositivo_nome, ''),
+        CURRENT_TIMESTAMP
+    )
+    ON CONFLICT (posto_id, funcionario_id) WHERE fim IS NULL DO NOTHING
+    RETURNING registros_producao.registro_id, registros_producao.inicio INTO v_registro_id, v_inicio;
+
+    IF v_registro_id IS NULL THEN
+        SELECT r.registro_id, r.inicio INTO v_registro_id, v_inicio
+        FROM registros_producao r
+        WHERE r.posto_id = v_posto_id AND r.funcionario_id = v_funcionario_id AND r.fim IS NULL;
+        RETURN QUERY SELECT 'registro_aberto'::TEXT, v_registro_id, v_inicio;
+        RETURN;
+    END IF;
+
+    RETURN QUERY SELECT 'ok'::TEXT, v_registro_id, v_inicio;
+END;
+$$ LANGUAGE plpgsql;
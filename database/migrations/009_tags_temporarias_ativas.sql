@@ -0,0 +1,17 @@
+-- Migração: Índice parcial para a busca de tags temporárias válidas
+-- A leitura RFID passa a filtrar a validade na própria consulta
+-- (tag_id = ? AND ativo AND data_expiracao > CURRENT_TIMESTAMP) e deixa de desativar/excluir
+-- tags expiradas a cada leitura; isso fica com a tarefa periódica do backend.
+-- O predicado do índice não pode usar CURRENT_TIMESTAMP (não é imutável): ele cobre as tags
+-- ativas e a data de expiração entra na chave.
+
+CREATE INDEX IF NOT EXISTS idx_tags_temporarias_ativas
+    ON tags_temporarias (tag_id, data_expiracao)
+    WHERE ativo = TRUE;
+
+CREATE INDEX IF NOT EXISTS idx_tags_temporarias_funcionario_ativas
+    ON tags_temporarias (funcionario_id, data_expiracao)
+    WHERE ativo = TRUE;
+
+-- Índice sobre um booleano não é seletivo e é substituído pelos índices parciais
+DROP INDEX IF EXISTS idx_tags_temporarias_ativo;
@@ -0,0 +1,23 @@
+-- Migração: Notifica alterações que afetam o snapshot do dashboard
+-- O dashboard é calculado uma vez por versão e mantido em memória em cada processo
+-- (dashboard_service.obter_snapshot); escritas em registros_producao e operacoes_habilitadas
+-- feitas por outro processo chegam pelo mesmo canal cache_referencia da migração 005.
+
+DO $$
+DECLARE
+    tabela TEXT;
+BEGIN
+    FOREACH tabela IN ARRAY ARRAY['registros_producao', 'operacoes_habilitadas']
+    LOOP
+        IF to_regclass('public.' || tabela) IS NOT NULL THEN
+            EXECUTE format('DROP TRIGGER IF EXISTS trg_notificar_cache_referencia ON %I', tabela);
+            EXECUTE format(
+                'CREATE TRIGGER trg_notificar_cache_referencia '
+                'AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON %I '
+                'FOR EACH STATEMENT EXECUTE FUNCTION notificar_cache_referencia()',
+                tabela
+            );
+        END IF;
+    END LOOP;
+END;
+$$;
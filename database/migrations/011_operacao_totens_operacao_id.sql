@@ -0,0 +1,6 @@
+-- Migração: Índice de operacao_totens por operação
+-- A listagem de registros agrega os totens das operações da página em uma única consulta
+-- (WHERE operacao_id IN (...) GROUP BY operacao_id). operacao_pecas já é atendida pelo
+-- índice de UNIQUE(operacao_id, peca_id); operacao_totens não tinha índice por operação.
+
+CREATE INDEX IF NOT EXISTS idx_operacao_totens_operacao_id ON operacao_totens (operacao_id);
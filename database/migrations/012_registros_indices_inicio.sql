@@ -0,0 +1,26 @@
+-- migracao: sem-transacao
+-- Migração: Índices para os filtros de data/horário da listagem de registros
+-- registro_service._construir_filtros passa a traduzir data e janela de horário em um
+-- intervalo sobre inicio (inicio >= X AND inicio < Y) no lugar de hora_inicio::time, que
+-- não usa índice. inicio é gravado no horário de Manaus (mesmo fuso de data_inicio).
+--
+-- registros_producao é a maior tabela: os índices são criados com CONCURRENTLY, em segundo
+-- plano e fora da transação de inicialização, sem bloquear as gravações do chão de fábrica.
+-- Os comandos são executados em ordem e o runner para na primeira falha, então os índices
+-- simples só são removidos depois que os compostos foram criados e estão válidos.
+
+-- 1. Intervalo de datas/horário sem outros filtros
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_registros_producao_inicio
+    ON registros_producao (inicio);
+
+-- 2. Posto + intervalo (combinação mais usada na tela de registros)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_registros_producao_posto_inicio
+    ON registros_producao (posto_id, inicio);
+
+-- 3. Operação + intervalo
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_registros_producao_operacao_inicio
+    ON registros_producao (operacao_id, inicio);
+
+-- Os índices simples de posto e operação são prefixos dos compostos acima
+DROP INDEX CONCURRENTLY IF EXISTS idx_registros_posto_id;
+DROP INDEX CONCURRENTLY IF EXISTS idx_registros_operacao_id;
@@ -0,0 +1,7 @@
+-- Migração: Índices dos nomes usados nos filtros da listagem de registros
+-- Os filtros por posto (nome) e operação (código) passam a ser resolvidos na própria
+-- consulta (r.posto_id IN (SELECT posto_id FROM postos WHERE nome = ...)) em vez de
+-- carregar o catálogo completo no backend.
+
+CREATE INDEX IF NOT EXISTS idx_postos_nome ON postos (nome);
+CREATE INDEX IF NOT EXISTS idx_operacoes_codigo_operacao ON operacoes (codigo_operacao);
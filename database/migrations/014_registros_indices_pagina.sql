@@ -0,0 +1,20 @@
+-- migracao: sem-transacao
+-- Migração: Índices da página da listagem de registros filtrada por dia
+-- A página é ordenada por registro_id DESC (com o cursor r.registro_id < antes_de). Com os
+-- índices de intervalo sobre inicio (012) o planner escolhe entre percorrer a chave primária
+-- de trás para frente filtrando inicio (custo proporcional ao histórico mais novo que o dia)
+-- ou ler o dia inteiro e ordenar. Com o dia como igualdade (r.data_inicio = ..., montado por
+-- registro_service._construir_filtros) seguido de registro_id, o mesmo índice atende ao
+-- filtro, à ordenação e ao cursor, e a leitura para no LIMIT.
+-- Parciais em fim IS NOT NULL, a condição fixa da listagem; criados com CONCURRENTLY, em
+-- segundo plano, sem bloquear as gravações em registros_producao.
+
+-- 1. Dia (com ou sem janela de horário)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_registros_producao_dia_pagina
+    ON registros_producao (data_inicio, registro_id)
+    WHERE fim IS NOT NULL;
+
+-- 2. Posto + dia (combinação mais usada na tela de registros)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_registros_producao_posto_dia_pagina
+    ON registros_producao (posto_id, data_inicio, registro_id)
+    WHERE fim IS NOT NULL;
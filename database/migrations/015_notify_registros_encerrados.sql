@@ -0,0 +1,57 @@
+-- Migração: Notificação própria para alterações no conjunto de registros encerrados
+-- Os totais da listagem de registros (registro_service, filtro fim IS NOT NULL) ficavam
+-- inscritos em 'registros_producao', que notifica a cada comando na tabela (migração 010),
+-- inclusive o INSERT de cada entrada, que abre um registro e não altera a contagem. Estes
+-- triggers enviam 'registros_encerrados' pelo mesmo canal cache_referencia apenas quando o
+-- comando toca um registro encerrado: saída (UPDATE que preenche fim), exclusão, edição de
+-- registro encerrado ou inserção já encerrada. A notificação de 'registros_producao'
+-- continua para o dashboard, que depende dos registros abertos.
+-- Transition tables exigem um trigger por evento (INSERT, UPDATE e DELETE separados).
+
+-- Cada consulta só pode citar as transition tables do próprio evento (por isso um IF por
+-- evento em vez de uma única expressão)
+CREATE OR REPLACE FUNCTION notificar_registros_encerrados()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_encerrados BOOLEAN := FALSE;
+BEGIN
+    IF TG_OP = 'TRUNCATE' THEN
+        v_encerrados := TRUE;
+    ELSIF TG_OP = 'INSERT' THEN
+        v_encerrados := EXISTS (SELECT 1 FROM registros_novos WHERE fim IS NOT NULL);
+    ELSIF TG_OP = 'UPDATE' THEN
+        v_encerrados := EXISTS (SELECT 1 FROM registros_novos WHERE fim IS NOT NULL)
+                     OR EXISTS (SELECT 1 FROM registros_antigos WHERE fim IS NOT NULL);
+    ELSIF TG_OP = 'DELETE' THEN
+        v_encerrados := EXISTS (SELECT 1 FROM registros_antigos WHERE fim IS NOT NULL);
+    END IF;
+
+    IF v_encerrados THEN
+        PERFORM pg_notify('cache_referencia', 'registros_encerrados');
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_notificar_encerrados_insert ON registros_producao;
+CREATE TRIGGER trg_notificar_encerrados_insert
+    AFTER INSERT ON registros_producao
+    REFERENCING NEW TABLE AS registros_novos
+    FOR EACH STATEMENT EXECUTE FUNCTION notificar_registros_encerrados();
+
+DROP TRIGGER IF EXISTS trg_notificar_encerrados_update ON registros_producao;
+CREATE TRIGGER trg_notificar_encerrados_update
+    AFTER UPDATE ON registros_producao
+    REFERENCING OLD TABLE AS registros_antigos NEW TABLE AS registros_novos
+    FOR EACH STATEMENT EXECUTE FUNCTION notificar_registros_encerrados();
+
+DROP TRIGGER IF EXISTS trg_notificar_encerrados_delete ON registros_producao;
+CREATE TRIGGER trg_notificar_encerrados_delete
+    AFTER DELETE ON registros_producao
+    REFERENCING OLD TABLE AS registros_antigos
+    FOR EACH STATEMENT EXECUTE FUNCTION notificar_registros_encerrados();
+
+DROP TRIGGER IF EXISTS trg_notificar_encerrados_truncate ON registros_producao;
+CREATE TRIGGER trg_notificar_encerrados_truncate
+    AFTER TRUNCATE ON registros_producao
+    FOR EACH STATEMENT EXECUTE FUNCTION notificar_registros_encerrados();